@@ -0,0 +1,167 @@
+# backend/alignment.py
+"""
+Base-model alignment.
+
+Finds the master's base features inside a student's feature tree with a
+banded edit-distance alignment, so one renamed, reordered or deleted base
+feature no longer turns the whole tree into the student's delta. Every
+base feature comes out as kept (found unchanged), changed (aligned to a
+feature of the same type with another name or attributes), moved (found
+unchanged outside the alignment) or missing. Only the student features
+left over are new work.
+
+Costs are per feature type: dropping a base feature or inserting a student
+feature among the base features costs the type's cost. Aligning a base
+feature to a changed one of the same type costs `change_cost` times that.
+Features of different types are never aligned. Override any key of
+DEFAULT_ALIGNMENT with a JSON file named by ALIGNMENT_CONFIG.
+
+A BaseAligner is built once per job from the master signature. A student
+whose tree starts with the unchanged base skips the alignment entirely.
+"""
+import json
+import os
+
+DEFAULT_ALIGNMENT = {
+    "band": 8,  # how far (in features) a student position may drift from its base position
+    "change_cost": 0.3,
+    "default_cost": 1.0,
+    # Sketches and reference geometry are cheap to redo; solid features carry the design.
+    "type_costs": {"ProfileFeature": 0.5, "RefPlane": 0.5, "RefAxis": 0.5, "RefPoint": 0.5}
+}
+
+
+def load_alignment(path=None):
+    alignment = dict(DEFAULT_ALIGNMENT)
+    if path:
+        with open(path, 'r') as f:
+            alignment.update(json.load(f))
+    return alignment
+
+
+ALIGNMENT = load_alignment(os.environ.get("ALIGNMENT_CONFIG"))
+
+_KEEP, _CHANGE, _DROP, _INSERT = range(4)
+
+
+def feature_key(feature):
+    """Identity of a feature: its type, name and any other attributes."""
+    return tuple(sorted((str(key), str(value)) for key, value in feature.items()))
+
+
+class BaseAligner:
+    def __init__(self, base_signature, alignment=None):
+        alignment = alignment or ALIGNMENT
+        self.base = list(base_signature)
+        self.band = max(int(alignment["band"]), 1)
+        self.change_cost = float(alignment["change_cost"])
+        self.type_costs = alignment["type_costs"]
+        self.default_cost = float(alignment["default_cost"])
+        self.keys = [feature_key(feature) for feature in self.base]
+        self.types = [str(feature.get("type", "")) for feature in self.base]
+        self.costs = [self.cost_of(kind) for kind in self.types]
+
+    def cost_of(self, kind):
+        return float(self.type_costs.get(kind, self.default_cost))
+
+    def align(self, signature):
+        """
+        Returns {"delta", "base_modified", "kept", "changed", "moved", "missing"}:
+        the student features that are new work, whether any base feature was
+        not kept in place, the number kept and the names of the others.
+        """
+        signature = list(signature)
+        m = len(self.base)
+        if signature[:m] == self.base:
+            return {"delta": signature[m:], "base_modified": False, "kept": m,
+                    "changed": [], "moved": [], "missing": []}
+
+        keys = [feature_key(feature) for feature in signature]
+        ops = self._alignment(keys, signature)
+        matched, dropped, inserted = {}, [], []
+        for op, i, j in ops:
+            if op == _DROP:
+                dropped.append(i)
+            elif op == _INSERT:
+                inserted.append(j)
+            else:
+                matched[i] = j
+        aligned_end = max([j + 1 for _, _, j in ops if j is not None], default=0)
+        leftover = inserted + list(range(aligned_end, len(signature)))
+
+        # A dropped base feature that is still in the tree, unchanged, was moved.
+        unclaimed = {}
+        for j in leftover:
+            unclaimed.setdefault(keys[j], []).append(j)
+        moved, missing, claimed = [], [], set()
+        for i in dropped:
+            spots = unclaimed.get(self.keys[i])
+            if spots:
+                claimed.add(spots.pop(0))
+                moved.append(self.base[i].get("name", ""))
+            else:
+                missing.append(self.base[i].get("name", ""))
+        changed = [self.base[i].get("name", "") for i, j in matched.items() if keys[j] != self.keys[i]]
+        kept = len(matched) - len(changed)
+        return {
+            "delta": [signature[j] for j in sorted(leftover) if j not in claimed],
+            "base_modified": kept < m,
+            "kept": kept,
+            "changed": changed,
+            "moved": moved,
+            "missing": missing
+        }
+
+    def _alignment(self, keys, signature):
+        """
+        Cheapest alignment of the whole base against a prefix of the student
+        tree, within `band` of the diagonal; student features after that
+        prefix are free. Returns [(op, base index, student index)] in order.
+        """
+        m = len(self.base)
+        # A tree much shorter than the base needs a wider band to reach the end of the base.
+        band = max(self.band, m - len(signature))
+        n = min(len(signature), m + band)
+        types = [str(feature.get("type", "")) for feature in signature[:n]]
+        insert_costs = [self.cost_of(kind) for kind in types]
+        inf = float("inf")
+        cost = [[inf] * (n + 1) for _ in range(m + 1)]
+        step = [[None] * (n + 1) for _ in range(m + 1)]
+        cost[0][0] = 0.0
+        for j in range(1, min(n, band) + 1):
+            cost[0][j], step[0][j] = cost[0][j - 1] + insert_costs[j - 1], _INSERT
+        for i in range(1, m + 1):
+            base_key, base_type, base_cost = self.keys[i - 1], self.types[i - 1], self.costs[i - 1]
+            row, previous = cost[i], cost[i - 1]
+            low, high = max(0, i - band), min(n, i + band)
+            for j in range(low, high + 1):
+                best, op = previous[j] + base_cost, _DROP
+                if j > low and row[j - 1] + insert_costs[j - 1] < best:
+                    best, op = row[j - 1] + insert_costs[j - 1], _INSERT
+                if j and types[j - 1] == base_type:
+                    if keys[j - 1] == base_key:
+                        candidate, diagonal = previous[j - 1], _KEEP
+                    else:
+                        candidate, diagonal = previous[j - 1] + self.change_cost * base_cost, _CHANGE
+                    # Ties go to the diagonal, so an unchanged prefix aligns in place.
+                    if candidate <= best:
+                        best, op = candidate, diagonal
+                row[j], step[i][j] = best, op
+
+        # The shortest prefix among the cheapest, so trailing new work stays delta.
+        last = cost[m]
+        j = min(range(n + 1), key=lambda col: (last[col], col))
+        i, ops = m, []
+        while i or j:
+            op = step[i][j]
+            if op == _DROP:
+                ops.append((op, i - 1, None))
+                i -= 1
+            elif op == _INSERT:
+                ops.append((op, None, j - 1))
+                j -= 1
+            else:
+                ops.append((op, i - 1, j - 1))
+                i, j = i - 1, j - 1
+        ops.reverse()
+        return ops
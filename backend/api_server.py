@@ -1,279 +1,436 @@
 # backend/api_server.py
-from flask import Flask, request, send_file
-import subprocess, datetime, zipfile, json, hashlib
+from flask import Flask, request, Response, send_file, stream_with_context
+import datetime, os, shutil, queue, functools, secrets, time
 from pathlib import Path
-import pandas as pd
-from collections import defaultdict
-import report_generator
+from jobs import JobManager, AdmissionError, PRIORITIES, TIMINGS_FILE
+import metrics
+from ingest import DiskStreamingRequest, IngestError, UnknownUploadError, UploadSessions, save_upload, scan_archive
+from zipstream import iter_zip
+from pipeline import (run_assessment, run_late_submissions, result_cache, load_state, lazy_reports, ensure_report,
+                      iter_report_files, assignments, register_assignment, resume_assignments,
+                      SUMMARY_CSV_NAME, RESULTS_FILE_NAME, REPORT_MODE)
+from assignments import AssignmentError, AssignmentNotReadyError, UnknownAssignmentError, summary as assignment_summary
+from worker_pool import get_worker_pool
+import replay
+import scoring
+from job_storage import JobStorage
 
 app = Flask(__name__)
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 PROCESSING_DIR = PROJECT_ROOT / "temp_processing_files"
-WORKER_SCRIPT_PATH = PROJECT_ROOT / "worker" / "sw_worker.py"
 PROCESSING_DIR.mkdir(exist_ok=True)
-PLAGIARISM_COMPLEXITY_THRESHOLD = 3
-
-PYTHON_EXECUTABLE = PROJECT_ROOT / "venv" / "Scripts" / "python.exe"
-
-def get_analysis_data(file_path, job_dir):
-    output_json = job_dir / f"{file_path.stem}_analysis.json"
-    command = [str(PYTHON_EXECUTABLE), str(WORKER_SCRIPT_PATH), str(file_path), str(output_json)]
-    result = subprocess.run(command, check=True, capture_output=True, text=True, shell=True)
-    
-    # Print subprocess output for debugging
-    if result.stdout:
-        print(result.stdout)
-    if result.stderr:
-        print("STDERR:", result.stderr)
-    
-    with open(output_json, 'r') as f: 
-        data = json.load(f)
-    
-    # Debug: Print what we loaded
-    print(f"\n*** JSON DATA LOADED ***")
-    print(f"File: {file_path.name}")
-    print(f"Volume from JSON: {data.get('volume_mm3', 0.0):.2f} mm^3")
-    print(f"Status from JSON: {data.get('status', 'Unknown')}")
-    if data.get('error'):
-        print(f"Error from JSON: {data.get('error')}")
-    print(f"{'*'*30}\n")
-    
-    return data
+STUDENT_ZIP_NAME = "student_submissions.zip"
+RESULT_ARCHIVE_NAME = "assessment_reports.zip"
+
+# Uploads are streamed to disk next to the job directories and renamed into place.
+app.request_class = DiskStreamingRequest
+DiskStreamingRequest.upload_dir = PROCESSING_DIR / "uploads"
+app.config["MAX_CONTENT_LENGTH"] = int(os.environ.get("MAX_UPLOAD_MB", "4096")) * 1024 * 1024
+# Resumable uploads are written chunk by chunk next to the job directories, then renamed into a job.
+upload_sessions = UploadSessions(PROCESSING_DIR / "upload_sessions", max_bytes=app.config["MAX_CONTENT_LENGTH"])
+
+def create_job_dir():
+    """A new job directory; the random suffix keeps ids unique when jobs arrive in the same second."""
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    while True:
+        job_dir = PROCESSING_DIR / f"{timestamp}_{secrets.token_hex(4)}"
+        try:
+            job_dir.mkdir()
+            return job_dir
+        except FileExistsError:
+            continue
+
+def admit_job(form):
+    """Checks the job limits for the uploading owner before the upload is saved."""
+    job_manager.admit(form.get('owner', '').strip() or None)
+
+def job_options(form):
+    """Job inputs other than the files, from a request form or the form stored with a chunked upload."""
+    return {
+        "use_cache": form.get('bypass_cache', '').lower() not in ('1', 'true', 'yes'),
+        # Tags for the cross-cohort fingerprint index; defaults are filled in by the pipeline.
+        "assignment": form.get('assignment', '').strip() or None,
+        "semester": form.get('semester', '').strip() or None,
+        # Scheduling: the owner has a cap on active jobs; exam jobs start and get workers first.
+        "owner": form.get('owner', '').strip() or None,
+        "priority": form.get('priority') if form.get('priority') in PRIORITIES else "normal",
+        # "lazy": only the results table is written; PDFs are rendered when first opened.
+        "reports": form.get('reports') if form.get('reports') in ("eager", "lazy") else REPORT_MODE,
+        # Keep the worker results as a replay bundle for offline profiling (backend/replay.py).
+        "record": form.get('record', '').lower() in ('1', 'true', 'yes') or replay.REPLAY_RECORD
+    }
+
+def assignment_inputs(form):
+    """Master inputs of a job on a registered assignment; its master must be analyzed already."""
+    entry = assignments.master(form.get('assignment_id', '').strip())
+    return {"assignment_id": entry["assignment_id"], "master_file": entry["master_file"],
+            "assignment": form.get('assignment', '').strip() or entry["name"]}
 
-def compare_gdt(master_gdt_data, student_gdt_data):
+def save_job_inputs(job_dir):
     """
-    Detailed GD&T comparison returning status and specific differences.
+    Saves the student ZIP, and the uploaded master part unless the job names
+    a registered assignment (assignment_id), into the job directory.
     """
-    master_signature = set(master_gdt_data.get("combined_signature", []))
-    student_signature = set(student_gdt_data.get("combined_signature", []))
-    
-    # Calculate differences
-    missing = master_signature - student_signature
-    extra = student_signature - master_signature
-    matching = master_signature & student_signature
-    
-    # Determine overall status
-    if not master_signature:
-        if not student_signature:
-            status = "N/A (No GD&T in master)"
-            score = 100
-        else:
-            status = "Extra annotations present"
-            score = 50
-    elif not student_signature:
-        status = "Missing (No GD&T)"
-        score = 0
-    elif missing and extra:
-        status = "Partial match (missing some, has extra)"
-        score = (len(matching) / len(master_signature)) * 100
-    elif missing:
-        status = "Incomplete (missing annotations)"
-        score = (len(matching) / len(master_signature)) * 100
-    elif extra:
-        status = "Complete with extras"
-        score = 100
+    options = job_options(request.form)
+    if request.form.get('assignment_id'):
+        options.update(assignment_inputs(request.form))
     else:
-        status = "Perfect match"
-        score = 100
-    
-    return {
-        "status": status,
-        "score": round(score, 2),
-        "total_required": len(master_signature),
-        "total_found": len(student_signature),
-        "matching_count": len(matching),
-        "missing_count": len(missing),
-        "extra_count": len(extra),
-        "missing_annotations": sorted(list(missing)),
-        "extra_annotations": sorted(list(extra)),
-        "details": {
-            "master_fcf": len(master_gdt_data.get("feature_control_frames", [])),
-            "student_fcf": len(student_gdt_data.get("feature_control_frames", [])),
-            "master_dimxpert": len(master_gdt_data.get("dimxpert_annotations", [])),
-            "student_dimxpert": len(student_gdt_data.get("dimxpert_annotations", [])),
-            "master_datums": len(master_gdt_data.get("datums", [])),
-            "student_datums": len(student_gdt_data.get("datums", []))
-        }
-    }
+        master_file = request.files['master_file']
+        options["master_file"] = save_upload(master_file, job_dir / Path(master_file.filename).name).name
+    student_zip_path = save_upload(request.files['student_zip'], job_dir / STUDENT_ZIP_NAME)
+    # Reject bad archives before the job is queued; only the central directory is read.
+    scan_archive(student_zip_path)
+    return {"student_zip": student_zip_path.name, **options}
+
+def get_job(job_id):
+    """The job, marked as used so the storage sweeper evicts it last; None if unknown."""
+    job = job_manager.get(job_id)
+    if job is not None:
+        job_storage.touch(job.job_dir)
+    return job
+
+def timed_archive(chunks):
+    start = time.perf_counter()
+    yield from chunks
+    metrics.ARCHIVE_SECONDS.observe(time.perf_counter() - start)
+
+def zip_response(chunks):
+    return Response(stream_with_context(timed_archive(chunks)), mimetype="application/zip",
+                    headers={"Content-Disposition": f"attachment; filename={RESULT_ARCHIVE_NAME}"})
+
+@app.errorhandler(IngestError)
+def rejected_upload(e):
+    return {"error": str(e)}, 400
+
+@app.errorhandler(UnknownUploadError)
+def unknown_upload(e):
+    return {"error": str(e)}, 404
+
+@app.errorhandler(UnknownAssignmentError)
+def unknown_assignment(e):
+    return {"error": str(e)}, 404
+
+@app.errorhandler(AssignmentNotReadyError)
+def assignment_not_ready(e):
+    return {"error": str(e)}, 409
+
+@app.errorhandler(AdmissionError)
+def too_many_jobs(e):
+    return {"error": str(e)}, 429, {"Retry-After": "60"}
+
+@app.teardown_request
+def remove_unsaved_uploads(exc):
+    request.cleanup_uploads()
 
 @app.route('/analyze', methods=['POST'])
 def analyze():
-    # 1. Setup and file handling
+    """Synchronous pipeline run; kept for scripts. The UI uses /jobs."""
+    admit_job(request.form)
+    job_dir = create_job_dir()
+    try:
+        inputs = save_job_inputs(job_dir)
+    except (IngestError, AssignmentError):
+        shutil.rmtree(job_dir, ignore_errors=True)
+        raise
+    inputs["reports"] = "eager"  # the response streams the reports as they are rendered
+    job = job_manager.create(job_dir, inputs)
+
+    # Reports are added to the streamed archive as soon as each is rendered.
+    produced = queue.Queue()
+    job.on_report = produced.put
+    job_manager.submit(job).add_done_callback(lambda _: produced.put(None))
+
+    # Wait for the first report so early failures still get a proper error status.
+    first = produced.get()
+    if first is None and job.status != "done":
+        return {"error": job.state["error"]}, 500
+
+    def entries():
+        pdf_path = first
+        while pdf_path is not None:
+            yield pdf_path.name, pdf_path
+            pdf_path = produced.get()
+        if job.status != "done":
+            # Headers are already sent; a truncated archive tells the client it failed.
+            raise RuntimeError(f"Job {job.id} failed: {job.state['error']}")
+        yield SUMMARY_CSV_NAME, job_dir / job.state["result"]
+        if (job_dir / TIMINGS_FILE).exists():
+            yield TIMINGS_FILE, job_dir / TIMINGS_FILE
+
+    return zip_response(iter_zip(entries()))
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    admit_job(request.form)
+    job_dir = create_job_dir()
+    try:
+        inputs = save_job_inputs(job_dir)
+    except (IngestError, AssignmentError):
+        shutil.rmtree(job_dir, ignore_errors=True)
+        raise
+    job = job_manager.create(job_dir, inputs)
+    job_manager.submit(job)
+    return {"job_id": job.id, "status": job.status}, 202
+
+@app.route('/uploads', methods=['POST'])
+def create_upload():
+    """
+    Starts a resumable upload. JSON body: {"files": {"master_file": {"name",
+    "size"}, "student_zip": {"name", "size"}}, "form": {same fields as /jobs}}.
+    With an assignment_id in the form, only student_zip is sent.
+    Returns the upload id, the chunk size and the chunks expected per file.
+    """
+    body = request.get_json(silent=True) or {}
+    files = body.get("files") or {}
+    form = {str(key): str(value) for key, value in (body.get("form") or {}).items()}
+    if form.get("assignment_id"):
+        assignment_inputs(form)
+        if not isinstance(files, dict) or set(files) != {"student_zip"}:
+            raise IngestError("Send the name and size of student_zip")
+    elif not isinstance(files, dict) or set(files) != {"master_file", "student_zip"}:
+        raise IngestError("Send the name and size of master_file and student_zip")
+    admit_job(form)
+    return upload_sessions.create(files, form), 201
+
+@app.route('/uploads/<upload_id>', methods=['GET'])
+def upload_status(upload_id):
+    """Chunks received and still missing per file; a client resumes by sending the missing ones."""
+    return upload_sessions.status(upload_id)
+
+@app.route('/uploads/<upload_id>', methods=['DELETE'])
+def cancel_upload(upload_id):
+    upload_sessions.discard(upload_id)
+    return {"upload_id": upload_id, "status": "cancelled"}
+
+@app.route('/uploads/<upload_id>/<field>/<int:index>', methods=['PUT'])
+def upload_chunk(upload_id, field, index):
+    """One chunk as the raw request body, with its SHA-256 (hex) in the X-Chunk-SHA256 header."""
+    return upload_sessions.write_chunk(upload_id, field, index, request.stream,
+                                       request.headers.get("X-Chunk-SHA256"))
+
+@app.route('/uploads/<upload_id>/finalize', methods=['POST'])
+def finalize_upload(upload_id):
+    """Turns a complete upload into a job; the files are renamed into the job directory, not copied."""
+    state = upload_sessions.status(upload_id)
+    admit_job(state["form"])
+    inputs = {"student_zip": STUDENT_ZIP_NAME, **job_options(state["form"])}
+    if state["form"].get("assignment_id"):
+        inputs.update(assignment_inputs(state["form"]))
+    else:
+        inputs["master_file"] = state["files"]["master_file"]["name"]
+    job_dir = create_job_dir()
+    targets = {"student_zip": job_dir / STUDENT_ZIP_NAME}
+    if "master_file" in state["files"]:
+        targets["master_file"] = job_dir / inputs["master_file"]
+    try:
+        upload_sessions.finish(upload_id, targets)
+        scan_archive(job_dir / STUDENT_ZIP_NAME)
+    except IngestError:
+        shutil.rmtree(job_dir, ignore_errors=True)
+        raise
+    job = job_manager.create(job_dir, inputs)
+    job_manager.submit(job)
+    return {"job_id": job.id, "status": job.status}, 202
+
+@app.route('/assignments', methods=['POST'])
+def create_assignment():
+    """
+    Registers a master part (master_file) under `name` (default: its file
+    name). It is analyzed once, in the background; jobs then send its
+    assignment_id instead of the part. Registering the same part under the
+    same name again returns the existing assignment.
+    """
     master_file = request.files['master_file']
-    student_zip = request.files['student_zip']
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    job_dir = PROCESSING_DIR / timestamp
-    job_dir.mkdir()
-    master_file_path = job_dir / master_file.filename
-    master_file.save(master_file_path)
-
-    student_paths = []
-    with zipfile.ZipFile(student_zip, 'r') as zf:
-        zf.extractall(job_dir)
-        for name in zf.namelist():
-            if name.lower().endswith('.sldprt') and not name.startswith('__MACOSX'):
-                student_paths.append(job_dir / name)
-
-    # 2. Analyze master file
-    print(f"\n{'='*60}")
-    print(f"ANALYZING MASTER FILE: {master_file.filename}")
-    print(f"{'='*60}")
-    master_data = get_analysis_data(master_file_path, job_dir)
-    base_signature = master_data.get("signature", [])
-    master_volume = master_data.get("volume_mm3", 0.0)
-    master_gdt_data = master_data.get("gdt_data", {})
-    
-    print(f"\n*** MASTER DATA RECEIVED ***")
-    print(f"Master Volume: {master_volume:.2f} mm^3")
-    print(f"Master Features: {len(base_signature)}")
-    print(f"Master GD&T Count: {len(master_gdt_data.get('combined_signature', []))}")
-    print(f"Master Status: {master_data.get('status', 'Unknown')}")
-    if master_data.get('error'):
-        print(f"Master Error: {master_data.get('error')}")
-    print(f"{'='*60}\n")
-
-    # 3. Analyze all student files
-    student_analysis_data = {}
-    for s_path in student_paths:
-        print(f"\n{'-'*60}")
-        print(f"Analyzing: {s_path.name}")
-        
+    file_name = Path(master_file.filename).name
+    if not file_name:
+        raise IngestError("master_file needs a file name")
+    name = request.form.get('name', '').strip() or Path(file_name).stem
+    upload_path = save_upload(master_file, DiskStreamingRequest.upload_dir / f"assignment_{secrets.token_hex(8)}")
+    entry, created = register_assignment(name, upload_path, file_name)
+    return assignment_summary(entry), 202 if created else 200
+
+@app.route('/assignments', methods=['GET'])
+def list_assignments():
+    return {"assignments": [assignment_summary(entry) for entry in assignments.entries()]}
+
+@app.route('/assignments/<assignment_id>', methods=['GET'])
+def assignment_status(assignment_id):
+    return assignment_summary(assignments.get(assignment_id))
+
+@app.route('/assignments/<assignment_id>', methods=['DELETE'])
+def delete_assignment(assignment_id):
+    """Removes an assignment; finished jobs keep their copy of its master data."""
+    assignments.delete(assignment_id)
+    return {"assignment_id": assignment_id, "status": "deleted"}
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = get_job(job_id)
+    if job is None:
+        return {"error": "Unknown job"}, 404
+    data = job.to_dict()
+    if job.status == "queued":
+        data["queue_position"] = job_manager.queue_positions().get(job.id)
+    return data
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    job = get_job(job_id)
+    if job is None:
+        return {"error": "Unknown job"}, 404
+    if job.status != "done":
+        return {"error": f"Job is {job.status}", "status": job.status}, 409
+
+    def entries():
+        if lazy_reports(job):
+            # Reports nobody has opened yet are rendered while the archive streams.
+            yield from iter_report_files(job.job_dir)
+        else:
+            yield from ((name, job.job_dir / name) for name in job.state.get("reports", []))
+        yield SUMMARY_CSV_NAME, job.job_dir / job.state["result"]
+        if (job.job_dir / TIMINGS_FILE).exists():
+            yield TIMINGS_FILE, job.job_dir / TIMINGS_FILE
+
+    return zip_response(iter_zip(entries()))
+
+@app.route('/jobs/<job_id>/results', methods=['GET'])
+def job_results(job_id):
+    """The summary table of a finished job as JSON ({"columns", "data"}), read from results.json."""
+    job = get_job(job_id)
+    if job is None:
+        return {"error": "Unknown job"}, 404
+    if job.status != "done":
+        return {"error": f"Job is {job.status}", "status": job.status}, 409
+    if not (job.job_dir / RESULTS_FILE_NAME).exists():
+        return {"error": "This job has no results table; run it again to create one"}, 404
+    return send_file(job.job_dir / RESULTS_FILE_NAME, mimetype="application/json")
+
+@app.route('/jobs/<job_id>/reports/<name>', methods=['GET'])
+def job_report(job_id, name):
+    """One student's PDF report (`name` is the submitted file name), rendered on first request."""
+    job = get_job(job_id)
+    if job is None:
+        return {"error": "Unknown job"}, 404
+    if job.status != "done":
+        return {"error": f"Job is {job.status}", "status": job.status}, 409
+    try:
+        pdf_path = ensure_report(job.job_dir, name)
+    except KeyError:
+        return {"error": f"No submission named {name}"}, 404
+    except RuntimeError as e:
+        return {"error": f"Report could not be rendered: {e}"}, 500
+    return send_file(pdf_path, mimetype="application/pdf", download_name=pdf_path.name)
+
+@app.route('/jobs/<job_id>/bundle', methods=['GET'])
+def job_bundle(job_id):
+    """The job's replay bundle as a ZIP, for `python backend/replay.py run`."""
+    job = get_job(job_id)
+    if job is None:
+        return {"error": "Unknown job"}, 404
+    if job.status != "done":
+        return {"error": f"Job is {job.status}", "status": job.status}, 409
+    entries = replay.bundle_entries(job.job_dir)
+    if not entries:
+        return {"error": "This job was not recorded; send record=1 with the job"}, 404
+    return Response(stream_with_context(iter_zip(entries)), mimetype="application/zip",
+                    headers={"Content-Disposition": f"attachment; filename=replay_{job.id}.zip"})
+
+@app.route('/jobs/<job_id>/summary', methods=['GET'])
+def job_summary(job_id):
+    """Summary table of a finished job as ?format=csv (default), parquet or xlsx."""
+    job = get_job(job_id)
+    if job is None:
+        return {"error": "Unknown job"}, 404
+    if job.status != "done":
+        return {"error": f"Job is {job.status}", "status": job.status}, 409
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in scoring.SUMMARY_FORMATS:
+        return {"error": f"Unknown format {fmt}; use one of {', '.join(scoring.SUMMARY_FORMATS)}"}, 400
+    try:
+        data = scoring.summary_bytes(scoring.build_table(load_state(job.job_dir)), fmt)
+    except ValueError as e:
+        return {"error": str(e)}, 501
+    return Response(data, mimetype=scoring.SUMMARY_FORMATS[fmt],
+                    headers={"Content-Disposition": f"attachment; filename=summary_report.{fmt}"})
+
+@app.route('/jobs/<job_id>/submissions', methods=['POST'])
+def add_submissions(job_id):
+    """Adds a ZIP of late submissions to a finished job; only the new parts are analyzed."""
+    job = get_job(job_id)
+    if job is None:
+        return {"error": "Unknown job"}, 404
+    # Held from the status check until the late run is queued, so a second
+    # upload cannot take the same archive name or start a run on the same state.
+    if not job_manager.hold(job.id):
+        if job.status == "done":
+            return {"error": "Job is busy with another upload or storage maintenance; try again shortly",
+                    "status": job.status}, 409
+        return {"error": f"Job is {job.status}; late submissions can be added once it is done",
+                "status": job.status}, 409
+    try:
+        if job.status != "done":
+            return {"error": f"Job is {job.status}; late submissions can be added once it is done",
+                    "status": job.status}, 409
+        late_zips = job.state["inputs"].get("late_zips", [])
+        zip_path = save_upload(request.files['student_zip'],
+                               job.job_dir / f"late_submissions_{len(late_zips) + 1}.zip")
         try:
-            s_data = get_analysis_data(s_path, job_dir)
-            
-            # Check if analysis succeeded
-            if s_data.get('status') != 'Success':
-                print(f"  WARNING: Analysis failed for {s_path.name}")
-                print(f"  Error: {s_data.get('error', 'Unknown error')}")
-                # Still add it with 0 volume so it appears in the report
-            
-            full_signature = s_data.get("signature", [])
-            student_volume = s_data.get("volume_mm3", 0.0)
-            student_gdt_data = s_data.get("gdt_data", {})
-            
-            # Check if base was modified
-            base_modified = not (len(full_signature) >= len(base_signature) and 
-                               full_signature[:len(base_signature)] == base_signature)
-            delta = full_signature[len(base_signature):] if not base_modified else full_signature
-            
-            # Volume deviation
-            volume_dev = abs(student_volume - master_volume) / master_volume * 100 if master_volume > 0 else 0
-            
-            print(f"\n*** VOLUME COMPARISON ***")
-            print(f"  Master Volume: {master_volume:.2f} mm^3")
-            print(f"  Student Volume: {student_volume:.2f} mm^3")
-            print(f"  Difference: {abs(student_volume - master_volume):.2f} mm^3")
-            print(f"  Deviation: {volume_dev:.4f}%")
-            print(f"{'*'*30}")
-            
-            # Detailed GD&T comparison
-            gdt_comparison = compare_gdt(master_gdt_data, student_gdt_data)
-            print(f"  GD&T Score: {gdt_comparison['score']}% ({gdt_comparison['status']})")
-            if gdt_comparison['missing_count'] > 0:
-                print(f"  Missing {gdt_comparison['missing_count']} GD&T annotations")
-            
-            student_analysis_data[s_path.name] = {
-                "delta": delta,
-                "base_modified": base_modified,
-                "volume_deviation_percent": volume_dev,
-                "student_volume_mm3": student_volume,
-                "gdt_comparison": gdt_comparison,
-                "analysis_error": s_data.get('error', '')
-            }
-            
-        except Exception as e:
-            print(f"  CRITICAL ERROR analyzing {s_path.name}: {e}")
-            import traceback
-            traceback.print_exc()
-            
-            # Add failed entry
-            student_analysis_data[s_path.name] = {
-                "delta": [],
-                "base_modified": False,
-                "volume_deviation_percent": 0.0,
-                "student_volume_mm3": 0.0,
-                "gdt_comparison": {
-                    "status": "Failed",
-                    "score": 0,
-                    "total_required": 0,
-                    "total_found": 0,
-                    "matching_count": 0,
-                    "missing_count": 0,
-                    "extra_count": 0,
-                    "missing_annotations": [],
-                    "extra_annotations": [],
-                    "details": {}
-                },
-                "analysis_error": str(e)
-            }
-    
-    # 4. Plagiarism Logic (unchanged)
-    plagiarism_results = {name: {"is_plagiarised": False, "copied_from": []} 
-                         for name in student_analysis_data.keys()}
-    delta_groups = defaultdict(list)
-    for name, data in student_analysis_data.items():
-        delta = data["delta"]
-        if len(delta) > PLAGIARISM_COMPLEXITY_THRESHOLD:
-            delta_str = json.dumps(delta, sort_keys=True)
-            delta_hash = hashlib.md5(delta_str.encode()).hexdigest()
-            delta_groups[delta_hash].append(name)
-            
-    for group in delta_groups.values():
-        if len(group) > 1:
-            for member_name in group:
-                plagiarism_results[member_name]["is_plagiarised"] = True
-                plagiarism_results[member_name]["copied_from"].extend(
-                    [other for other in group if other != member_name])
-
-    # 5. Generate Reports and CSV
-    pdf_paths, csv_data = [], []
-    for s_path in student_paths:
-        analysis_data = {
-            "student_file": s_path.name,
-            "master_volume_mm3": master_volume,
-            **student_analysis_data[s_path.name]
-        }
-        plagiarism_info = plagiarism_results[s_path.name]
-        plagiarism_info["copied_from"] = sorted(list(set(plagiarism_info["copied_from"])))
-
-        output_pdf_path = job_dir / f"{s_path.stem}_report.pdf"
-        report_generator.create_report(analysis_data, plagiarism_info, output_pdf_path)
-        pdf_paths.append(output_pdf_path)
-        
-        stem = s_path.stem
-        parts = stem.split('_', 1)
-        reg_num, part_name = parts if len(parts) == 2 else ("N/A", stem)
-        
-        gdt_comp = analysis_data['gdt_comparison']
-        analysis_err = analysis_data.get('analysis_error', '')
-        
-        csv_data.append({
-            "Register Number": reg_num,
-            "Part Name": part_name,
-            "Volume Deviation (%)": f"{analysis_data['volume_deviation_percent']:.4f}",
-            "Accuracy Grade": report_generator.get_accuracy_grade(
-                analysis_data['volume_deviation_percent']),
-            "GD&T Score (%)": gdt_comp['score'],
-            "GD&T Status": gdt_comp['status'],
-            "Missing GD&T": gdt_comp['missing_count'],
-            "Plagiarism Flag": "YES" if plagiarism_info['is_plagiarised'] else "NO",
-            "Errors": "FAILED: " + analysis_err if analysis_err else "OK"
-        })
-
-    # 6. Create final ZIP package
-    summary_csv_path = job_dir / "summary_report.csv"
-    pd.DataFrame(csv_data).to_csv(summary_csv_path, index=False)
-    final_zip_path = job_dir / "assessment_reports.zip"
-    with zipfile.ZipFile(final_zip_path, 'w') as zf:
-        for pdf_path in pdf_paths:
-            zf.write(pdf_path, arcname=pdf_path.name)
-        zf.write(summary_csv_path, arcname=summary_csv_path.name)
-    
-    print(f"\n{'='*60}")
-    print(f"ANALYSIS COMPLETE - Reports generated")
-    print(f"{'='*60}\n")
-    
-    return send_file(final_zip_path, as_attachment=True)
+            scan_archive(zip_path)
+        except IngestError:
+            zip_path.unlink()
+            raise
+        job.state["inputs"]["late_zips"] = late_zips + [zip_path.name]
+        job_manager.submit(job, functools.partial(run_late_submissions, zip_name=zip_path.name))
+    finally:
+        job_manager.unhold(job.id)
+    return {"job_id": job.id, "status": job.status, "added": zip_path.name}, 202
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return result_cache.stats()
+
+@app.route('/storage', methods=['GET'])
+def storage_stats():
+    """Jobs kept on disk, bytes used (hard-linked files counted once) and the retention policy."""
+    return {**job_storage.stats(), "max_age_days": job_storage.max_age_days, "max_jobs": job_storage.max_jobs,
+            "max_bytes": job_storage.max_bytes}
+
+@app.route('/scheduler', methods=['GET'])
+def scheduler_status():
+    """CAD worker slots in use, parts queued per job and the jobs waiting to start."""
+    positions = job_manager.queue_positions()
+    return {
+        "workers": get_worker_pool().stats(),
+        "jobs": [{"job_id": job.id, "owner": job.owner, "priority": job.state["inputs"].get("priority", "normal"),
+                  "status": job.status, "queue_position": positions.get(job.id)}
+                 for job in job_manager.active()]
+    }
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Stage, worker-step and archive timings plus job and part counters, in Prometheus text format."""
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+# Jobs running at once; they share the WORKER_POOL_SIZE CAD workers fairly.
+job_manager = JobManager(PROCESSING_DIR, run_assessment,
+                         max_workers=int(os.environ.get("JOB_CONCURRENCY", "4")))
+# Retention of finished jobs (JOB_RETENTION_DAYS / _COUNT, JOB_STORAGE_QUOTA_MB); active jobs are never removed.
+job_storage = JobStorage(PROCESSING_DIR, active=lambda: {job.id for job in job_manager.active()},
+                         claim=job_manager.release, hold=job_manager.hold, unhold=job_manager.unhold)
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    host, port = os.environ.get("HOST", "0.0.0.0"), int(os.environ.get("PORT", "5000"))
+    if os.environ.get("FLASK_DEBUG") == "1":
+        # The reloader runs this block in a parent and a child process;
+        # only the child serves requests, so only it resumes jobs.
+        if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+            resume_assignments()
+            job_manager.recover()
+            job_storage.start()
+        app.run(host=host, port=port, debug=True)
+    else:
+        from waitress import serve
+        resume_assignments()
+        job_manager.recover()
+        job_storage.start()
+        serve(app, host=host, port=port, threads=int(os.environ.get("HTTP_THREADS", "16")))
@@ -0,0 +1,146 @@
+# backend/assignments.py
+"""
+Persistent assignment registry.
+
+An assignment is a faculty master part that is uploaded and analyzed once
+and then used by every section and re-run of the assignment. Each one is a
+directory under `root` holding the part and assignment.json: its name, the
+part's SHA-256, its status ("analyzing", "ready" or "failed") and, once
+ready, the worker result and the master record students are scored
+against. Jobs name an `assignment_id` instead of uploading the master, so
+they start with the master record in hand instead of waiting for the part
+to be analyzed.
+"""
+import json
+import os
+import re
+import secrets
+import shutil
+import threading
+import time
+from pathlib import Path
+
+ASSIGNMENT_FILE = "assignment.json"
+
+
+class AssignmentError(Exception):
+    """An assignment cannot be used; the message is safe to show the user."""
+
+
+class UnknownAssignmentError(AssignmentError):
+    """No assignment with this id (never registered or deleted)."""
+
+
+class AssignmentNotReadyError(AssignmentError):
+    """The assignment's master is still being analyzed, or its analysis failed."""
+
+
+def summary(entry):
+    """An assignment without its worker result and master record, for listings."""
+    master = entry.get("master") or {}
+    return {
+        "assignment_id": entry["assignment_id"],
+        "name": entry["name"],
+        "master_file": entry["master_file"],
+        "status": entry["status"],
+        "error": entry.get("error", ""),
+        "created": entry["created"],
+        "analyzed": entry.get("analyzed"),
+        "base_features": len(master.get("signature", [])),
+        "gdt_annotations": len(master.get("gdt_data", {}).get("combined_signature", [])),
+        "volume_mm3": master.get("volume_mm3")
+    }
+
+
+class AssignmentRegistry:
+    def __init__(self, root):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+
+    def _dir(self, assignment_id):
+        if not re.fullmatch(r"[0-9a-f]{16}", assignment_id or ""):
+            raise UnknownAssignmentError(f"Unknown assignment {assignment_id}")
+        assignment_dir = self.root / assignment_id
+        if not (assignment_dir / ASSIGNMENT_FILE).exists():
+            raise UnknownAssignmentError(f"Unknown assignment {assignment_id}")
+        return assignment_dir
+
+    def _write(self, entry):
+        path = self.root / entry["assignment_id"] / ASSIGNMENT_FILE
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    def get(self, assignment_id):
+        with open(self._dir(assignment_id) / ASSIGNMENT_FILE, 'r') as f:
+            return json.load(f)
+
+    def entries(self):
+        """Every registered assignment, oldest first."""
+        if not self.root.exists():
+            return []
+        entries = []
+        for path in self.root.glob(f"*/{ASSIGNMENT_FILE}"):
+            try:
+                with open(path, 'r') as f:
+                    entries.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # being deleted
+        return sorted(entries, key=lambda entry: entry["created"])
+
+    def master_path(self, assignment_id):
+        return self._dir(assignment_id) / self.get(assignment_id)["master_file"]
+
+    def create(self, name, source_path, file_name, master_sha256):
+        """
+        Registers the part at `source_path` (moved into the registry as
+        `file_name`) under `name`. The same part registered again under the
+        same name returns the existing assignment unless its analysis
+        failed. Returns (entry, created).
+        """
+        with self._lock:
+            for entry in self.entries():
+                if (entry["name"] == name and entry["master_sha256"] == master_sha256
+                        and entry["status"] != "failed"):
+                    Path(source_path).unlink(missing_ok=True)
+                    return entry, False
+            assignment_id = secrets.token_hex(8)
+            assignment_dir = self.root / assignment_id
+            assignment_dir.mkdir(parents=True)
+            shutil.move(str(source_path), assignment_dir / file_name)
+            entry = {"assignment_id": assignment_id, "name": name, "master_file": file_name,
+                     "master_sha256": master_sha256, "status": "analyzing", "created": time.time()}
+            self._write(entry)
+            return entry, True
+
+    def complete(self, assignment_id, analysis, master):
+        """Stores the worker result and the master record of an analyzed part."""
+        with self._lock:
+            entry = self.get(assignment_id)
+            entry.update(status="ready", error="", analyzed=time.time(), analysis=analysis, master=master)
+            self._write(entry)
+
+    def fail(self, assignment_id, error):
+        with self._lock:
+            entry = self.get(assignment_id)
+            entry.update(status="failed", error=error, analyzed=time.time())
+            self._write(entry)
+
+    def master(self, assignment_id):
+        """The entry of an assignment whose master is ready to score students against."""
+        entry = self.get(assignment_id)
+        if entry["status"] == "analyzing":
+            raise AssignmentNotReadyError(f"The master of {entry['name']} is still being analyzed")
+        if entry["status"] != "ready":
+            raise AssignmentNotReadyError(f"The master of {entry['name']} could not be analyzed: "
+                                          f"{entry.get('error') or 'unknown error'}; register it again")
+        return entry
+
+    def pending(self):
+        """Ids of assignments whose analysis has not finished (e.g. interrupted by a restart)."""
+        return [entry["assignment_id"] for entry in self.entries() if entry["status"] == "analyzing"]
+
+    def delete(self, assignment_id):
+        with self._lock:
+            shutil.rmtree(self._dir(assignment_id))
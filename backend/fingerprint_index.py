@@ -0,0 +1,253 @@
+# backend/fingerprint_index.py
+"""
+Persistent cross-cohort plagiarism index.
+
+Every assessed part's delta fingerprint (shingles and MinHash signature) is
+stored in SQLite, tagged with its assignment, semester and job. A cohort
+keeps one row per student submission (submissions.submission_key), so
+running it again, or adding a resubmission, replaces the earlier rows. New
+cohorts are looked up through the LSH band table, which is a clustered
+(band_key, part_id) index, so a lookup touches only the rows that share a
+band with the query instead of scanning past cohorts.
+
+    python backend/fingerprint_index.py stats
+    python backend/fingerprint_index.py prune --semester 2023-S1
+    python backend/fingerprint_index.py prune --older-than-days 730
+"""
+import argparse
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+import similarity
+from submissions import same_student, submission_key
+
+# Candidates whose MinHash estimate falls this far below the threshold are
+# dropped without the exact Jaccard check (estimate std. error is ~0.04).
+ESTIMATE_MARGIN = 0.15
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS parts (
+    id INTEGER PRIMARY KEY,
+    assignment TEXT NOT NULL,
+    semester TEXT NOT NULL,
+    job_id TEXT NOT NULL,
+    student TEXT NOT NULL,
+    student_key TEXT,
+    created REAL NOT NULL,
+    shingles BLOB NOT NULL,
+    signature BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS parts_cohort ON parts (assignment, semester);
+CREATE INDEX IF NOT EXISTS parts_job ON parts (job_id);
+CREATE INDEX IF NOT EXISTS parts_created ON parts (created);
+CREATE TABLE IF NOT EXISTS bands (
+    band_key INTEGER NOT NULL,
+    part_id INTEGER NOT NULL,
+    PRIMARY KEY (band_key, part_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS bands_part ON bands (part_id);
+"""
+# Created after indexes from before student_key existed are migrated.
+STUDENT_INDEX = "CREATE INDEX IF NOT EXISTS parts_student ON parts (assignment, semester, student_key)"
+
+
+def _pack(shingles):
+    return np.array(sorted(shingles), dtype=np.uint32).tobytes()
+
+
+def _unpack(blob):
+    return set(np.frombuffer(blob, dtype=np.uint32).tolist())
+
+
+class FingerprintIndex:
+    def __init__(self, path, hasher=None):
+        self.path = Path(path)
+        self.hasher = hasher or similarity.MinHasher()
+        self._write_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            if "student_key" not in [row[1] for row in conn.execute("PRAGMA table_info(parts)")]:
+                conn.execute("ALTER TABLE parts ADD COLUMN student_key TEXT")
+            conn.executemany("UPDATE parts SET student_key = ? WHERE id = ?",
+                             [(submission_key(student), part_id) for part_id, student in
+                              conn.execute("SELECT id, student FROM parts WHERE student_key IS NULL").fetchall()])
+            conn.execute(STUDENT_INDEX)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def add_cohort(self, assignment, semester, job_id, deltas, replace=True):
+        """
+        Stores {student: delta} for one job. Earlier rows of the same
+        submissions in this assignment and semester (from a previous run of
+        the cohort, or an earlier version of a resubmitted part) are
+        replaced. With `replace`, all of the job's existing rows are dropped
+        first as well.
+        """
+        names, shingle_sets, signatures = similarity.fingerprint(deltas, self.hasher)
+        keys = similarity.band_hashes(signatures) if names else []
+        now = time.time()
+        with self._write_lock, self._connect() as conn:
+            if replace:
+                self._delete(conn, "job_id = ?", (job_id,))
+            for name, shingles, signature, band_keys in zip(names, shingle_sets, signatures, keys):
+                key = submission_key(name)
+                self._delete(conn, "assignment = ? AND semester = ? AND student_key = ?", (assignment, semester, key))
+                part_id = conn.execute(
+                    "INSERT INTO parts (assignment, semester, job_id, student, student_key, created, shingles, "
+                    "signature) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (assignment, semester, job_id, name, key, now, _pack(shingles), signature.tobytes())).lastrowid
+                conn.executemany("INSERT OR IGNORE INTO bands (band_key, part_id) VALUES (?, ?)",
+                                 [(int(key), part_id) for key in band_keys])
+        return len(names)
+
+    def query(self, deltas, threshold=0.6, assignment=None, exclude_job=None, limit=5, semester=None, cohort=()):
+        """
+        Looks up {student: delta} against past cohorts.
+        Returns {student: [match, ...]} ranked by exact Jaccard score, where
+        each match is a dict with assignment, semester, job_id, file and
+        similarity. Only students with at least one match are included.
+        A student's own submissions never match. With the querying cohort's
+        `semester` and the file names in it (`cohort`), the rows that the
+        cohort replaces when it is added (an earlier run of it) are skipped.
+        """
+        names, shingle_sets, signatures = similarity.fingerprint(deltas, self.hasher)
+        if not names:
+            return {}
+        keys = similarity.band_hashes(signatures)
+        with self._connect() as conn:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS query_bands (query_idx INTEGER, band_key INTEGER)")
+            conn.execute("DELETE FROM query_bands")
+            conn.executemany("INSERT INTO query_bands VALUES (?, ?)",
+                             [(idx, int(key)) for idx, row in enumerate(keys) for key in row])
+            # Band collisions come straight off the (band_key, part_id) key;
+            # part rows are only read once per distinct candidate.
+            pairs = conn.execute("SELECT DISTINCT q.query_idx, b.part_id FROM query_bands q "
+                                 "JOIN bands b ON b.band_key = q.band_key").fetchall()
+            sql = "SELECT id, signature FROM parts WHERE id IN (SELECT value FROM json_each(?))"
+            params = [json.dumps(sorted({part_id for _, part_id in pairs}))]
+            if assignment is not None:
+                sql += " AND assignment = ?"
+                params.append(assignment)
+            if exclude_job is not None:
+                sql += " AND job_id != ?"
+                params.append(exclude_job)
+            if semester is not None and cohort:
+                sql += (" AND NOT (assignment IS ? AND semester = ? AND student_key IN "
+                        "(SELECT value FROM json_each(?)))")
+                params += [assignment, semester, json.dumps(sorted({submission_key(name) for name in cohort}))]
+            candidate_signatures = {part_id: np.frombuffer(blob, dtype=signatures.dtype)
+                                    for part_id, blob in conn.execute(sql, params)}
+            pairs = [(idx, part_id) for idx, part_id in pairs if part_id in candidate_signatures]
+            if not pairs:
+                return {}
+
+            # Drop pairs whose MinHash estimate is far below the threshold
+            # before fetching shingles for the exact check.
+            query_idx = np.array([idx for idx, _ in pairs])
+            stored = np.stack([candidate_signatures[part_id] for _, part_id in pairs])
+            estimates = (signatures[query_idx] == stored).mean(axis=1)
+            pairs = [pair for pair, estimate in zip(pairs, estimates) if estimate >= threshold - ESTIMATE_MARGIN]
+            parts = {row[0]: row[1:] for row in conn.execute(
+                "SELECT id, assignment, semester, job_id, student, shingles FROM parts "
+                "WHERE id IN (SELECT value FROM json_each(?))",
+                [json.dumps(sorted({part_id for _, part_id in pairs}))])}
+
+        results = {}
+        for idx, part_id in pairs:
+            part_assignment, part_semester, job_id, student, blob = parts[part_id]
+            if same_student(names[idx], student):
+                continue
+            score = similarity.jaccard(shingle_sets[idx], _unpack(blob))
+            if score >= threshold:
+                results.setdefault(names[idx], []).append({
+                    "assignment": part_assignment, "semester": part_semester, "job_id": job_id,
+                    "file": student, "similarity": round(score, 4)
+                })
+        for matches in results.values():
+            matches.sort(key=lambda m: (-m["similarity"], m["semester"], m["file"]))
+            del matches[limit:]
+        return results
+
+    def _delete(self, conn, where, params):
+        ids = [row[0] for row in conn.execute(f"SELECT id FROM parts WHERE {where}", params)]
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            marks = ",".join("?" * len(chunk))
+            conn.execute(f"DELETE FROM bands WHERE part_id IN ({marks})", chunk)
+            conn.execute(f"DELETE FROM parts WHERE id IN ({marks})", chunk)
+        return len(ids)
+
+    def prune(self, assignment=None, semester=None, job_id=None, older_than_days=None):
+        """Deletes matching cohorts. At least one filter is required."""
+        clauses, params = [], []
+        for column, value in (("assignment", assignment), ("semester", semester), ("job_id", job_id)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if older_than_days is not None:
+            clauses.append("created < ?")
+            params.append(time.time() - older_than_days * 86400)
+        if not clauses:
+            raise ValueError("prune needs at least one filter")
+        with self._write_lock, self._connect() as conn:
+            removed = self._delete(conn, " AND ".join(clauses), params)
+        with self._connect() as conn:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return removed
+
+    def stats(self):
+        with self._connect() as conn:
+            cohorts = conn.execute(
+                "SELECT assignment, semester, COUNT(DISTINCT job_id), COUNT(*) FROM parts "
+                "GROUP BY assignment, semester ORDER BY semester, assignment").fetchall()
+            total = conn.execute("SELECT COUNT(*) FROM parts").fetchone()[0]
+        return {
+            "parts": total,
+            "cohorts": [{"assignment": a, "semester": s, "jobs": j, "parts": n} for a, s, j, n in cohorts]
+        }
+
+
+def main():
+    import os
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index", default=os.environ.get(
+        "FINGERPRINT_INDEX_PATH", Path(__file__).resolve().parent.parent / "fingerprints.sqlite3"))
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="list indexed cohorts")
+    prune = commands.add_parser("prune", help="delete old cohorts")
+    prune.add_argument("--assignment")
+    prune.add_argument("--semester")
+    prune.add_argument("--job-id")
+    prune.add_argument("--older-than-days", type=float)
+    args = parser.parse_args()
+
+    index = FingerprintIndex(args.index)
+    if args.command == "stats":
+        stats = index.stats()
+        print(f"{stats['parts']} parts indexed")
+        for cohort in stats["cohorts"]:
+            print(f"  {cohort['semester']:<12} {cohort['assignment']:<30} "
+                  f"{cohort['jobs']:>4} jobs {cohort['parts']:>7} parts")
+    else:
+        if not any([args.assignment, args.semester, args.job_id, args.older_than_days is not None]):
+            parser.error("prune needs --assignment, --semester, --job-id or --older-than-days")
+        removed = index.prune(args.assignment, args.semester, args.job_id, args.older_than_days)
+        print(f"Removed {removed} parts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+# backend/gdt_engine.py
+"""
+Batched GD&T comparison.
+
+The master's annotation vocabulary is interned once per job; each student
+becomes a boolean row over it, so matching / missing / extra counts, scores
+and statuses for a whole cohort are a few NumPy operations. Annotation lists
+are only materialized when a report needs them: compact comparisons keep a
+hex bitmask of the missing master annotations instead of the list. The
+per-student dicts are built only when asked for, in one pass by
+`GDTBatch.compacts()`.
+
+`GDTBatch.comparison(i)` and `GDTEngine.expand` return exactly what the
+per-student reference compare_gdt in tests/gdt_reference.py returns for
+the same inputs (tests/test_gdt_engine.py checks this).
+"""
+from itertools import chain, repeat
+
+import numpy as np
+
+STATUSES = np.array([
+    "N/A (No GD&T in master)",
+    "Extra annotations present",
+    "Missing (No GD&T)",
+    "Partial match (missing some, has extra)",
+    "Incomplete (missing annotations)",
+    "Complete with extras",
+    "Perfect match"
+], dtype=object)
+DETAIL_KEYS = [("fcf", "feature_control_frames"), ("dimxpert", "dimxpert_annotations"), ("datums", "datums")]
+
+
+class GDTEngine:
+    def __init__(self, master_gdt_data):
+        # Sorted, so missing annotations come out in compare_gdt's order without a sort.
+        self.vocabulary = sorted(set(master_gdt_data.get("combined_signature", [])))
+        self.index = {annotation: idx for idx, annotation in enumerate(self.vocabulary)}
+        self.master_details = {name: len(master_gdt_data.get(key, [])) for name, key in DETAIL_KEYS}
+
+    def compare_batch(self, student_gdt_datas):
+        """Compares every student's gdt_data against the master in one pass."""
+        return GDTBatch(self, list(student_gdt_datas))
+
+    def details(self, student_counts):
+        """compare_gdt's details from a student's [fcf, dimxpert, datums] counts."""
+        details = {}
+        for (name, _), count in zip(DETAIL_KEYS, student_counts):
+            details[f"master_{name}"] = self.master_details[name]
+            details[f"student_{name}"] = count
+        return details
+
+    def expand(self, comparison):
+        """Full compare_gdt result from a compact comparison (a full one is returned as is)."""
+        if "missing_mask" not in comparison:
+            return comparison
+        required, missing, extra = len(self.vocabulary), comparison["missing_count"], comparison["extra"]
+        mask = int(comparison["missing_mask"], 16)
+        details = comparison["details"]
+        return {
+            "status": comparison["status"],
+            "score": comparison["score"],
+            "total_required": required,
+            "total_found": comparison["total_found"],
+            "matching_count": required - missing,
+            "missing_count": missing,
+            "extra_count": len(extra),
+            "missing_annotations": [annotation for idx, annotation in enumerate(self.vocabulary)
+                                    if mask >> idx & 1],
+            "extra_annotations": sorted(extra),
+            # Compact comparisons stored by earlier versions carry the full details dict.
+            "details": details if isinstance(details, dict) else self.details(details)
+        }
+
+
+class GDTBatch:
+    def __init__(self, engine, student_gdt_datas):
+        self.engine = engine
+        self.gdt_datas = student_gdt_datas
+        count, size = len(student_gdt_datas), len(engine.vocabulary)
+        signatures = [gdt_data.get("combined_signature", []) for gdt_data in student_gdt_datas]
+        lengths = np.fromiter(map(len, signatures), dtype=np.intp, count=count)
+        # One pass over every annotation of the cohort; column `size` collects
+        # annotations outside the master vocabulary.
+        codes = np.fromiter(map(engine.index.get, chain.from_iterable(signatures), repeat(size)),
+                            dtype=np.intp, count=int(lengths.sum()))
+        present = np.zeros((count, size + 1), dtype=bool)
+        present[np.repeat(np.arange(count), lengths), codes] = True
+        self.present = present[:, :size]
+        self.matching = self.present.sum(axis=1)
+
+        # Only students with unknown annotations need their extras as strings.
+        found = self.matching.copy()
+        self.extras = {}
+        for row in np.flatnonzero(present[:, size]).tolist():
+            extras = [annotation for annotation in set(signatures[row]) if annotation not in engine.index]
+            self.extras[row] = extras
+            found[row] += len(extras)
+
+        self.total_found = found
+        self.missing = size - self.matching
+        self.extra = self.total_found - self.matching
+
+        no_master = np.full(count, size == 0)
+        no_student = self.total_found == 0
+        status = np.select(
+            [no_master & no_student, no_master, no_student,
+             (self.missing > 0) & (self.extra > 0), self.missing > 0, self.extra > 0],
+            [0, 1, 2, 3, 4, 5], default=6)
+        self.status_codes = status
+        if size:
+            # (matching / required) * 100, the same float operations as compare_gdt
+            partial = self.matching / size * 100
+        else:
+            partial = np.zeros(count)
+        self.raw_scores = np.where((status == 3) | (status == 4), partial,
+                                   np.where(status == 1, 50.0, np.where(status == 2, 0.0, 100.0)))
+        self._columns = None
+
+    def __len__(self):
+        return len(self.total_found)
+
+    def _rows(self):
+        """Per-row Python values, converted from the arrays once."""
+        if self._columns is None:
+            size = self.present.shape[1]
+            if size < 64:
+                # Each row's mask fits one integer: a single product instead of bytes per row.
+                weights = np.left_shift(np.uint64(1), np.arange(size, dtype=np.uint64))
+                masks = list(map(hex, ((~self.present).astype(np.uint64) @ weights).tolist()))
+            else:
+                masks = [hex(int.from_bytes(mask, "little"))
+                         for mask in map(bytes, np.packbits(~self.present, axis=1, bitorder="little"))]
+            self._columns = {
+                "status": STATUSES[self.status_codes].tolist(),
+                # Python's round, so halves round exactly as in compare_gdt
+                "score": [round(score, 2) for score in self.raw_scores.tolist()],
+                "total_found": self.total_found.tolist(),
+                "missing_count": self.missing.tolist(),
+                "missing_mask": masks
+            }
+        return self._columns
+
+    def _counts(self, row):
+        columns = self._rows()
+        return {
+            "status": columns["status"][row],
+            "score": columns["score"][row],
+            "total_required": len(self.engine.vocabulary),
+            "total_found": columns["total_found"][row],
+            "matching_count": int(self.matching[row]),
+            "missing_count": columns["missing_count"][row],
+            "extra_count": int(self.extra[row])
+        }
+
+    def _student_details(self, row):
+        gdt_data = self.gdt_datas[row]
+        return [len(gdt_data.get(key, [])) for _, key in DETAIL_KEYS]
+
+    def missing_annotations(self, row, limit=None):
+        missing = np.flatnonzero(~self.present[row])[:limit]
+        return [self.engine.vocabulary[idx] for idx in missing]
+
+    def compact(self, row):
+        """
+        What reports and the score table need to rebuild compare_gdt's result
+        (GDTEngine.expand): status, score, found and missing counts, a hex
+        bitmask of the missing master annotations, the extras and the
+        student's [fcf, dimxpert, datums] counts.
+        """
+        columns = self._rows()
+        return {
+            "status": columns["status"][row],
+            "score": columns["score"][row],
+            "total_found": columns["total_found"][row],
+            "missing_count": columns["missing_count"][row],
+            "missing_mask": columns["missing_mask"][row],
+            "extra": self.extras.get(row, []),
+            "details": self._student_details(row)
+        }
+
+    def compacts(self):
+        """Yields compact(row) for every row in order, each built only when it is consumed."""
+        columns, extras = self._rows(), self.extras
+        detail_keys = [key for _, key in DETAIL_KEYS]
+        rows = zip(columns["status"], columns["score"], columns["total_found"], columns["missing_count"],
+                   columns["missing_mask"], self.gdt_datas)
+        for row, (status, score, found, missing, mask, gdt_data) in enumerate(rows):
+            yield {
+                "status": status,
+                "score": score,
+                "total_found": found,
+                "missing_count": missing,
+                "missing_mask": mask,
+                "extra": extras.get(row, []),
+                "details": [len(gdt_data.get(key, [])) for key in detail_keys]
+            }
+
+    def comparison(self, row):
+        """The full compare_gdt result for one student."""
+        comparison = self._counts(row)
+        comparison["missing_annotations"] = self.missing_annotations(row)
+        comparison["extra_annotations"] = sorted(self.extras.get(row, []))
+        comparison["details"] = self.engine.details(self._student_details(row))
+        return comparison
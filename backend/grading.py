@@ -0,0 +1,114 @@
+# backend/grading.py
+"""
+Grade scale shared by the score table and the PDF reports. Every function
+takes scalars or whole columns (NumPy arrays).
+"""
+import json
+import os
+
+import numpy as np
+
+# Grade scale. Accuracy grades are upper bounds on the volume deviation (%),
+# GD&T grades and overall labels are lower bounds on the score. Override any
+# key with a JSON file named by GRADING_CONFIG.
+DEFAULT_GRADING = {
+    "accuracy_grades": [[0.5, "A+"], [1.5, "A"], [3.0, "B"], [5.0, "C"]],
+    "accuracy_fail_grade": "F",
+    "gdt_grades": [[95, "A+"], [90, "A"], [80, "B"], [70, "C"]],
+    "gdt_fail_grade": "F",
+    "overall_labels": [[90, "Excellent"], [75, "Good"], [60, "Satisfactory"]],
+    "overall_fail_label": "Needs Improvement",
+    # Report bands: these accuracy grades are marked [PASS] and these overall
+    # labels are shown in green; the fail grade / label is [FAIL] / red and
+    # everything in between [WARNING] / orange. GD&T scores from the top GD&T
+    # grade bound up are [PASS].
+    "accuracy_pass_grades": ["A+", "A"],
+    "overall_pass_labels": ["Excellent", "Good"],
+    "accuracy_weight": 0.6,
+    "gdt_weight": 0.4,
+    "deviation_penalty": 10.0  # accuracy points lost per 1% volume deviation
+}
+
+
+def load_grading(path=None):
+    grading = dict(DEFAULT_GRADING)
+    if path:
+        with open(path, 'r') as f:
+            grading.update(json.load(f))
+    return grading
+
+
+GRADING = load_grading(os.environ.get("GRADING_CONFIG"))
+
+
+def _upper_bound_grades(values, scale, fail):
+    """Label of the first bound >= value; `fail` above the last bound."""
+    bounds = np.array([bound for bound, _ in scale], dtype=float)
+    labels = np.array([label for _, label in scale] + [fail], dtype=object)
+    return labels[np.searchsorted(bounds, values, side="left")]
+
+
+def _lower_bound_grades(values, scale, fail):
+    """Label of the highest bound <= value; `fail` below the lowest bound."""
+    ordered = sorted(scale)
+    bounds = np.array([bound for bound, _ in ordered], dtype=float)
+    labels = np.array([fail] + [label for _, label in ordered], dtype=object)
+    return labels[np.searchsorted(bounds, values, side="right")]
+
+
+def accuracy_grades(deviations, grading=None):
+    grading = grading or GRADING
+    return _upper_bound_grades(deviations, grading["accuracy_grades"], grading["accuracy_fail_grade"])
+
+
+def gdt_grades(scores, grading=None):
+    grading = grading or GRADING
+    return _lower_bound_grades(scores, grading["gdt_grades"], grading["gdt_fail_grade"])
+
+
+def overall_scores(deviations, gdt_scores, grading=None):
+    grading = grading or GRADING
+    accuracy = 100 - np.minimum(np.asarray(deviations, dtype=float) * grading["deviation_penalty"], 100)
+    return accuracy * grading["accuracy_weight"] + np.asarray(gdt_scores, dtype=float) * grading["gdt_weight"]
+
+
+def overall_labels(scores, grading=None):
+    grading = grading or GRADING
+    return _lower_bound_grades(scores, grading["overall_labels"], grading["overall_fail_label"])
+
+
+def volume_deviations(student_volumes, master_volume):
+    """Absolute deviation from the master volume in percent (0 when the master has no volume)."""
+    if master_volume <= 0:
+        return np.zeros(len(student_volumes))
+    return np.abs(np.asarray(student_volumes, dtype=float) - master_volume) / master_volume * 100
+
+
+def accuracy_grade(deviation):
+    return str(accuracy_grades([deviation])[0])
+
+
+def gdt_grade(score):
+    return str(gdt_grades([score])[0])
+
+
+def accuracy_band(grade, grading=None):
+    """"PASS", "WARNING" or "FAIL" for an accuracy grade, as printed in the reports."""
+    grading = grading or GRADING
+    if grade == grading["accuracy_fail_grade"]:
+        return "FAIL"
+    return "PASS" if grade in grading["accuracy_pass_grades"] else "WARNING"
+
+
+def gdt_pass_score(grading=None):
+    """The GD&T score from which a report shows "[PASS] All GD&T present": the top GD&T grade bound."""
+    grading = grading or GRADING
+    return max(bound for bound, _ in grading["gdt_grades"])
+
+
+def overall_band(label, grading=None):
+    """"PASS", "WARNING" or "FAIL" for an overall label (green, orange or red in the reports)."""
+    grading = grading or GRADING
+    if label == grading["overall_fail_label"]:
+        return "FAIL"
+    return "PASS" if label in grading["overall_pass_labels"] else "WARNING"
@@ -0,0 +1,316 @@
+# backend/ingest.py
+import hashlib
+import json
+import os
+import re
+import secrets
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from pathlib import Path, PurePosixPath
+
+from flask import Request
+
+PART_SUFFIX = ".sldprt"
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Archive limits, checked against the central directory before anything is
+# extracted and again against the bytes actually written.
+MAX_PART_BYTES = int(os.environ.get("INGEST_MAX_PART_MB", "200")) * 1024 * 1024
+MAX_TOTAL_BYTES = int(os.environ.get("INGEST_MAX_TOTAL_MB", "4096")) * 1024 * 1024
+MAX_PARTS = int(os.environ.get("INGEST_MAX_PARTS", "5000"))
+MAX_COMPRESSION_RATIO = float(os.environ.get("INGEST_MAX_RATIO", "100"))
+DISK_HEADROOM_BYTES = 256 * 1024 * 1024
+
+# Resumable uploads: chunk size handed to clients and how long an unfinished upload is kept.
+UPLOAD_CHUNK_BYTES = int(os.environ.get("UPLOAD_CHUNK_MB", "8")) * 1024 * 1024
+UPLOAD_SESSION_TTL = float(os.environ.get("UPLOAD_SESSION_TTL_HOURS", "24")) * 3600
+UPLOAD_STATE_FILE = "upload.json"
+
+
+class IngestError(ValueError):
+    """The uploaded archive was rejected; the message is safe to show the user."""
+
+
+class UnknownUploadError(IngestError):
+    """No upload session with this id (never created, finished or expired)."""
+
+
+class DiskStreamingRequest(Request):
+    """
+    Request whose file uploads are streamed straight into `upload_dir`
+    instead of being spooled in memory, so `save_upload` can rename the file
+    into place without another copy.
+    """
+    upload_dir = None
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        upload_dir = Path(self.upload_dir or tempfile.gettempdir())
+        upload_dir.mkdir(parents=True, exist_ok=True)
+        stream = tempfile.NamedTemporaryFile(dir=upload_dir, prefix="upload_", suffix=".part", delete=False)
+        self.__dict__.setdefault("_upload_paths", []).append(stream.name)
+        return stream
+
+    def cleanup_uploads(self):
+        """Removes streamed uploads that were never saved."""
+        for path in self.__dict__.get("_upload_paths", []):
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+def save_upload(file_storage, dest_path):
+    """Moves an uploaded file to `dest_path`, renaming it if it is already on disk."""
+    stream = file_storage.stream
+    temp_path = getattr(stream, "name", None)
+    if isinstance(temp_path, str) and os.path.exists(temp_path):
+        stream.close()
+        os.replace(temp_path, dest_path)
+    else:
+        file_storage.save(dest_path)
+    return Path(dest_path)
+
+
+class UploadSessions:
+    """
+    Resumable chunked uploads, one directory per session under `root`.
+
+    A session is created with the name and size of each file. Every file is
+    preallocated as `<field>.data` and chunk `i` is written in place at
+    offset i * chunk_size, so the file never has to be reassembled. A chunk
+    is acknowledged (appended to `<field>.chunks`) only once its SHA-256
+    matches the one the client sent and it is flushed to disk; a client that
+    lost its connection asks for the missing chunks and sends only those.
+    `finish` moves the complete files to their destinations with a rename.
+    """
+
+    def __init__(self, root, max_bytes=None, chunk_size=UPLOAD_CHUNK_BYTES, ttl=UPLOAD_SESSION_TTL):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+    def _dir(self, upload_id):
+        if not re.fullmatch(r"[0-9a-f]{32}", upload_id or ""):
+            raise UnknownUploadError(f"Unknown upload {upload_id}")
+        session_dir = self.root / upload_id
+        if not (session_dir / UPLOAD_STATE_FILE).exists():
+            raise UnknownUploadError(f"Unknown upload {upload_id}")
+        return session_dir
+
+    def _received(self, session_dir, field):
+        log_path = session_dir / f"{field}.chunks"
+        if not log_path.exists():
+            return set()
+        with open(log_path, 'r') as f:
+            return {int(line) for line in f if line.strip()}
+
+    def create(self, files, form=None):
+        """
+        Starts a session for `files` ({field: {"name", "size"}}) with the job
+        form fields to use on finish. Returns the session status.
+        """
+        self.expire()
+        if not files:
+            raise IngestError("No files to upload")
+        entries = {}
+        for field, info in files.items():
+            info = info if isinstance(info, dict) else {}
+            name = Path(str(info.get("name", ""))).name
+            size = info.get("size")
+            if not name or not isinstance(size, int) or size <= 0:
+                raise IngestError(f"{field} needs a file name and a size in bytes")
+            entries[field] = {"name": name, "size": size, "chunks": -(-size // self.chunk_size)}
+        total = sum(entry["size"] for entry in entries.values())
+        if self.max_bytes and total > self.max_bytes:
+            raise IngestError(f"Upload is {total} bytes (limit {self.max_bytes})")
+        self.root.mkdir(parents=True, exist_ok=True)
+        if total + DISK_HEADROOM_BYTES > shutil.disk_usage(self.root).free:
+            raise IngestError("Not enough free disk space for the upload")
+
+        upload_id = secrets.token_hex(16)
+        session_dir = self.root / upload_id
+        session_dir.mkdir()
+        for field, entry in entries.items():
+            with open(session_dir / f"{field}.data", 'wb') as f:
+                f.truncate(entry["size"])
+        state = {"upload_id": upload_id, "created": time.time(), "chunk_size": self.chunk_size,
+                 "files": entries, "form": dict(form or {})}
+        with open(session_dir / UPLOAD_STATE_FILE, 'w') as f:
+            json.dump(state, f)
+        return self.status(upload_id)
+
+    def status(self, upload_id):
+        """The session with, per file, the chunks received and the indexes still missing."""
+        session_dir = self._dir(upload_id)
+        with open(session_dir / UPLOAD_STATE_FILE, 'r') as f:
+            state = json.load(f)
+        for field, entry in state["files"].items():
+            received = self._received(session_dir, field)
+            entry["received"] = len(received)
+            entry["missing"] = [index for index in range(entry["chunks"]) if index not in received]
+        state["complete"] = not any(entry["missing"] for entry in state["files"].values())
+        return state
+
+    def write_chunk(self, upload_id, field, index, stream, sha256):
+        """Writes chunk `index` of `field` from a binary stream and acknowledges it if its SHA-256 matches."""
+        session_dir = self._dir(upload_id)
+        with open(session_dir / UPLOAD_STATE_FILE, 'r') as f:
+            state = json.load(f)
+        entry = state["files"].get(field)
+        if entry is None:
+            raise IngestError(f"Upload has no file {field}")
+        if not 0 <= index < entry["chunks"]:
+            raise IngestError(f"Chunk {index} is out of range (0-{entry['chunks'] - 1})")
+        if not sha256:
+            raise IngestError("Chunk checksum missing; send its SHA-256 in X-Chunk-SHA256")
+        offset = index * state["chunk_size"]
+        expected = min(state["chunk_size"], entry["size"] - offset)
+
+        sha = hashlib.sha256()
+        written = 0
+        with open(session_dir / f"{field}.data", 'r+b') as f:
+            f.seek(offset)
+            for piece in iter(lambda: stream.read(COPY_CHUNK_SIZE), b''):
+                written += len(piece)
+                if written > expected:
+                    raise IngestError(f"Chunk {index} is longer than {expected} bytes")
+                sha.update(piece)
+                f.write(piece)
+            if written != expected:
+                raise IngestError(f"Chunk {index} has {written} bytes, expected {expected}")
+            if sha.hexdigest() != sha256.lower():
+                raise IngestError(f"Chunk {index} checksum mismatch; send it again")
+            f.flush()
+            os.fsync(f.fileno())
+        with self._lock, open(session_dir / f"{field}.chunks", 'a') as log:
+            log.write(f"{index}\n")
+        return {"field": field, "index": index, "received": len(self._received(session_dir, field)),
+                "chunks": entry["chunks"]}
+
+    def finish(self, upload_id, destinations):
+        """
+        Moves each complete file to `destinations[field]` and removes the
+        session. Raises IngestError, leaving the session as it is, while
+        chunks are missing.
+        """
+        with self._lock:
+            state = self.status(upload_id)
+            missing = {field: len(entry["missing"]) for field, entry in state["files"].items() if entry["missing"]}
+            if missing:
+                raise IngestError("Upload is incomplete: " + ", ".join(f"{field} is missing {count} chunk(s)"
+                                                                     for field, count in missing.items()))
+            session_dir = self.root / upload_id
+            for field, dest_path in destinations.items():
+                os.replace(session_dir / f"{field}.data", dest_path)
+            shutil.rmtree(session_dir, ignore_errors=True)
+        return state
+
+    def discard(self, upload_id):
+        shutil.rmtree(self._dir(upload_id), ignore_errors=True)
+
+    def expire(self):
+        """Removes sessions that have not received a chunk for `ttl` seconds."""
+        if not self.root.exists():
+            return
+        cutoff = time.time() - self.ttl
+        for session_dir in self.root.iterdir():
+            try:
+                last_change = max(path.stat().st_mtime for path in session_dir.iterdir())
+            except (OSError, ValueError):
+                continue
+            if last_change < cutoff:
+                shutil.rmtree(session_dir, ignore_errors=True)
+
+
+def is_part_member(info):
+    if info.is_dir():
+        return False
+    parts = PurePosixPath(info.filename.replace("\\", "/")).parts
+    if not parts or "__MACOSX" in parts or parts[-1].startswith("._"):
+        return False
+    return parts[-1].lower().endswith(PART_SUFFIX)
+
+
+def scan_archive(zip_path):
+    """
+    Validates the archive's central directory and returns the `.sldprt`
+    members to extract. Nothing is written to disk. Raises IngestError.
+    """
+    try:
+        zf = zipfile.ZipFile(zip_path, 'r')
+    except (zipfile.BadZipFile, OSError) as e:
+        raise IngestError(f"Not a valid ZIP archive: {e}")
+    with zf:
+        members = [info for info in zf.infolist() if is_part_member(info)]
+
+    if not members:
+        raise IngestError("Archive contains no .sldprt files")
+    if len(members) > MAX_PARTS:
+        raise IngestError(f"Archive contains {len(members)} parts (limit {MAX_PARTS})")
+
+    total = 0
+    for info in members:
+        if info.file_size > MAX_PART_BYTES:
+            raise IngestError(f"{info.filename} is {info.file_size} bytes (limit {MAX_PART_BYTES})")
+        if info.compress_size and info.file_size / info.compress_size > MAX_COMPRESSION_RATIO:
+            raise IngestError(f"{info.filename} has a suspicious compression ratio")
+        total += info.file_size
+    if total > MAX_TOTAL_BYTES:
+        raise IngestError(f"Archive expands to {total} bytes (limit {MAX_TOTAL_BYTES})")
+
+    free = shutil.disk_usage(Path(zip_path).parent).free
+    if total + DISK_HEADROOM_BYTES > free:
+        raise IngestError("Not enough free disk space to extract the archive")
+    return members
+
+
+def _unique_name(name, taken):
+    candidate, counter = name, 2
+    while candidate.lower() in taken:
+        path = PurePosixPath(name)
+        candidate = f"{path.stem} ({counter}){path.suffix}"
+        counter += 1
+    taken.add(candidate.lower())
+    return candidate
+
+
+def extract_parts(zip_path, dest_dir, members=None, taken=None):
+    """
+    Extracts only the `.sldprt` members into `dest_dir` (flattened to their
+    base names), hashing each while it is written. Yields (path, sha256)
+    as soon as each part lands so analysis can start before unpacking ends.
+    `taken` holds lower-cased names already used in `dest_dir`.
+    """
+    dest_dir = Path(dest_dir)
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    if members is None:
+        members = scan_archive(zip_path)
+
+    taken = set() if taken is None else taken
+    written_total = 0
+    with zipfile.ZipFile(zip_path, 'r') as zf:
+        for info in members:
+            base_name = PurePosixPath(info.filename.replace("\\", "/")).name
+            name = _unique_name(base_name, taken)
+            if name != base_name:
+                print(f"  WARNING: duplicate file name {base_name} stored as {name}")
+            dest_path = dest_dir / name
+            sha = hashlib.sha256()
+            written = 0
+            with zf.open(info) as src, open(dest_path, 'wb') as dst:
+                for chunk in iter(lambda: src.read(COPY_CHUNK_SIZE), b''):
+                    written += len(chunk)
+                    # Guard against headers that lie about the member size.
+                    if written > info.file_size or written_total + written > MAX_TOTAL_BYTES:
+                        dst.close()
+                        dest_path.unlink()
+                        raise IngestError(f"{info.filename} expands beyond its declared size")
+                    sha.update(chunk)
+                    dst.write(chunk)
+            written_total += written
+            yield dest_path, sha.hexdigest()
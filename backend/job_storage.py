@@ -0,0 +1,330 @@
+# backend/job_storage.py
+"""
+Job storage: compaction, deduplication and retention of job directories.
+
+When a job finishes, `compact_job` drops the extracted student parts (the
+uploaded ZIPs still hold them), repacks the worker results into one
+gzip'd JSON-lines file (ANALYSIS_LOG_NAME) instead of an indented JSON per
+part, and hard-links the uploaded master part and ZIPs into a
+content-addressed blob store next to the jobs, so a file uploaded for
+several jobs (re-runs, sections sharing a master) is stored once.
+
+`JobStorage.sweep` applies the retention policy: jobs unused for
+`max_age_days` are removed, then the least recently used ones while there
+are more than `max_jobs` or they take more than `max_bytes` (hard-linked
+files are counted once). A job is used when it runs or anything of it is
+requested (`touch`). Queued and running jobs are never removed or
+compacted: those marked so in their job.json, those `active` returns,
+any job `claim` refuses at the moment of removal and any job `hold`
+refuses before compaction (`unhold` frees it again).
+
+    python backend/job_storage.py stats
+    python backend/job_storage.py sweep --dry-run
+"""
+import argparse
+import gzip
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from pathlib import Path
+
+from result_cache import hash_file
+
+JOB_STATE_FILE = "job.json"
+ACTIVE_STATUSES = ("queued", "running")
+STUDENTS_DIR_NAME = "students"
+ANALYSIS_LOG_NAME = "analysis_results.jsonl.gz"
+LEGACY_ANALYSIS_SUFFIX = "_analysis.json"
+BLOB_DIR_NAME = "blobs"
+DEDUP_MIN_BYTES = 64 * 1024  # smaller inputs are not worth a hash and a link
+ORPHAN_SECONDS = 24 * 3600  # job directories that never got a job.json (failed uploads)
+JOB_DIR_PATTERN = re.compile(r"\d{8}_\d{6}_[0-9a-f]{8}")
+
+JOB_RETENTION_DAYS = float(os.environ.get("JOB_RETENTION_DAYS", "0"))
+JOB_RETENTION_COUNT = int(os.environ.get("JOB_RETENTION_COUNT", "0"))
+JOB_STORAGE_QUOTA_BYTES = int(float(os.environ.get("JOB_STORAGE_QUOTA_MB", "0")) * 1024 * 1024)
+JOB_SWEEP_INTERVAL = float(os.environ.get("JOB_SWEEP_INTERVAL", "3600"))
+
+
+def append_analysis(job_dir, part, data):
+    """Adds the worker result of `part` (the part's file stem) to the job's analysis log."""
+    with gzip.open(Path(job_dir) / ANALYSIS_LOG_NAME, 'at', compresslevel=6, encoding="utf-8") as f:
+        f.write(json.dumps({"part": part, "result": data}, separators=(",", ":")) + "\n")
+
+
+def read_analysis(job_dir):
+    """{part: worker result} from the analysis log; the latest result of a part wins."""
+    path = Path(job_dir) / ANALYSIS_LOG_NAME
+    results = {}
+    if path.exists():
+        with gzip.open(path, 'rt', encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                results[entry["part"]] = entry["result"]
+    return results
+
+
+def _job_inputs(job_dir):
+    try:
+        with open(Path(job_dir) / JOB_STATE_FILE, 'r') as f:
+            inputs = json.load(f).get("inputs", {})
+    except (OSError, ValueError):
+        return []
+    # A registered assignment's master lives in the assignment registry.
+    names = [] if inputs.get("assignment_id") else [inputs.get("master_file")]
+    names += [inputs.get("student_zip")] + inputs.get("late_zips", [])
+    return [Path(job_dir) / name for name in names if name]
+
+
+def link_blob(path, blob_dir):
+    """
+    Replaces `path` by a hard link into the blob store, adding it to the
+    store if its content is new. Returns the bytes saved.
+    """
+    size = path.stat().st_size
+    blob = Path(blob_dir) / hash_file(path)
+    if not blob.exists():
+        blob_dir.mkdir(parents=True, exist_ok=True)
+        os.link(path, blob)
+        return 0
+    if os.path.samefile(blob, path):
+        return 0
+    tmp_path = path.with_name(path.name + ".link")
+    os.link(blob, tmp_path)
+    os.replace(tmp_path, path)
+    return size
+
+
+def compact_job(job_dir):
+    """
+    Shrinks a job directory that is not running: removes the extracted
+    parts, repacks the worker results into one compressed log and
+    deduplicates the uploaded inputs. Returns the bytes saved.
+    """
+    job_dir = Path(job_dir)
+    before = _dir_bytes(job_dir)
+    shutil.rmtree(job_dir / STUDENTS_DIR_NAME, ignore_errors=True)
+
+    legacy = sorted(job_dir.glob(f"*{LEGACY_ANALYSIS_SUFFIX}"))
+    results = read_analysis(job_dir)
+    for path in legacy:
+        with open(path, 'r') as f:
+            results.setdefault(path.name[:-len(LEGACY_ANALYSIS_SUFFIX)], json.load(f))
+    if results:
+        # One gzip member instead of one per appended result, with re-runs collapsed.
+        tmp_path = job_dir / (ANALYSIS_LOG_NAME + ".tmp")
+        with gzip.open(tmp_path, 'wt', encoding="utf-8") as f:
+            for part, data in results.items():
+                f.write(json.dumps({"part": part, "result": data}, separators=(",", ":")) + "\n")
+        os.replace(tmp_path, job_dir / ANALYSIS_LOG_NAME)
+    for path in legacy:
+        path.unlink()
+
+    saved = before - _dir_bytes(job_dir)
+    for path in _job_inputs(job_dir):
+        try:
+            if path.stat().st_size >= DEDUP_MIN_BYTES:
+                saved += link_blob(path, job_dir.parent / BLOB_DIR_NAME)
+        except OSError as e:
+            # e.g. the blob store is on another file system; the job keeps its own copy.
+            print(f"WARNING: could not deduplicate {path.name} of job {job_dir.name}: {e}")
+    return saved
+
+
+def _dir_bytes(directory):
+    return sum(path.stat().st_size for path in Path(directory).rglob("*") if path.is_file())
+
+
+def _files(directory):
+    """{(device, inode): size} of every file under `directory`, so hard links count once."""
+    files = {}
+    for path in Path(directory).rglob("*"):
+        try:
+            stat = path.lstat()
+        except OSError:
+            continue
+        if not path.is_dir():
+            files[(stat.st_dev, stat.st_ino)] = stat.st_size
+    return files
+
+
+class JobStorage:
+    def __init__(self, root, max_age_days=JOB_RETENTION_DAYS, max_jobs=JOB_RETENTION_COUNT,
+                 max_bytes=JOB_STORAGE_QUOTA_BYTES, active=None, claim=None, hold=None, unhold=None):
+        self.root = Path(root)
+        self.max_age_days = max_age_days
+        self.max_jobs = max_jobs
+        self.max_bytes = max_bytes
+        self.active = active or set
+        self.claim = claim or (lambda job_id: True)
+        self.hold = hold or (lambda job_id: True)
+        self.unhold = unhold or (lambda job_id: None)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def touch(self, job_dir):
+        """Marks a job as just used, so it is evicted last."""
+        try:
+            os.utime(job_dir)
+        except OSError:
+            pass
+
+    def jobs(self):
+        """Every job directory with its status, last use and files, least recently used first."""
+        entries = []
+        for job_dir in self.root.iterdir() if self.root.exists() else []:
+            if not job_dir.is_dir() or not JOB_DIR_PATTERN.fullmatch(job_dir.name):
+                continue
+            try:
+                with open(job_dir / JOB_STATE_FILE, 'r') as f:
+                    status = json.load(f).get("status")
+            except FileNotFoundError:
+                status = None  # still uploading, or an upload that failed
+            except (OSError, ValueError):
+                status = "unknown"
+            try:
+                last_used = job_dir.stat().st_mtime
+            except OSError:
+                continue
+            entries.append({"id": job_dir.name, "dir": job_dir, "status": status,
+                            "last_used": last_used, "files": _files(job_dir)})
+        return sorted(entries, key=lambda entry: entry["last_used"])
+
+    def stats(self):
+        entries = self.jobs()
+        inodes = {inode: size for entry in entries for inode, size in entry["files"].items()}
+        return {
+            "jobs": len(entries),
+            "active": sum(1 for entry in entries if entry["status"] in ACTIVE_STATUSES),
+            "bytes": sum(inodes.values()),
+            "linked_bytes": sum(size for entry in entries for size in entry["files"].values()) - sum(inodes.values()),
+            "oldest_use": entries[0]["last_used"] if entries else None
+        }
+
+    def plan(self, now=None):
+        """[(job entry, reason)] that the retention policy would remove now."""
+        now = time.time() if now is None else now
+        entries = self.jobs()
+        active = self.active()
+        refs = {}
+        for entry in entries:
+            for inode in entry["files"]:
+                refs[inode] = refs.get(inode, 0) + 1
+        sizes = {inode: size for entry in entries for inode, size in entry["files"].items()}
+        total = sum(sizes.values())
+        remaining = len(entries)
+        evict = []
+
+        def remove(entry, reason):
+            nonlocal total, remaining
+            evict.append((entry, reason))
+            remaining -= 1
+            for inode in entry["files"]:
+                refs[inode] -= 1
+                if refs[inode] == 0:
+                    total -= sizes[inode]
+
+        candidates = []
+        for entry in entries:
+            if entry["status"] in ACTIVE_STATUSES or entry["id"] in active:
+                continue
+            idle = now - entry["last_used"]
+            if entry["status"] is None:
+                if idle > ORPHAN_SECONDS:
+                    remove(entry, "orphan")
+            elif self.max_age_days and idle > self.max_age_days * 86400:
+                remove(entry, "age")
+            else:
+                candidates.append(entry)
+        for entry in candidates:
+            if self.max_jobs and remaining > self.max_jobs:
+                remove(entry, "count")
+            elif self.max_bytes and total > self.max_bytes:
+                remove(entry, "quota")
+        return evict
+
+    def sweep(self, dry_run=False):
+        """
+        Removes the jobs the retention policy selects, compacts the others
+        that are not running and drops blobs no job links to any more.
+        Returns [(job id, reason)] of the removed jobs.
+        """
+        with self._lock:
+            removed = []
+            for entry, reason in self.plan():
+                if dry_run:
+                    removed.append((entry["id"], reason))
+                elif entry["status"] is None or self.claim(entry["id"]):
+                    shutil.rmtree(entry["dir"], ignore_errors=True)
+                    removed.append((entry["id"], reason))
+            if dry_run:
+                return removed
+            # Jobs finished before compaction existed still hold their extracted parts.
+            skip = {job_id for job_id, _ in removed} | set(self.active())
+            for entry in self.jobs():
+                if entry["id"] not in skip and entry["status"] in ("done", "failed"):
+                    if (entry["dir"] / STUDENTS_DIR_NAME).exists() or \
+                            next(entry["dir"].glob(f"*{LEGACY_ANALYSIS_SUFFIX}"), None):
+                        # Held while compacting, so no late run starts reading parts being deleted.
+                        if not self.hold(entry["id"]):
+                            continue
+                        try:
+                            compact_job(entry["dir"])
+                        finally:
+                            self.unhold(entry["id"])
+            blob_dir = self.root / BLOB_DIR_NAME
+            for blob in blob_dir.iterdir() if blob_dir.exists() else []:
+                if blob.stat().st_nlink == 1:
+                    blob.unlink()
+            for job_id, reason in removed:
+                print(f"Job storage: removed {job_id} ({reason})")
+            return removed
+
+    def start(self, interval=JOB_SWEEP_INTERVAL):
+        """Sweeps now and then every `interval` seconds on a daemon thread."""
+        def loop():
+            while True:
+                try:
+                    self.sweep()
+                except Exception as e:
+                    print(f"WARNING: job storage sweep failed: {e}")
+                if self._stop.wait(interval):
+                    return
+        thread = threading.Thread(target=loop, name="job-storage-sweeper", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--root", default=Path(__file__).resolve().parent.parent / "temp_processing_files")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="jobs and bytes stored")
+    sweep = commands.add_parser("sweep", help="apply the retention policy now")
+    sweep.add_argument("--dry-run", action="store_true", help="only list the jobs that would be removed")
+    sweep.add_argument("--max-age-days", type=float, default=JOB_RETENTION_DAYS)
+    sweep.add_argument("--max-jobs", type=int, default=JOB_RETENTION_COUNT)
+    sweep.add_argument("--quota-mb", type=float, default=JOB_STORAGE_QUOTA_BYTES / 1024 / 1024)
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        stats = JobStorage(args.root).stats()
+        print(f"{stats['jobs']} jobs ({stats['active']} queued or running), "
+              f"{stats['bytes'] / 1024 / 1024:.1f} MB stored, "
+              f"{stats['linked_bytes'] / 1024 / 1024:.1f} MB saved by hard links")
+    else:
+        storage = JobStorage(args.root, args.max_age_days, args.max_jobs, int(args.quota_mb * 1024 * 1024))
+        removed = storage.sweep(dry_run=args.dry_run)
+        for job_id, reason in removed:
+            print(f"{'would remove' if args.dry_run else 'removed'} {job_id} ({reason})")
+        print(f"{len(removed)} jobs {'to remove' if args.dry_run else 'removed'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+# backend/jobs.py
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+from metrics import STAGE_SECONDS, JOBS_FINISHED, JobTimings
+
+JOB_STATE_FILE = "job.json"
+TIMINGS_FILE = "timings.json"
+ACTIVE_STATUSES = ("queued", "running")
+STATE_WRITE_INTERVAL = 0.5  # seconds between progress writes to disk
+PRIORITIES = {"normal": 0, "exam": 1}
+MAX_ACTIVE_JOBS = int(os.environ.get("MAX_ACTIVE_JOBS", "50"))
+MAX_ACTIVE_JOBS_PER_OWNER = int(os.environ.get("MAX_ACTIVE_JOBS_PER_OWNER", "5"))
+
+
+class AdmissionError(Exception):
+    """Raised when a new job would exceed the queued-or-running job limits."""
+    pass
+
+
+class Progress:
+    """In-memory per-stage progress (files done / total) with a simple ETA."""
+
+    def __init__(self):
+        self.stages = {}
+        self.current_stage = None
+        self._lock = threading.Lock()
+
+    def _close_stage(self):
+        """Marks the current stage finished and records its duration; call with the lock held."""
+        stage = self.stages.get(self.current_stage) if self.current_stage else None
+        if stage and stage["finished"] is None:
+            stage["finished"] = time.time()
+            STAGE_SECONDS.observe(stage["finished"] - stage["started"], stage=self.current_stage)
+
+    def stage(self, name, total=None):
+        with self._lock:
+            self._close_stage()
+            self.stages[name] = {"done": 0, "total": total, "started": time.time(), "finished": None}
+            self.current_stage = name
+        self.changed(force=True)
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+            self.current_stage = None
+
+    def advance(self, count=1):
+        with self._lock:
+            if self.current_stage:
+                self.stages[self.current_stage]["done"] += count
+        self.changed()
+
+    def finish(self):
+        with self._lock:
+            self._close_stage()
+        self.changed(force=True)
+
+    def changed(self, force=False):
+        pass
+
+    def report_ready(self, pdf_path):
+        pass
+
+    def snapshot(self):
+        with self._lock:
+            stages = {name: dict(stage) for name, stage in self.stages.items()}
+            current = self.current_stage
+        eta = None
+        if current:
+            stage = stages[current]
+            if stage["total"] and stage["done"]:
+                elapsed = time.time() - stage["started"]
+                eta = round(elapsed / stage["done"] * (stage["total"] - stage["done"]), 1)
+        return {"stage": current, "stages": stages, "eta_seconds": eta}
+
+
+class Job(Progress):
+    """A pipeline run whose state is persisted to `<job_dir>/job.json`."""
+
+    def __init__(self, job_dir, state=None):
+        super().__init__()
+        self.job_dir = Path(job_dir)
+        self.state = state or {
+            "id": self.job_dir.name,
+            "status": "queued",
+            "created": time.time(),
+            "inputs": {},
+            "result": None,
+            "error": None
+        }
+        self.stages = self.state.get("stages", {})
+        self.current_stage = self.state.get("stage")
+        self.on_report = None  # called with each PDF path as soon as it is rendered
+        self.timings = JobTimings()
+        self._last_write = 0.0
+
+    @property
+    def id(self):
+        return self.state["id"]
+
+    @property
+    def status(self):
+        return self.state["status"]
+
+    @property
+    def owner(self):
+        return self.state["inputs"].get("owner") or "anonymous"
+
+    @property
+    def priority(self):
+        """Scheduling priority from the job's "priority" input; exam jobs go first."""
+        return PRIORITIES.get(self.state["inputs"].get("priority"), 0)
+
+    @classmethod
+    def load(cls, job_dir):
+        with open(Path(job_dir) / JOB_STATE_FILE, 'r') as f:
+            return cls(job_dir, json.load(f))
+
+    def report_ready(self, pdf_path):
+        if self.on_report:
+            self.on_report(pdf_path)
+
+    def update(self, **fields):
+        self.state.update(fields)
+        self.changed(force=True)
+
+    def changed(self, force=False):
+        now = time.time()
+        if force or now - self._last_write >= STATE_WRITE_INTERVAL:
+            self._last_write = now
+            self.save()
+
+    def save(self):
+        data = self.to_dict()
+        path = self.job_dir / JOB_STATE_FILE
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def to_dict(self):
+        data = dict(self.state)
+        data.update(self.snapshot())
+        data["updated"] = time.time()
+        return data
+
+
+class JobManager:
+    """
+    Runs assessment jobs on a background executor.
+    `runner(job)` does the work and returns the result path (relative to the
+    job directory). Jobs that were queued or running when the backend stopped
+    are re-queued on startup with the default runner; their inputs are still
+    in the job directory.
+
+    Up to `max_workers` jobs run at once and share the CAD workers through
+    the worker pool's fair queue. Waiting jobs start exam-priority first, then
+    in submission order. `admit` turns new jobs away once MAX_ACTIVE_JOBS are
+    queued or running, or MAX_ACTIVE_JOBS_PER_OWNER for one owner.
+    """
+
+    def __init__(self, processing_dir, runner, max_workers=1):
+        self.processing_dir = Path(processing_dir)
+        self.runner = runner
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.jobs = {}
+        self._pending = []  # heap of (-priority, order, job, runner, Future)
+        self._order = itertools.count()
+        self._held = set()  # ids of finished jobs that must not start a run or be removed for now
+        self._lock = threading.Lock()
+
+    def active(self):
+        with self._lock:
+            return [job for job in self.jobs.values() if job.status in ACTIVE_STATUSES]
+
+    def admit(self, owner):
+        """Raises AdmissionError if `owner` may not start another job now."""
+        active = self.active()
+        if len(active) >= MAX_ACTIVE_JOBS:
+            raise AdmissionError(f"{len(active)} jobs are already queued or running; try again later")
+        owned = sum(1 for job in active if job.owner == (owner or "anonymous"))
+        if owned >= MAX_ACTIVE_JOBS_PER_OWNER:
+            raise AdmissionError(f"{owner or 'anonymous'} already has {owned} jobs queued or running")
+
+    def create(self, job_dir, inputs):
+        job = Job(job_dir)
+        job.state["inputs"] = inputs
+        job.save()
+        with self._lock:
+            self.jobs[job.id] = job
+        return job
+
+    def submit(self, job, runner=None):
+        """Queues a job; returns a Future that resolves to the job when its run ends."""
+        job.update(status="queued")
+        done = Future()
+        with self._lock:
+            heapq.heappush(self._pending, (-job.priority, next(self._order), job, runner, done))
+        # Each task runs whichever queued job ranks first, not necessarily this one.
+        self.executor.submit(self._run_next)
+        return done
+
+    def _run_next(self):
+        with self._lock:
+            _, _, job, runner, done = heapq.heappop(self._pending)
+        try:
+            self.run(job, runner)
+        finally:
+            done.set_result(job)
+
+    def queue_positions(self):
+        """Job id -> place among the jobs waiting to start (0 starts next)."""
+        with self._lock:
+            waiting = sorted(self._pending, key=lambda entry: entry[:2])
+        return {entry[2].id: idx for idx, entry in enumerate(waiting)}
+
+    def run(self, job, runner=None):
+        """
+        Runs a job in the calling thread, with `runner` instead of the default
+        if given. Stage and per-file timings are written to timings.json.
+        """
+        job.reset()
+        job.timings = JobTimings()
+        job.update(status="running", started=time.time(), error=None)
+        try:
+            result = (runner or self.runner)(job)
+            job.finish()
+            job.update(status="done", result=str(result) if result else None, finished=time.time())
+            JOBS_FINISHED.inc(status="done")
+        except Exception as e:
+            traceback.print_exc()
+            job.finish()
+            job.update(status="failed", error=str(e), finished=time.time())
+            JOBS_FINISHED.inc(status="failed")
+        try:
+            job.timings.save(job.job_dir / TIMINGS_FILE, job.snapshot()["stages"])
+        except OSError as e:
+            print(f"WARNING: could not write timings for job {job.id}: {e}")
+
+    def get(self, job_id):
+        with self._lock:
+            job = self.jobs.get(job_id)
+        if job is None:
+            job_dir = self.processing_dir / job_id
+            if Path(job_id).name != job_id or not (job_dir / JOB_STATE_FILE).exists():
+                return None
+            job = Job.load(job_dir)
+            with self._lock:
+                job = self.jobs.setdefault(job_id, job)
+        return job
+
+    def hold(self, job_id):
+        """
+        Reserves a job that is not queued or running, e.g. while a late
+        upload is saved and submitted. Returns False if the job is active
+        or already held; release refuses held jobs until `unhold`.
+        """
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job_id in self._held or (job is not None and job.status in ACTIVE_STATUSES):
+                return False
+            self._held.add(job_id)
+            return True
+
+    def unhold(self, job_id):
+        with self._lock:
+            self._held.discard(job_id)
+
+    def release(self, job_id):
+        """
+        Forgets a job whose directory is about to be deleted. Returns False,
+        keeping it, if the job is queued, running or held.
+        """
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job_id in self._held or (job is not None and job.status in ACTIVE_STATUSES):
+                return False
+            self.jobs.pop(job_id, None)
+            return True
+
+    def recover(self):
+        """Re-queues jobs interrupted by a backend restart."""
+        recovered = []
+        for state_path in sorted(self.processing_dir.glob(f"*/{JOB_STATE_FILE}")):
+            try:
+                job = Job.load(state_path.parent)
+            except (OSError, ValueError):
+                continue
+            with self._lock:
+                self.jobs[job.id] = job
+            if job.status in ACTIVE_STATUSES:
+                print(f"Resuming interrupted job {job.id}")
+                self.submit(job)
+                recovered.append(job.id)
+        return recovered
@@ -0,0 +1,175 @@
+# backend/metrics.py
+"""
+Timing spans and counters, exported in the Prometheus text format at
+/metrics and written per job to `timings.json`.
+
+Recording a span is a perf_counter() call, a bucket bisect and a dict update
+under a lock, so instrumentation stays on in production.
+"""
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(labelnames, values)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            series[idx] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        for key, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), values[:-1]):
+                cumulative += count
+                le = bound if bound == "+Inf" else repr(float(bound))
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', le)])} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {values[-1]}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "cad_pipeline_stage_seconds", "Wall-clock seconds per pipeline stage of a job.", ("stage",)))
+WORKER_STEP_SECONDS = REGISTRY.register(Histogram(
+    "cad_worker_step_seconds", "Seconds per analysis worker step for one part.", ("step",)))
+WORKER_STARTUP_SECONDS = REGISTRY.register(Histogram(
+    "cad_worker_startup_seconds", "Seconds from spawning an analysis worker until it is ready."))
+WORKER_QUEUE_SECONDS = REGISTRY.register(Histogram(
+    "cad_worker_queue_seconds", "Seconds a part waited for a free analysis worker."))
+WORKER_FAILURES = REGISTRY.register(Counter(
+    "cad_worker_failures_total", "Parts whose worker timed out or crashed, by reason and whether they were retried.",
+    ("reason", "action")))
+FILES_ANALYZED = REGISTRY.register(Counter(
+    "cad_files_analyzed_total", "Parts analyzed, by source and result status.", ("source", "status")))
+JOBS_FINISHED = REGISTRY.register(Counter(
+    "cad_jobs_finished_total", "Assessment jobs finished, by final status.", ("status",)))
+ARCHIVE_SECONDS = REGISTRY.register(Histogram(
+    "cad_result_archive_seconds", "Seconds spent streaming a result archive to the client."))
+
+
+class JobTimings:
+    """
+    Per-file step timings of one job. Stage durations come from the job's
+    progress record; both are written together by `save`, with the job's
+    stragglers (see pipeline.report_stragglers).
+    """
+
+    def __init__(self):
+        self.files = {}
+        self.stragglers = []
+        self._lock = threading.Lock()
+
+    def record(self, file_name, step, seconds):
+        with self._lock:
+            steps = self.files.setdefault(file_name, {})
+            steps[step] = round(steps.get(step, 0.0) + seconds, 6)
+
+    def record_steps(self, file_name, steps):
+        for step, seconds in steps.items():
+            self.record(file_name, step, seconds)
+
+    @contextmanager
+    def span(self, file_name, step):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(file_name, step, time.perf_counter() - start)
+
+    def to_dict(self, stages):
+        stage_seconds = {name: round(stage["finished"] - stage["started"], 6)
+                         for name, stage in stages.items() if stage.get("finished")}
+        with self._lock:
+            files = {name: dict(steps) for name, steps in self.files.items()}
+        totals = {}
+        for steps in files.values():
+            for step, seconds in steps.items():
+                totals[step] = round(totals.get(step, 0.0) + seconds, 6)
+        return {"stages": stage_seconds, "step_totals": totals, "stragglers": list(self.stragglers), "files": files}
+
+    def save(self, path, stages):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(stages), f, indent=2)
+        os.replace(tmp_path, path)
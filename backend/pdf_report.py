@@ -0,0 +1,27 @@
+# backend/pdf_report.py
+"""
+Page template of the PDF reports. fpdf2 (and the fontTools and Pillow
+modules it pulls in) is only imported from here, when the first report is
+rendered, so importing the pipeline or starting the API stays fast.
+"""
+import warnings
+
+from fpdf import FPDF
+
+# The reports use fpdf's classic cell(ln=...) / Arial API; fpdf2 would
+# otherwise print a deprecation warning for nearly every call, in the render
+# processes and in the backend alike.
+warnings.filterwarnings("ignore", message=r'The parameter "ln" is deprecated', category=DeprecationWarning)
+warnings.filterwarnings("ignore", message=r"Substituting font arial by core font helvetica",
+                        category=DeprecationWarning)
+
+class PDFReport(FPDF):
+    def header(self):
+        self.set_font('Arial', 'B', 11)
+        self.cell(0, 8, 'CAD Assessment Report', 0, 1, 'C')
+        self.ln(2)
+    
+    def footer(self):
+        self.set_y(-10)
+        self.set_font('Arial', 'I', 7)
+        self.cell(0, 5, f'Page {self.page_no()}', 0, 0, 'C')
@@ -0,0 +1,788 @@
+# backend/pipeline.py
+import hashlib, json, os, statistics, threading, time, traceback
+from collections import OrderedDict
+from concurrent.futures import Future, FIRST_COMPLETED, wait
+from pathlib import Path
+import report_generator
+import scoring
+from gdt_engine import GDTEngine
+from alignment import BaseAligner
+import similarity
+from worker_pool import get_worker_pool
+from result_cache import ResultCache, hash_file
+from ingest import scan_archive, extract_parts
+from fingerprint_index import FingerprintIndex
+from submissions import same_student
+from assignments import AssignmentRegistry, AssignmentError
+from job_storage import STUDENTS_DIR_NAME, append_analysis, compact_job
+from runtime_history import RuntimeHistory
+import replay
+from metrics import FILES_ANALYZED
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+PLAGIARISM_COMPLEXITY_THRESHOLD = 3
+PLAGIARISM_SIMILARITY_THRESHOLD = 0.6
+# Euclidean distance between geometric descriptors below which two parts count as the same shape (~0.5%).
+GEOMETRY_DISTANCE_THRESHOLD = float(os.environ.get("GEOMETRY_DISTANCE_THRESHOLD", "0.005"))
+SUMMARY_CSV_NAME = "summary_report.csv"
+RESULTS_FILE_NAME = "results.json"
+STATE_FILE_NAME = "assessment_state.json"
+# "lazy": write only the results table and render each PDF when it is first requested.
+REPORT_MODE = os.environ.get("REPORT_MODE", "eager")
+# Render eager reports while the CAD workers are still busy, assuming no plagiarism until the cohort is complete.
+PROVISIONAL_REPORTS = os.environ.get("PROVISIONAL_REPORTS", "1") != "0"
+
+result_cache = ResultCache(
+    Path(os.environ.get("RESULT_CACHE_DIR", PROJECT_ROOT / "analysis_cache")),
+    max_bytes=int(os.environ.get("RESULT_CACHE_MAX_MB", "512")) * 1024 * 1024,
+    enabled=os.environ.get("RESULT_CACHE_ENABLED", "1") != "0")
+
+# Worker seconds of earlier analyses, for longest-first dispatch.
+runtime_history = RuntimeHistory(Path(os.environ.get("RUNTIME_HISTORY_PATH", PROJECT_ROOT / "runtime_history.json")))
+# Master parts registered once and reused by every section of an assignment.
+assignments = AssignmentRegistry(Path(os.environ.get("ASSIGNMENT_DIR", PROJECT_ROOT / "assignments")))
+# Aligners and GD&T engines of recently used masters, shared by all jobs on the same master.
+BASELINE_CACHE_SIZE = 32
+_baselines = OrderedDict()
+_baselines_lock = threading.Lock()
+
+STRAGGLER_FACTOR = float(os.environ.get("STRAGGLER_FACTOR", "3"))
+STRAGGLER_MIN_SECONDS = float(os.environ.get("STRAGGLER_MIN_SECONDS", "5"))
+
+# Deltas of every assessed cohort, kept across jobs so copying from earlier
+# semesters is caught. Opened on first use.
+FINGERPRINT_INDEX_PATH = Path(os.environ.get("FINGERPRINT_INDEX_PATH", PROJECT_ROOT / "fingerprints.sqlite3"))
+FINGERPRINT_INDEX_ENABLED = os.environ.get("FINGERPRINT_INDEX_ENABLED", "1") != "0"
+_fingerprint_index = None
+_fingerprint_index_lock = threading.Lock()
+
+def get_fingerprint_index():
+    global _fingerprint_index
+    if not FINGERPRINT_INDEX_ENABLED:
+        return None
+    with _fingerprint_index_lock:
+        if _fingerprint_index is None:
+            _fingerprint_index = FingerprintIndex(FINGERPRINT_INDEX_PATH)
+        return _fingerprint_index
+
+def default_semester(now=None):
+    """Semester tag used when the upload does not name one, e.g. 2025-S2."""
+    now = time.localtime(now)
+    return f"{now.tm_year}-S{1 if now.tm_mon <= 6 else 2}"
+
+def cohort_of(job):
+    """
+    Assignment/semester/job tags under which a job's parts are indexed.
+    Without an assignment name, the tag is the master's file stem and the
+    start of its SHA-256, so unrelated assignments whose masters share a
+    file name are not pooled.
+    """
+    inputs = job.state["inputs"]
+    assignment = inputs.get("assignment")
+    if not assignment:
+        master_path = job.job_dir / inputs["master_file"]
+        assignment = f"{master_path.stem}-{hash_file(master_path)[:8]}"
+    return {
+        "assignment": assignment,
+        "semester": inputs.get("semester") or default_semester(),
+        "job_id": job.id
+    }
+
+def submit_analysis(file_path, digest=None, use_cache=True, priority=0, job=None):
+    """
+    Returns a Future with the worker result for a part.
+    Cached results (same bytes, same analyzer) resolve immediately; everything
+    else is queued on the resident worker pool under its job, longest expected
+    part first within a priority.
+    """
+    pool = get_worker_pool()
+    analyzer_id = pool.analyzer_id() if digest and use_cache else None
+    if analyzer_id:
+        cached = result_cache.get(digest, analyzer_id)
+        if cached is not None:
+            FILES_ANALYZED.inc(source="cache", status=cached.get("status", "Unknown"))
+            future = Future()
+            future.timings = {"cache_hit": 0.0}
+            future.set_result(cached)
+            return future
+
+    future = pool.submit(file_path, runtime_history.estimate(file_path, digest), priority,
+                         job_id=job.id if job else None, job_priority=job.priority if job else 0)
+
+    def remember(done):
+        # A part that timed out is remembered at its timeout, so it starts first next time.
+        seconds = done.timeout if getattr(done, "timed_out", False) else getattr(done, "timings", {}).get("analyze")
+        if seconds:
+            runtime_history.record(file_path, digest, seconds)
+    future.add_done_callback(remember)
+    if analyzer_id:
+        def store(done):
+            # Only successful analyses are cached: failures may be transient
+            # (SOLIDWORKS busy, COM error) and must be retried next run.
+            if not done.exception() and done.result().get("status") == "Success":
+                result_cache.put(digest, analyzer_id, done.result())
+        future.add_done_callback(store)
+    return future
+
+def get_analysis_data(file_path, job_dir, future=None):
+    future = future or submit_analysis(file_path)
+    data = future.result()
+    append_analysis(job_dir, file_path.stem, data)
+    
+    # Debug: Print what we loaded
+    print(f"\n*** JSON DATA LOADED ***")
+    print(f"File: {file_path.name}")
+    print(f"Volume from JSON: {data.get('volume_mm3', 0.0):.2f} mm^3")
+    print(f"Status from JSON: {data.get('status', 'Unknown')}")
+    if data.get('error'):
+        print(f"Error from JSON: {data.get('error')}")
+    print(f"{'*'*30}\n")
+    
+    return data
+
+def baseline_key(master):
+    """Hash of a master's base signature and GD&T vocabulary, the parts of it students are aligned against."""
+    payload = json.dumps([master["signature"], sorted(set(master["gdt_data"].get("combined_signature", [])))],
+                         sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def master_record(file_name, master_data):
+    """The master data students are scored against, from the master's worker result."""
+    master = {
+        "file": file_name,
+        "signature": master_data.get("signature", []),
+        "volume_mm3": master_data.get("volume_mm3", 0.0),
+        "descriptor": master_data.get("descriptor") or [],
+        "gdt_data": master_data.get("gdt_data", {})
+    }
+    master["baseline_key"] = baseline_key(master)
+    return master
+
+def baseline_of(master):
+    """
+    (BaseAligner, GDTEngine) for a master record. Built once per baseline
+    and shared by every batch and every job scored against the same master,
+    e.g. all sections of a registered assignment.
+    """
+    key = master.get("baseline_key") or baseline_key(master)
+    with _baselines_lock:
+        if key in _baselines:
+            _baselines.move_to_end(key)
+            return _baselines[key]
+        baseline = (BaseAligner(master["signature"]), GDTEngine(master["gdt_data"]))
+        _baselines[key] = baseline
+        if len(_baselines) > BASELINE_CACHE_SIZE:
+            _baselines.popitem(last=False)
+        return baseline
+
+def register_assignment(name, source_path, file_name):
+    """
+    Adds a master part to the assignment registry and queues its analysis
+    ahead of student parts; jobs can use it once it is ready. The same part
+    under the same name is registered only once. Returns (entry, created).
+    """
+    entry, created = assignments.create(name, source_path, file_name, hash_file(source_path))
+    if created:
+        analyze_assignment(entry["assignment_id"])
+    return entry, created
+
+def analyze_assignment(assignment_id):
+    """Analyzes a registered master part and stores its master record in the registry."""
+    entry = assignments.get(assignment_id)
+    master_path = assignments.master_path(assignment_id)
+    future = submit_analysis(master_path, entry["master_sha256"], priority=1)
+
+    def store(done):
+        try:
+            if done.exception() is not None:
+                assignments.fail(assignment_id, f"{type(done.exception()).__name__}: {done.exception()}")
+            elif done.result().get("status") != "Success":
+                assignments.fail(assignment_id, done.result().get("error") or "Analysis failed")
+            else:
+                assignments.complete(assignment_id, done.result(), master_record(master_path.name, done.result()))
+        except AssignmentError:
+            return  # deleted while it was analyzed
+        print(f"Assignment {entry['name']} ({assignment_id}): {assignments.get(assignment_id)['status']}")
+    future.add_done_callback(store)
+    return future
+
+def resume_assignments():
+    """Queues the analysis of masters whose registration was interrupted by a restart."""
+    for assignment_id in assignments.pending():
+        analyze_assignment(assignment_id)
+
+def record_worker_timings(job, file_name, future):
+    """Copies the worker's per-step seconds for a part into the job's timings."""
+    job.timings.record_steps(file_name, {f"worker_{step}": seconds
+                                         for step, seconds in getattr(future, "timings", {}).items()})
+
+def collect_student(s_path, future, job, master, aligner=None):
+    """
+    Waits for one student's worker result and compares its features with the
+    master. The GD&T comparison is done later for the whole cohort by
+    compare_cohort_gdt, so the record carries the student's gdt_data until then.
+    """
+    job_dir = job.job_dir
+    print(f"\n{'-'*60}")
+    print(f"Analyzing: {s_path.name}")
+
+    try:
+        with job.timings.span(s_path.name, "wait"):
+            s_data = get_analysis_data(s_path, job_dir, future)
+        record_worker_timings(job, s_path.name, future)
+
+        # Check if analysis succeeded
+        if s_data.get('status') != 'Success':
+            print(f"  WARNING: Analysis failed for {s_path.name}")
+            print(f"  Error: {s_data.get('error', 'Unknown error')}")
+            # Still add it with 0 volume so it appears in the report
+
+        master_volume = master["volume_mm3"]
+
+        full_signature = s_data.get("signature", [])
+        student_volume = s_data.get("volume_mm3", 0.0)
+        student_gdt_data = s_data.get("gdt_data", {})
+
+        # Find the base features in the student's tree; only what is left over is new work
+        alignment = (aligner or baseline_of(master)[0]).align(full_signature)
+        delta = alignment.pop("delta")
+        base_modified = alignment.pop("base_modified")
+        if base_modified:
+            print(f"  Base model: {alignment['kept']} kept, {len(alignment['changed'])} changed, "
+                  f"{len(alignment['moved'])} moved, {len(alignment['missing'])} missing")
+
+        # Volume deviation and grades are computed for the whole cohort in scoring.build_table
+        print(f"\n*** VOLUME COMPARISON ***")
+        print(f"  Master Volume: {master_volume:.2f} mm^3")
+        print(f"  Student Volume: {student_volume:.2f} mm^3")
+        print(f"  Difference: {abs(student_volume - master_volume):.2f} mm^3")
+        print(f"{'*'*30}")
+
+        return {
+            "delta": delta,
+            "base_modified": base_modified,
+            "base_alignment": alignment,
+            "student_volume_mm3": student_volume,
+            "descriptor": s_data.get("descriptor") or [],
+            "gdt_data": student_gdt_data,
+            "analysis_error": s_data.get('error', '')
+        }
+
+    except Exception as e:
+        print(f"  CRITICAL ERROR analyzing {s_path.name}: {e}")
+        import traceback
+        traceback.print_exc()
+
+        # Add failed entry
+        return {
+            "delta": [],
+            "base_modified": False,
+            "student_volume_mm3": 0.0,
+            "descriptor": [],
+            "gdt_comparison": {
+                "status": "Failed",
+                "score": 0,
+                "total_required": 0,
+                "total_found": 0,
+                "matching_count": 0,
+                "missing_count": 0,
+                "extra_count": 0,
+                "missing_annotations": [],
+                "extra_annotations": [],
+                "details": {}
+            },
+            "analysis_error": str(e)
+        }
+
+def report_stragglers(job, student_paths, futures):
+    """
+    Lists the parts that held up analysis: those that timed out or were
+    retried, and those that took over STRAGGLER_FACTOR times the job's median
+    worker time (and at least STRAGGLER_MIN_SECONDS). Stored in the job state
+    and timings.json.
+    """
+    analyzed = {}
+    for s_path in student_paths:
+        future = futures[s_path]
+        seconds = getattr(future, "timings", {}).get("analyze")
+        if future not in analyzed and (seconds is not None or getattr(future, "attempts", 1) > 1):
+            analyzed[future] = (s_path.name, seconds or 0.0)
+    median = statistics.median([seconds for _, seconds in analyzed.values()]) if analyzed else 0.0
+    limit = max(STRAGGLER_FACTOR * median, STRAGGLER_MIN_SECONDS)
+
+    stragglers = []
+    for future, (name, seconds) in analyzed.items():
+        attempts = getattr(future, "attempts", 1)
+        if seconds > limit or attempts > 1:
+            stragglers.append({
+                "file": name,
+                "seconds": round(seconds, 3),
+                "expected_seconds": round(getattr(future, "expected_seconds", 0.0), 3),
+                "attempts": attempts,
+                "timed_out": getattr(future, "timed_out", False),
+                "failed": future.exception() is not None
+            })
+    stragglers.sort(key=lambda straggler: straggler["seconds"], reverse=True)
+    for straggler in stragglers:
+        print(f"Straggler: {straggler['file']} {straggler['seconds']:.1f}s (median {median:.1f}s, "
+              f"{straggler['attempts']} attempts{', timed out' if straggler['timed_out'] else ''})")
+    job.timings.stragglers = stragglers
+    job.update(stragglers=stragglers)
+    runtime_history.save()
+    return stragglers
+
+def compare_cohort_gdt(master, records):
+    """
+    Compares the GD&T of every record that still carries its gdt_data with
+    the master in one batched pass, replacing gdt_data by a compact
+    gdt_comparison (counts, score, status and a bitmask of missing annotations).
+    """
+    pending = [record for record in records if "gdt_data" in record]
+    batch = baseline_of(master)[1].compare_batch(record.pop("gdt_data") for record in pending)
+    for record, comparison in zip(pending, batch.compacts()):
+        record["gdt_comparison"] = comparison
+    print(f"GD&T compared for {len(pending)} submissions")
+
+def load_state(job_dir):
+    """Master data, per-student records and plagiarism results of a finished run."""
+    with open(Path(job_dir) / STATE_FILE_NAME, 'r') as f:
+        return json.load(f)
+
+def save_state(job_dir, state):
+    path = Path(job_dir) / STATE_FILE_NAME
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+def dispatch_students(job, zip_paths, use_cache, taken=None):
+    """
+    Extracts the .sldprt members of each archive and queues every part on the
+    worker pool as soon as it lands, so analysis overlaps with unpacking.
+    Byte-identical submissions share one Future, so each distinct file is
+    analyzed once. Returns ([student paths], {path: Future}).
+    """
+    members = {zip_path: scan_archive(zip_path) for zip_path in zip_paths}
+    job.stage("extract", total=sum(len(m) for m in members.values()))
+    taken = set() if taken is None else taken
+    student_paths, futures, futures_by_digest = [], {}, {}
+    for zip_path in zip_paths:
+        started = time.perf_counter()
+        for s_path, digest in extract_parts(zip_path, job.job_dir / STUDENTS_DIR_NAME, members[zip_path], taken):
+            job.timings.record(s_path.name, "extract", time.perf_counter() - started)
+            student_paths.append(s_path)
+            if digest not in futures_by_digest:
+                futures_by_digest[digest] = submit_analysis(s_path, digest, use_cache, job=job)
+            futures[s_path] = futures_by_digest[digest]
+            job.advance()
+            started = time.perf_counter()
+    print(f"Dispatching {len(futures_by_digest)} distinct files for {len(student_paths)} submissions")
+    return student_paths, futures
+
+def plagiarism_info_from(ranked, past_matches=(), geometry=()):
+    """
+    Builds a report's plagiarism_info from [(other_name, score), ...] ranked
+    by score, the fingerprint index matches from earlier cohorts and
+    [(other_name, distance), ...] of geometrically near-identical parts.
+    """
+    past_matches = list(past_matches)
+    best = max([score for _, score in ranked[:1]] + [m["similarity"] for m in past_matches[:1]], default=0.0)
+    copied_from = [other for other, _ in ranked]
+    copied_from += [other for other, _ in geometry if other not in copied_from]
+    return {
+        "is_plagiarised": bool(ranked or past_matches or geometry),
+        "copied_from": copied_from,
+        "matches": [{"file": other, "similarity": round(score, 4)} for other, score in ranked],
+        "past_matches": past_matches,
+        "geometry_matches": [{"file": other, "distance": round(distance, 6)} for other, distance in geometry],
+        "max_similarity": round(best, 4)
+    }
+
+def other_students(name, matches):
+    """[(other_name, score), ...] without the files of the same student (e.g. a late resubmission)."""
+    return [match for match in matches if not same_student(name, match[0])]
+
+def detect_plagiarism(student_analysis_data, previous=None, new_names=None, cohort=None, reference=None):
+    """
+    Plagiarism Logic: near-duplicate deltas found with MinHash/LSH and
+    verified with the exact Jaccard score, so renamed or reordered features
+    still match. Parts with near-identical geometric descriptors are flagged
+    as well, which catches copies rebuilt with a different feature tree;
+    parts whose geometry matches the `reference` (master) descriptor are
+    left out. Files of the same student (same register number, such as a
+    resubmission stored as "<name> (2).sldprt") are never matched with each
+    other. With `previous` results and `new_names`, only pairs that
+    involve a new submission are verified and merged into the old results.
+    With a `cohort`, the same deltas are also looked up in the fingerprint
+    index of earlier jobs for the same assignment and then added to it.
+    """
+    complex_deltas = {name: data["delta"] for name, data in student_analysis_data.items()
+                      if len(data["delta"]) > PLAGIARISM_COMPLEXITY_THRESHOLD}
+    ranked = {name: [] for name in student_analysis_data}
+    geometry = {name: [] for name in student_analysis_data}
+    past = {}
+    if previous is not None:
+        for name, info in previous.items():
+            ranked[name] = [(match["file"], match["similarity"]) for match in info.get("matches", [])]
+            geometry[name] = [(match["file"], match["distance"]) for match in info.get("geometry_matches", [])]
+            past[name] = info.get("past_matches", [])
+    found = similarity.find_similar(complex_deltas, PLAGIARISM_SIMILARITY_THRESHOLD, only=new_names)
+    # New matches are rounded as stored, so ties sort the same way when a late run reloads them.
+    for name, matches in found.items():
+        known = {other for other, _ in ranked[name]}
+        ranked[name].extend((other, round(score, 4)) for other, score in matches if other not in known)
+    descriptors = {name: data.get("descriptor") for name, data in student_analysis_data.items()}
+    twins = similarity.find_geometric_matches(descriptors, GEOMETRY_DISTANCE_THRESHOLD, reference, new_names)
+    for name, matches in twins.items():
+        known = {other for other, _ in geometry[name]}
+        geometry[name].extend((other, round(distance, 6)) for other, distance in matches if other not in known)
+
+    index = get_fingerprint_index() if cohort else None
+    if index is not None:
+        new_deltas = {name: delta for name, delta in complex_deltas.items()
+                      if new_names is None or name in new_names}
+        past.update(index.query(new_deltas, PLAGIARISM_SIMILARITY_THRESHOLD,
+                                assignment=cohort["assignment"], exclude_job=cohort["job_id"],
+                                semester=cohort["semester"], cohort=student_analysis_data))
+        index.add_cohort(cohort["assignment"], cohort["semester"], cohort["job_id"], new_deltas,
+                         replace=new_names is None)
+    return {name: plagiarism_info_from(sorted(other_students(name, matches), key=lambda item: (-item[1], item[0])),
+                                       past.get(name, []),
+                                       sorted(other_students(name, geometry[name]), key=lambda item: (item[1], item[0])))
+            for name, matches in ranked.items()}
+
+def report_path(job_dir, name):
+    return Path(job_dir) / f"{Path(name).stem}_report.pdf"
+
+# Score-table columns passed to each report, so create_report does not re-grade.
+REPORT_SCORE_COLUMNS = ["master_volume_mm3", "volume_deviation_percent", "accuracy_grade", "gdt_grade",
+                        "overall_score", "overall_label"]
+
+def lazy_reports(job):
+    return job.state["inputs"].get("reports", REPORT_MODE) == "lazy"
+
+def report_tasks(job_dir, state, names, table):
+    """create_report tasks for `names`, with their scores from the score table."""
+    students, plagiarism_results = state["students"], state["plagiarism"]
+    scores = table.rows(names, REPORT_SCORE_COLUMNS)
+    gdt_engine = baseline_of(state["master"])[1]
+    tasks = []
+    for name in names:
+        analysis_data = {
+            "student_file": name,
+            **students[name],
+            **scores[name]
+        }
+        analysis_data["gdt_comparison"] = gdt_engine.expand(analysis_data["gdt_comparison"])
+        tasks.append((analysis_data, plagiarism_results[name], report_path(job_dir, name)))
+    return tasks
+
+def write_reports(job, state, render_names=None):
+    """
+    Scores every student in one columnar table, renders reports (all
+    students, or only `render_names`) on the render pool and rewrites the
+    summary CSV and results.json from the table. Returns the CSV name.
+    In lazy mode nothing is rendered: reports whose data changed are
+    deleted and ensure_report renders each one when it is first requested.
+    """
+    job_dir = job.job_dir
+    students = state["students"]
+    render_names = list(students) if render_names is None else [n for n in students if n in render_names]
+    table = scoring.build_table(state)
+    if lazy_reports(job):
+        for name in render_names:
+            report_path(job_dir, name).unlink(missing_ok=True)
+        render_names = []
+    render_tasks = report_tasks(job_dir, state, render_names, table)
+
+    job.stage("reports", total=len(render_names))
+    names_by_path = {output_pdf_path: name for name, (_, _, output_pdf_path) in zip(render_names, render_tasks)}
+    render_errors = dict(state.get("render_errors", {}))
+    for output_pdf_path, render_error in report_generator.render_reports(render_tasks):
+        name = names_by_path[output_pdf_path]
+        if render_error:
+            print(f"  REPORT FAILED for {output_pdf_path.name}: {render_error}")
+            render_errors[name] = render_error
+        else:
+            render_errors.pop(name, None)
+            job.report_ready(output_pdf_path)
+        job.advance()
+    state["render_errors"] = render_errors
+
+    # Write the summary; the ZIP package is streamed on download
+    job.stage("package")
+    table["render_error"] = [render_errors.get(name, "") for name in table.index]
+    summary_csv_path = job_dir / SUMMARY_CSV_NAME
+    scoring.export_summary(table, summary_csv_path, "csv")
+    scoring.export_results(table, job_dir / RESULTS_FILE_NAME)
+    job.update(reports=[report_path(job_dir, name).name for name in students
+                        if name not in render_errors and report_path(job_dir, name).exists()])
+    return summary_csv_path.name
+
+# Reports being requested right now: {path: [lock, requests holding or waiting for it]}, dropped by the last one.
+_report_locks = {}
+_report_locks_lock = threading.Lock()
+
+def ensure_report(job_dir, name):
+    """
+    Path of a student's PDF report, rendered and cached on first request if
+    it does not exist yet. Raises KeyError for an unknown student and
+    RuntimeError if the report cannot be rendered.
+    """
+    path = report_path(job_dir, name)
+    with _report_locks_lock:
+        entry = _report_locks.setdefault(path, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            if not path.exists():
+                state = load_state(job_dir)
+                if name not in state["students"]:
+                    raise KeyError(name)
+                analysis_data, plagiarism_info, _ = report_tasks(job_dir, state, [name], scoring.build_table(state))[0]
+                tmp_path = path.with_suffix(".tmp")
+                _, error = next(report_generator.render_reports([(analysis_data, plagiarism_info, tmp_path)]))
+                if error:
+                    raise RuntimeError(error)
+                os.replace(tmp_path, path)
+    finally:
+        with _report_locks_lock:
+            entry[1] -= 1
+            if not entry[1]:
+                del _report_locks[path]
+    return path
+
+def iter_report_files(job_dir):
+    """
+    (archive name, path) of every student's report for a full download.
+    Existing PDFs come first; missing ones are rendered on the render pool
+    and yielded as each finishes.
+    """
+    state = load_state(job_dir)
+    render_errors = state.get("render_errors", {})
+    missing = []
+    for name in state["students"]:
+        path = report_path(job_dir, name)
+        if path.exists():
+            yield path.name, path
+        elif name not in render_errors:
+            missing.append(name)
+    if missing:
+        tasks = report_tasks(job_dir, state, missing, scoring.build_table(state))
+        for output_pdf_path, render_error in report_generator.render_reports(tasks):
+            if render_error:
+                print(f"  REPORT FAILED for {output_pdf_path.name}: {render_error}")
+            else:
+                yield output_pdf_path.name, output_pdf_path
+
+def collect_students(job, student_paths, futures, master, render=False):
+    """
+    Collects student results in the order the workers finish them. Each
+    batch of finished parts is compared with the master right away (features
+    and GD&T), so only compact records are kept, and with `render` its
+    reports are queued on the render pool while the CAD workers carry on,
+    assuming no plagiarism. Returns ({name: record} in submission order,
+    {name: Future of the provisional render}).
+    """
+    paths_by_future = {}
+    for s_path in student_paths:
+        paths_by_future.setdefault(futures[s_path], []).append(s_path)
+    no_plagiarism = plagiarism_info_from([])
+    aligner, _ = baseline_of(master)
+    records, provisional = {}, {}
+    pending = set(paths_by_future)
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        batch = {}
+        for future in done:
+            for s_path in paths_by_future[future]:
+                batch[s_path.name] = collect_student(s_path, future, job, master, aligner)
+                job.advance()
+        compare_cohort_gdt(master, batch.values())
+        records.update(batch)
+        if render:
+            state = {"master": master, "students": batch, "plagiarism": dict.fromkeys(batch, no_plagiarism)}
+            tasks = report_tasks(job.job_dir, state, list(batch), scoring.build_table(state))
+            for name, task in zip(batch, tasks):
+                provisional[name] = report_generator.submit_report(task)
+    return {s_path.name: records[s_path.name] for s_path in student_paths}, provisional
+
+def settle_provisional(job, provisional, plagiarism):
+    """
+    Waits for the provisional reports and returns the names that still need
+    a render: those found plagiarised and those whose provisional render
+    failed. The reports that stand are announced through job.report_ready.
+    """
+    no_plagiarism = plagiarism_info_from([])
+    render_names = set()
+    for name, future in provisional.items():
+        try:
+            output_pdf_path, render_error = future.result()
+        except Exception as e:
+            output_pdf_path, render_error = None, str(e)
+        if render_error or plagiarism[name] != no_plagiarism:
+            render_names.add(name)
+        else:
+            job.report_ready(output_pdf_path)
+    print(f"Provisional reports: {len(provisional) - len(render_names)} kept, {len(render_names)} to re-render")
+    return render_names
+
+def record_replay(job, *run):
+    """Adds this run's worker results to the job's replay bundle; a failure only costs the recording."""
+    try:
+        replay.record_run(job, *run)
+    except (OSError, ValueError) as e:
+        print(f"WARNING: could not record replay bundle for job {job.id}: {e}")
+
+def run_assessment(job):
+    """Runs the full pipeline for a job and returns the summary CSV name."""
+    # 1. Setup and file handling
+    job_dir = job.job_dir
+    inputs = job.state["inputs"]
+    use_cache = inputs.get("use_cache", True)
+    assignment_id = inputs.get("assignment_id")
+    if assignment_id:
+        # The master was analyzed once when the assignment was registered.
+        assignment = assignments.master(assignment_id)
+        master_file_path = assignments.master_path(assignment_id)
+        master_future = Future()
+        master_future.set_result(assignment["analysis"])
+    else:
+        master_file_path = job_dir / inputs["master_file"]
+        # Every student is compared with the master, so it goes ahead of them.
+        master_future = submit_analysis(master_file_path, hash_file(master_file_path), use_cache, priority=1, job=job)
+    zip_paths = [job_dir / name for name in [inputs["student_zip"]] + inputs.get("late_zips", [])]
+    student_paths, futures = dispatch_students(job, zip_paths, use_cache)
+
+    # 2. Analyze master file
+    print(f"\n{'='*60}")
+    job.stage("master")
+    print(f"ANALYZING MASTER FILE: {master_file_path.name}")
+    print(f"{'='*60}")
+    if assignment_id:
+        print(f"Using the master of assignment {assignment['name']} ({assignment_id})")
+        master_data, master = assignment["analysis"], assignment["master"]
+    else:
+        with job.timings.span(master_file_path.name, "wait"):
+            master_data = get_analysis_data(master_file_path, job_dir, master_future)
+        record_worker_timings(job, master_file_path.name, master_future)
+        master = master_record(master_file_path.name, master_data)
+    
+    print(f"\n*** MASTER DATA RECEIVED ***")
+    print(f"Master Volume: {master['volume_mm3']:.2f} mm^3")
+    print(f"Master Features: {len(master['signature'])}")
+    print(f"Master GD&T Count: {len(master['gdt_data'].get('combined_signature', []))}")
+    print(f"Master Status: {master_data.get('status', 'Unknown')}")
+    if master_data.get('error'):
+        print(f"Master Error: {master_data.get('error')}")
+    print(f"{'='*60}\n")
+
+    # 3. Collect student results as they finish, rendering provisional reports meanwhile
+    job.stage("students", total=len(student_paths))
+    render = PROVISIONAL_REPORTS and not lazy_reports(job)
+    student_analysis_data, provisional = collect_students(job, student_paths, futures, master, render)
+    report_stragglers(job, student_paths, futures)
+    
+    # 4. Plagiarism
+    job.stage("plagiarism")
+    state = {
+        "master": master,
+        "students": student_analysis_data,
+        "plagiarism": detect_plagiarism(student_analysis_data, cohort=cohort_of(job),
+                                        reference=master["descriptor"])
+    }
+
+    # 5. Generate the remaining Reports (in parallel on the render pool) and CSV
+    render_names = settle_provisional(job, provisional, state["plagiarism"]) if render else None
+    summary_csv_name = write_reports(job, state, render_names)
+    save_state(job_dir, state)
+    if replay.recording(job):
+        record_replay(job, master_file_path, master_future, student_paths, futures, inputs["student_zip"])
+    # The extracted parts are still in the ZIP; worker results go into one compressed log.
+    print(f"Job storage: {compact_job(job_dir) / 1024:.0f} KiB freed by compaction")
+    
+    print(f"Result cache: {result_cache.stats()}")
+    print(f"\n{'='*60}")
+    print(f"ANALYSIS COMPLETE - Reports generated")
+    print(f"{'='*60}\n")
+    
+    return summary_csv_name
+
+def run_late_submissions(job, zip_name):
+    """
+    Adds the parts in `zip_name` to a finished job. Only the new parts are
+    analyzed; the stored master data is reused, plagiarism is updated
+    incrementally, and only new reports plus those whose plagiarism result
+    changed are re-rendered. If this fails, the job keeps the results it
+    had: the archive is dropped, the summary and the touched reports are
+    restored from the stored state, and the error is kept as `late_error`.
+    """
+    job_dir = job.job_dir
+    if not (job_dir / STATE_FILE_NAME).exists():
+        # No stored results to build on; a full run includes every late archive.
+        return run_assessment(job)
+    previous_result = job.state.get("result")
+    touched = set()
+    try:
+        summary_csv_name = add_late_submissions(job, zip_name, touched)
+    except Exception as e:
+        traceback.print_exc()
+        print(f"Late submissions {zip_name} failed; restoring the previous results")
+        restore_late_submissions(job, zip_name, touched)
+        job.update(late_error=f"{zip_name}: {e}")
+        return previous_result
+    job.update(late_error=None)
+    print(f"Job storage: {compact_job(job_dir) / 1024:.0f} KiB freed by compaction")
+    return summary_csv_name
+
+def add_late_submissions(job, zip_name, touched):
+    """
+    The work of run_late_submissions, up to saving the new state. Adds to
+    `touched` every student whose report it may have rendered or deleted.
+    """
+    job_dir = job.job_dir
+    state = load_state(job_dir)
+    use_cache = job.state["inputs"].get("use_cache", True)
+    students = state["students"]
+
+    taken = {name.lower() for name in students}
+    student_paths, futures = dispatch_students(job, [job_dir / zip_name], use_cache, taken)
+    touched.update(s_path.name for s_path in student_paths)
+
+    job.stage("students", total=len(student_paths))
+    render = PROVISIONAL_REPORTS and not lazy_reports(job)
+    new_records, provisional = collect_students(job, student_paths, futures, state["master"], render)
+    students.update(new_records)
+    report_stragglers(job, student_paths, futures)
+
+    job.stage("plagiarism")
+    new_names = set(new_records)
+    previous = state["plagiarism"]
+    state["plagiarism"] = detect_plagiarism(students, previous, new_names, cohort_of(job),
+                                            state["master"].get("descriptor"))
+    changed = {name for name, info in state["plagiarism"].items()
+               if name in new_names or info != previous.get(name)}
+    print(f"Late submissions: {len(new_names)} new, {len(changed - new_names)} reports updated")
+    if render:
+        changed = (changed - new_names) | settle_provisional(job, provisional, state["plagiarism"])
+    touched.update(changed)
+
+    summary_csv_name = write_reports(job, state, render_names=changed)
+    if replay.recording(job):
+        record_replay(job, None, None, student_paths, futures, zip_name)
+    save_state(job_dir, state)
+    return summary_csv_name
+
+def restore_late_submissions(job, zip_name, touched):
+    """
+    Undoes a failed late run: forgets its archive and rewrites the summary
+    and the `touched` reports from the state stored before it.
+    """
+    job_dir = job.job_dir
+    late_zips = job.state["inputs"].get("late_zips", [])
+    job.state["inputs"]["late_zips"] = [name for name in late_zips if name != zip_name]
+    (job_dir / zip_name).unlink(missing_ok=True)
+    state = load_state(job_dir)
+    for name in touched - set(state["students"]):
+        report_path(job_dir, name).unlink(missing_ok=True)
+    write_reports(job, state, render_names=touched & set(state["students"]))
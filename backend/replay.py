@@ -0,0 +1,405 @@
+# backend/replay.py
+"""
+Record-and-replay of worker results for offline profiling.
+
+Recording: with REPLAY_RECORD=1, or record=1 sent with a job, every run of
+the job saves its worker results to `<job_dir>/replay/`:
+
+    manifest.json          job options, stage seconds and, per part, its
+                           anonymized name, size, worker step seconds and attempts
+    fixtures/<stem>.json   the worker result of each part
+
+Student file names are replaced by `S<number>_<part name>` (the mapping
+stays in the job directory, outside the bundle) and the job directory is
+removed from result strings; feature and GD&T data are kept as they are.
+`GET /jobs/<id>/bundle` downloads the bundle as a ZIP.
+
+Replay runs the full backend pipeline on the bundle with the stub worker,
+so it works on Linux without SOLIDWORKS: the master, the students and any
+late submissions go through the same runs as the recorded job. Worker
+time is simulated from the recorded seconds (--latency-scale, 0 skips it).
+Per stage, --profile writes a cProfile dump (`<stage>.prof`) and prints
+the top functions, and --flamegraph samples the pipeline thread into
+folded stacks (`<stage>.folded`, `all.folded`) for flamegraph.pl or
+speedscope. Both cover the job thread; worker and render processes are
+not profiled.
+    python backend/replay.py info bundle.zip
+    python backend/replay.py run bundle.zip --profile profiles --flamegraph
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from collections import Counter
+from pathlib import Path
+
+BUNDLE_DIR_NAME = "replay"
+MANIFEST_NAME = "manifest.json"
+FIXTURES_DIR_NAME = "fixtures"
+NAMES_FILE = "replay_names.json"
+BUNDLE_VERSION = 1
+REPLAY_RECORD = os.environ.get("REPLAY_RECORD", "0") == "1"
+MASTER_NAME = "master"
+
+
+def recording(job):
+    return job.state["inputs"].get("record", REPLAY_RECORD)
+
+
+def _anonymize(name, names):
+    """Stable anonymized name for a student file: S<number>_<part name><suffix>."""
+    if name not in names:
+        path = Path(name)
+        part = path.stem.split("_", 1)[1] if "_" in path.stem else "Part"
+        names[name] = f"S{len(names) + 1:05d}_{part}{path.suffix}"
+    return names[name]
+
+
+def _scrub(result, replacements):
+    """The worker result with real names and paths replaced, as JSON text."""
+    text = json.dumps(result)
+    for old, new in replacements:
+        # Compare in JSON-escaped form so Windows paths match.
+        text = text.replace(json.dumps(old)[1:-1], json.dumps(new)[1:-1])
+    return text
+
+
+def _part_entry(name, path, future):
+    entry = {
+        "name": name,
+        "bytes": path.stat().st_size if path.exists() else 0,
+        "timings": dict(getattr(future, "timings", {})),
+        "attempts": getattr(future, "attempts", 1)
+    }
+    if getattr(future, "timed_out", False):
+        entry["timed_out"] = True
+    return entry
+
+
+def record_run(job, master_path, master_future, student_paths, futures, zip_name):
+    """
+    Adds one pipeline run (the full run, or the late submissions in
+    `zip_name`) to the job's bundle. A full run starts a new bundle.
+    """
+    job_dir = job.job_dir
+    bundle_dir = job_dir / BUNDLE_DIR_NAME
+    fixtures_dir = bundle_dir / FIXTURES_DIR_NAME
+    names_path = job_dir / NAMES_FILE
+    first_run = master_future is not None
+    if not first_run and not (bundle_dir / MANIFEST_NAME).exists():
+        print(f"Replay bundle: no recording of the first run in {bundle_dir}; late run not recorded")
+        return
+    if first_run:
+        shutil.rmtree(bundle_dir, ignore_errors=True)
+        names_path.unlink(missing_ok=True)
+    fixtures_dir.mkdir(parents=True, exist_ok=True)
+
+    if first_run:
+        manifest = {"version": BUNDLE_VERSION, "recorded": time.time(),
+                    "inputs": {"reports": job.state["inputs"].get("reports")},
+                    "runs": []}
+        names = {}
+        master_name = f"{MASTER_NAME}{master_path.suffix}"
+    else:
+        with open(bundle_dir / MANIFEST_NAME, 'r') as f:
+            manifest = json.load(f)
+        with open(names_path, 'r') as f:
+            names = json.load(f)
+
+    def write_fixture(real_path, anon_name, future):
+        replacements = [(str(job_dir), "."), (real_path.stem, Path(anon_name).stem)]
+        if future.exception() is not None:
+            # The worker failed on every attempt; the stub crashes the same way.
+            text = json.dumps({"stub": {"crash_attempts": 1000}})
+        else:
+            text = _scrub(future.result(), replacements)
+        (fixtures_dir / f"{Path(anon_name).stem}.json").write_text(text)
+
+    if first_run:
+        write_fixture(master_path, master_name, master_future)
+        manifest["master"] = _part_entry(master_name, master_path, master_future)
+
+    parts = []
+    for s_path in student_paths:
+        anon_name = _anonymize(s_path.name, names)
+        write_fixture(s_path, anon_name, futures[s_path])
+        parts.append(_part_entry(anon_name, s_path, futures[s_path]))
+    stages = {name: round(stage["finished"] - stage["started"], 4)
+              for name, stage in job.snapshot()["stages"].items() if stage["finished"]}
+    manifest["runs"].append({"zip": zip_name, "parts": parts, "stages": stages})
+
+    with open(bundle_dir / MANIFEST_NAME, 'w') as f:
+        json.dump(manifest, f, indent=1)
+    with open(names_path, 'w') as f:
+        json.dump(names, f)
+    print(f"Replay bundle: {len(parts)} parts recorded in {bundle_dir}")
+
+
+def bundle_entries(job_dir):
+    """(archive name, path) of every file in a job's bundle, for iter_zip."""
+    bundle_dir = Path(job_dir) / BUNDLE_DIR_NAME
+    return [(path.relative_to(bundle_dir).as_posix(), path)
+            for path in sorted(bundle_dir.rglob("*")) if path.is_file()]
+
+
+def open_bundle(source, directory):
+    """A bundle directory for `source` (a bundle directory or ZIP), extracting into `directory` if needed."""
+    source = Path(source)
+    if source.is_dir():
+        return source
+    with zipfile.ZipFile(source) as zf:
+        zf.extractall(directory)
+    return Path(directory)
+
+
+def load_manifest(bundle_dir):
+    with open(Path(bundle_dir) / MANIFEST_NAME, 'r') as f:
+        manifest = json.load(f)
+    if manifest.get("version") != BUNDLE_VERSION:
+        raise ValueError(f"Unsupported bundle version {manifest.get('version')}")
+    return manifest
+
+
+def write_placeholder(path, size):
+    """Placeholder part of `size` bytes; the name prefix keeps every part's digest unique."""
+    prefix = path.name.encode()
+    with open(path, 'wb') as f:
+        f.write(prefix)
+        f.truncate(max(size, len(prefix)))
+
+
+def write_fixtures(bundle_dir, fixtures_dir, manifest, latency_scale):
+    """Copies the bundle's fixtures with each part's recorded worker seconds as its stub latency."""
+    fixtures_dir.mkdir(parents=True, exist_ok=True)
+    parts = [manifest["master"]] + [part for run in manifest["runs"] for part in run["parts"]]
+    for part in parts:
+        stem = Path(part["name"]).stem
+        with open(Path(bundle_dir) / FIXTURES_DIR_NAME / f"{stem}.json", 'r') as f:
+            fixture = json.load(f)
+        seconds = part["timings"].get("analyze", 0.0) * latency_scale
+        if seconds:
+            fixture.setdefault("stub", {})["latency"] = seconds
+        with open(fixtures_dir / f"{stem}.json", 'w') as f:
+            json.dump(fixture, f)
+
+
+def write_runs(job_dir, manifest, max_part_bytes):
+    """Writes the master and one STORED ZIP of placeholder parts per recorded run."""
+    master = manifest["master"]
+    write_placeholder(job_dir / master["name"], min(master["bytes"], max_part_bytes))
+    parts_dir = job_dir / "replay_parts"
+    parts_dir.mkdir()
+    for run in manifest["runs"]:
+        with zipfile.ZipFile(job_dir / run["zip"], 'w', zipfile.ZIP_STORED) as zf:
+            for part in run["parts"]:
+                path = parts_dir / part["name"]
+                write_placeholder(path, min(part["bytes"], max_part_bytes))
+                zf.write(path, part["name"])
+                path.unlink()
+    parts_dir.rmdir()
+
+
+class StageProfiler:
+    """
+    Profiles a job's pipeline thread per stage: a cProfile.Profile per stage
+    and/or stack samples every `interval` seconds, folded per stage.
+    Hooked into Job.stage/finish through `switch`.
+    """
+
+    def __init__(self, profile=False, sample=False, interval=0.005):
+        self.profile, self.sample, self.interval = profile, sample, interval
+        self.profilers = {}
+        self.samples = {}
+        self.stage = None
+        self._thread_id = None
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def switch(self, stage):
+        """Moves profiling to `stage` (None stops it); call from the pipeline thread."""
+        import cProfile
+        if self.profile and self.stage in self.profilers:
+            self.profilers[self.stage].disable()
+        self.stage = stage
+        if stage is None:
+            return
+        if self.sample and self._sampler is None:
+            self._thread_id = threading.get_ident()
+            self._sampler = threading.Thread(target=self._sample_loop, daemon=True)
+            self._sampler.start()
+        if self.profile:
+            self.profilers.setdefault(stage, cProfile.Profile()).enable()
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            stage, frame = self.stage, sys._current_frames().get(self._thread_id)
+            if stage is None or frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.samples.setdefault(stage, Counter())[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self.switch(None)
+        self._stop.set()
+        if self._sampler:
+            self._sampler.join()
+
+    def write(self, output_dir, top=10):
+        import pstats
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        for stage, profiler in self.profilers.items():
+            profiler.dump_stats(output_dir / f"{stage}.prof")
+            print(f"\n--- {stage}: top {top} functions by cumulative time ---")
+            pstats.Stats(profiler, stream=sys.stdout).strip_dirs().sort_stats("cumulative").print_stats(top)
+        if self.samples:
+            with open(output_dir / "all.folded", 'w') as combined:
+                for stage, stacks in self.samples.items():
+                    with open(output_dir / f"{stage}.folded", 'w') as f:
+                        for stack, count in stacks.most_common():
+                            f.write(f"{stack} {count}\n")
+                            combined.write(f"{stage};{stack} {count}\n")
+            total = sum(sum(stacks.values()) for stacks in self.samples.values())
+            print(f"\nFolded stacks of {total} samples in {output_dir}")
+
+
+def replay(bundle_dir, workdir, latency_scale=0.0, workers=1, max_part_bytes=8 * 1024 * 1024,
+           profiler=None, verbose=False):
+    """
+    Runs the recorded job's runs on the stub worker in `workdir`. Returns
+    (manifest, [stage seconds per run]).
+    """
+    manifest = load_manifest(bundle_dir)
+    workdir = Path(workdir)
+    fixtures_dir = workdir / "fixtures"
+    write_fixtures(bundle_dir, fixtures_dir, manifest, latency_scale)
+    # Worker, cache and index settings are read when the pipeline is imported.
+    os.environ.update({
+        "SW_WORKER_BACKEND": "stub",
+        "SW_STUB_FIXTURES": str(fixtures_dir),
+        "SW_STUB_LATENCY": "0",
+        "WORKER_POOL_SIZE": str(workers),
+        "RESULT_CACHE_DIR": str(workdir / "cache"),
+        "RESULT_CACHE_ENABLED": "0",
+        "FINGERPRINT_INDEX_PATH": str(workdir / "fingerprints.sqlite3"),
+        "RUNTIME_HISTORY_PATH": str(workdir / "runtime_history.json"),
+        "REPLAY_RECORD": "0"
+    })
+    import functools
+    import contextlib
+    import pipeline
+    from jobs import Job, JobManager
+
+    class ReplayJob(Job):
+        def stage(self, name, total=None):
+            super().stage(name, total)
+            if profiler:
+                profiler.switch(name)
+
+        def finish(self):
+            if profiler:
+                profiler.switch(None)
+            super().finish()
+
+    job_dir = workdir / "job"
+    job_dir.mkdir()
+    write_runs(job_dir, manifest, max_part_bytes)
+    runs = manifest["runs"]
+    job = ReplayJob(job_dir)
+    job.state["inputs"] = {"master_file": manifest["master"]["name"], "student_zip": runs[0]["zip"],
+                           "use_cache": False, "record": False, "assignment": "replay",
+                           "reports": manifest["inputs"].get("reports") or "eager"}
+    manager = JobManager(workdir, pipeline.run_assessment)
+    seconds = []
+    with open(os.devnull, 'w') as devnull, \
+            (contextlib.nullcontext() if verbose else contextlib.redirect_stdout(devnull)):
+        for idx, run in enumerate(runs):
+            runner = None
+            if idx:
+                job.state["inputs"]["late_zips"] = [r["zip"] for r in runs[1:idx + 1]]
+                runner = functools.partial(pipeline.run_late_submissions, zip_name=run["zip"])
+            manager.run(job, runner)
+            if job.status != "done":
+                raise RuntimeError(f"Replay of run {idx} failed: {job.state['error']}")
+            seconds.append({name: stage["finished"] - stage["started"]
+                            for name, stage in job.snapshot()["stages"].items() if stage["finished"]})
+    if profiler:
+        profiler.stop()
+    pipeline.get_worker_pool().shutdown()
+    return manifest, seconds
+
+
+def print_info(manifest):
+    runs = manifest["runs"]
+    recorded = time.strftime("%Y-%m-%d %H:%M", time.localtime(manifest["recorded"]))
+    print(f"Bundle recorded {recorded}: master {manifest['master']['name']}, {len(runs)} run(s)")
+    for run in runs:
+        parts = run["parts"]
+        worker = sum(part["timings"].get("analyze", 0.0) for part in parts)
+        retried = sum(1 for part in parts if part["attempts"] > 1)
+        print(f"  {run['zip']}: {len(parts)} parts, {sum(p['bytes'] for p in parts) / 1e6:.1f} MB, "
+              f"{worker:.1f} worker seconds, {retried} retried")
+
+
+def print_comparison(manifest, replayed):
+    print(f"\n{'run':<26} {'stage':<12} {'recorded s':>11} {'replay s':>9}")
+    for run, seconds in zip(manifest["runs"], replayed):
+        for stage, replay_seconds in seconds.items():
+            recorded = run["stages"].get(stage)
+            recorded = f"{recorded:11.3f}" if recorded is not None else f"{'-':>11}"
+            print(f"{run['zip']:<26} {stage:<12} {recorded} {replay_seconds:9.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    info = commands.add_parser("info", help="summarize a bundle")
+    info.add_argument("bundle")
+    run = commands.add_parser("run", help="replay a bundle through the pipeline")
+    run.add_argument("bundle")
+    run.add_argument("--latency-scale", type=float, default=0.0,
+                     help="fraction of the recorded worker seconds to simulate (default 0: none)")
+    run.add_argument("--workers", type=int, default=1, help="stub workers (default 1)")
+    run.add_argument("--max-part-mb", type=float, default=8, help="cap on placeholder part size")
+    run.add_argument("--profile", metavar="DIR", help="write per-stage cProfile dumps and print the top functions")
+    run.add_argument("--flamegraph", metavar="DIR", nargs="?", const=True,
+                     help="write per-stage folded stacks (into --profile DIR if no DIR is given)")
+    run.add_argument("--interval", type=float, default=5, help="sampling interval in ms for --flamegraph")
+    run.add_argument("--top", type=int, default=10, help="functions listed per stage with --profile")
+    run.add_argument("--keep", metavar="DIR", help="replay in DIR and keep the job directory")
+    run.add_argument("--verbose", action="store_true", help="show the pipeline's output")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bundle_dir = open_bundle(args.bundle, Path(tmp) / "bundle")
+        if args.command == "info":
+            print_info(load_manifest(bundle_dir))
+            return
+        output_dir = args.profile or (args.flamegraph if isinstance(args.flamegraph, str) else None)
+        if args.flamegraph and not output_dir:
+            parser.error("--flamegraph needs a directory, or --profile DIR")
+        profiler = None
+        if args.profile or args.flamegraph:
+            profiler = StageProfiler(profile=bool(args.profile), sample=bool(args.flamegraph),
+                                     interval=args.interval / 1000)
+        workdir = Path(args.keep) if args.keep else Path(tmp) / "replay"
+        workdir.mkdir(parents=True, exist_ok=False)
+        manifest, replayed = replay(bundle_dir, workdir, args.latency_scale, args.workers,
+                                    int(args.max_part_mb * 1024 * 1024), profiler, args.verbose)
+        print_info(manifest)
+        print_comparison(manifest, replayed)
+        if profiler:
+            profiler.write(output_dir, args.top)
+
+
+if __name__ == "__main__":
+    main()
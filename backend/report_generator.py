@@ -1,34 +1,22 @@
 # backend/report_generator.py
-from fpdf import FPDF
 from datetime import datetime
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import os, threading
+import grading
 
-class PDFReport(FPDF):
-    def header(self):
-        self.set_font('Arial', 'B', 11)
-        self.cell(0, 8, 'CAD Assessment Report', 0, 1, 'C')
-        self.ln(2)
-    
-    def footer(self):
-        self.set_y(-10)
-        self.set_font('Arial', 'I', 7)
-        self.cell(0, 5, f'Page {self.page_no()}', 0, 0, 'C')
+REPORT_WORKERS = int(os.environ.get("REPORT_WORKERS", "0")) or os.cpu_count() or 1
+BAND_COLORS = {"PASS": (0, 128, 0), "WARNING": (255, 140, 0), "FAIL": (255, 0, 0)}
 
 def get_accuracy_grade(deviation):
-    if deviation <= 0.5: return "A+"
-    elif deviation <= 1.5: return "A"
-    elif deviation <= 3.0: return "B"
-    elif deviation <= 5.0: return "C"
-    else: return "F"
+    return grading.accuracy_grade(deviation)
 
 def get_gdt_grade(score):
-    if score >= 95: return "A+"
-    elif score >= 90: return "A"
-    elif score >= 80: return "B"
-    elif score >= 70: return "C"
-    else: return "F"
+    return grading.gdt_grade(score)
 
 def create_report(analysis_data, plagiarism_info, output_pdf_path):
+    from pdf_report import PDFReport
     filename_stem = Path(analysis_data.get('student_file', '')).stem
     parts = filename_stem.split('_', 1)
     register_number, part_name = parts if len(parts) == 2 else ("N/A", filename_stem)
@@ -63,11 +51,25 @@ def create_report(analysis_data, plagiarism_info, output_pdf_path):
     if plagiarism_info.get('is_plagiarised'):
         pdf.set_text_color(255, 0, 0)
         copied_from = plagiarism_info.get('copied_from', [])
-        if copied_from:
+        matches = plagiarism_info.get('matches', [])
+        past_matches = plagiarism_info.get('past_matches', [])
+        geometry_matches = plagiarism_info.get('geometry_matches', [])
+        if matches:
+            ranked = [f"{Path(m['file']).stem.split('_', 1)[0]} ({m['similarity'] * 100:.0f}%)"
+                      for m in matches[:3]]
+            pdf.cell(0, 4, f"[ALERT] Similar to: {', '.join(ranked)}", 0, 1)
+        elif copied_from and not geometry_matches:
             regs = [Path(cf).stem.split('_', 1)[0] for cf in copied_from]
             pdf.cell(0, 4, f"[ALERT] Similar to: {', '.join(regs[:3])}", 0, 1)
-        else:
+        elif not past_matches and not geometry_matches:
             pdf.cell(0, 4, "[ALERT] Potential plagiarism detected", 0, 1)
+        if geometry_matches:
+            regs = [Path(m['file']).stem.split('_', 1)[0] for m in geometry_matches[:3]]
+            pdf.cell(0, 4, f"[ALERT] Near-identical geometry to: {', '.join(regs)}", 0, 1)
+        if past_matches:
+            ranked = [f"{Path(m['file']).stem.split('_', 1)[0]} ({m['semester']}, {m['similarity'] * 100:.0f}%)"
+                      for m in past_matches[:3]]
+            pdf.cell(0, 4, f"[ALERT] Similar to past cohorts: {', '.join(ranked)}", 0, 1)
     else:
         pdf.set_text_color(0, 128, 0)
         pdf.cell(0, 4, "[PASS] No plagiarism detected", 0, 1)
@@ -81,7 +83,8 @@ def create_report(analysis_data, plagiarism_info, output_pdf_path):
     pdf.set_font('Arial', '', 8)
     
     deviation = analysis_data.get('volume_deviation_percent', 0.0)
-    accuracy_grade = get_accuracy_grade(deviation)
+    # Grades and the overall score come precomputed from the job's score table.
+    accuracy_grade = analysis_data.get('accuracy_grade') or get_accuracy_grade(deviation)
     master_vol = analysis_data.get('master_volume_mm3', 0.0)
     student_vol = analysis_data.get('student_volume_mm3', 0.0)
     
@@ -90,15 +93,10 @@ def create_report(analysis_data, plagiarism_info, output_pdf_path):
     pdf.cell(0, 4, f"Dev: {deviation:.2f}%", 0, 1)
     
     pdf.set_font('Arial', 'B', 9)
-    if deviation <= 1.5:
-        pdf.set_text_color(0, 128, 0)
-        status_text = f"Grade: {accuracy_grade} [PASS]"
-    elif deviation <= 5.0:
-        pdf.set_text_color(255, 140, 0)
-        status_text = f"Grade: {accuracy_grade} [WARNING]"
-    else:
-        pdf.set_text_color(255, 0, 0)
-        status_text = f"Grade: {accuracy_grade} [FAIL]"
+    # Bands follow the grade scale, so a GRADING_CONFIG override never prints "F [PASS]".
+    band = grading.accuracy_band(accuracy_grade)
+    pdf.set_text_color(*BAND_COLORS[band])
+    status_text = f"Grade: {accuracy_grade} [{band}]"
     
     pdf.cell(0, 4, status_text, 0, 1)
     pdf.set_text_color(0)
@@ -111,7 +109,7 @@ def create_report(analysis_data, plagiarism_info, output_pdf_path):
     
     gdt_comp = analysis_data.get('gdt_comparison', {})
     gdt_score = gdt_comp.get('score', 0)
-    gdt_grade = get_gdt_grade(gdt_score)
+    gdt_grade = analysis_data.get('gdt_grade') or get_gdt_grade(gdt_score)
     
     pdf.cell(50, 4, f"Score: {gdt_score}% ({gdt_grade})", 0, 0)
     pdf.cell(50, 4, f"Required: {gdt_comp.get('total_required', 0)}", 0, 0)
@@ -120,7 +118,7 @@ def create_report(analysis_data, plagiarism_info, output_pdf_path):
     missing_count = gdt_comp.get('missing_count', 0)
     
     pdf.set_font('Arial', 'B', 9)
-    if gdt_score >= 95:
+    if gdt_score >= grading.gdt_pass_score():
         pdf.set_text_color(0, 128, 0)
         pdf.cell(0, 4, "[PASS] All GD&T present", 0, 1)
     elif missing_count > 0:
@@ -148,23 +146,12 @@ def create_report(analysis_data, plagiarism_info, output_pdf_path):
     pdf.set_font('Arial', 'B', 10)
     pdf.cell(0, 5, 'OVERALL', 0, 1)
     
-    accuracy_percent = 100 - min(deviation * 10, 100)
-    overall_score = (accuracy_percent * 0.6) + (gdt_score * 0.4)
-    
-    if overall_score >= 90:
-        overall_grade = "Excellent"
-        color = (0, 128, 0)
-    elif overall_score >= 75:
-        overall_grade = "Good"
-        color = (0, 128, 0)
-    elif overall_score >= 60:
-        overall_grade = "Satisfactory"
-        color = (255, 140, 0)
-    else:
-        overall_grade = "Needs Improvement"
-        color = (255, 0, 0)
+    overall_score = analysis_data.get('overall_score')
+    if overall_score is None:
+        overall_score = float(grading.overall_scores(deviation, gdt_score))
+    overall_grade = analysis_data.get('overall_label') or str(grading.overall_labels([overall_score])[0])
     
-    pdf.set_text_color(*color)
+    pdf.set_text_color(*BAND_COLORS[grading.overall_band(overall_grade)])
     pdf.set_font('Arial', 'B', 11)
     pdf.cell(0, 6, f"{overall_grade} ({overall_score:.1f}/100)", 0, 1, 'C')
     pdf.set_text_color(0)
@@ -174,3 +161,87 @@ def create_report(analysis_data, plagiarism_info, output_pdf_path):
     pdf.multi_cell(0, 3, "Automated assessment. Faculty review recommended for final grading.")
     
     pdf.output(output_pdf_path)
+
+
+def _init_render_worker():
+    """
+    Runs once in each render process: loads fpdf2 and the core-font metrics
+    used by every report, so the first report is not slower than the rest.
+    The page itself is built anew for each report; a fresh PDFReport with
+    its header costs about 3% of a render.
+    """
+    from pdf_report import PDFReport
+    pdf = PDFReport()
+    pdf.add_page()
+    for style in ('', 'B', 'I'):
+        pdf.set_font('Arial', style, 8)
+        pdf.get_string_width("CAD Assessment Report 0123456789")
+    pdf.output()
+
+def _render_one(task):
+    analysis_data, plagiarism_info, output_pdf_path = task
+    try:
+        create_report(analysis_data, plagiarism_info, output_pdf_path)
+        return output_pdf_path, None
+    except Exception as e:
+        return output_pdf_path, f"{type(e).__name__}: {e}"
+
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+def get_render_pool():
+    """Process pool shared by all jobs, so worker start-up is paid once."""
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = ProcessPoolExecutor(max_workers=REPORT_WORKERS, initializer=_init_render_worker)
+        return _render_pool
+
+def _discard_render_pool(pool):
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is pool:
+            _render_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def submit_report(task):
+    """
+    Queues one (analysis_data, plagiarism_info, output_pdf_path) task on the
+    render pool and returns a Future of (output_pdf_path, error).
+    """
+    pool = get_render_pool()
+    try:
+        future = pool.submit(_render_one, task)
+    except BrokenProcessPool:
+        _discard_render_pool(pool)
+        pool = get_render_pool()
+        future = pool.submit(_render_one, task)
+
+    def discard_if_broken(done):
+        if isinstance(done.exception(), BrokenProcessPool):
+            _discard_render_pool(pool)
+    future.add_done_callback(discard_if_broken)
+    return future
+
+def render_reports(tasks, parallel=True):
+    """
+    Renders (analysis_data, plagiarism_info, output_pdf_path) tasks and yields
+    (output_pdf_path, error) as each report finishes; error is None on success.
+    A failing report never stops the others.
+    """
+    tasks = list(tasks)
+    if not parallel or REPORT_WORKERS <= 1 or len(tasks) < 2:
+        for task in tasks:
+            yield _render_one(task)
+        return
+
+    pool = get_render_pool()
+    futures = {pool.submit(_render_one, task): task for task in tasks}
+    for future in as_completed(futures):
+        try:
+            yield future.result()
+        except BrokenProcessPool as e:
+            # A render process died (e.g. out of memory); retry this report
+            # in-process and start a fresh pool for the next job.
+            _discard_render_pool(pool)
+            yield _render_one(futures[future])
@@ -0,0 +1,121 @@
+# backend/result_cache.py
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(file_path):
+    """SHA-256 hex digest of a file, read in 1 MiB chunks."""
+    sha = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class ResultCache:
+    """
+    Persistent, content-addressed store of worker results.
+
+    Entries are keyed by the SHA-256 of the part bytes plus the analyzer id
+    (backend name and version), so a worker upgrade never serves stale data.
+    The cache is bounded to `max_bytes`; the least recently used entries are
+    evicted first (recency is tracked through file mtimes so it survives
+    restarts).
+    """
+
+    def __init__(self, cache_dir, max_bytes=512 * 1024 * 1024, enabled=True):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> size, oldest first
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        if enabled:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._load_index()
+
+    def _load_index(self):
+        entries = []
+        for path in self.cache_dir.glob("*/*.json"):
+            stat = path.stat()
+            entries.append((stat.st_mtime, path.stem, stat.st_size))
+        for _, key, size in sorted(entries):
+            self._entries[key] = size
+            self._total_bytes += size
+
+    @staticmethod
+    def make_key(digest, analyzer_id):
+        return hashlib.sha256(f"{analyzer_id}:{digest}".encode()).hexdigest()
+
+    def _path(self, key):
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, digest, analyzer_id):
+        if not self.enabled:
+            return None
+        key = self.make_key(digest, analyzer_id)
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            path = self._path(key)
+            try:
+                with open(path, 'r') as f:
+                    result = json.load(f)
+                os.utime(path)
+            except (OSError, ValueError):
+                self._total_bytes -= self._entries.pop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, digest, analyzer_id, result):
+        if not self.enabled:
+            return
+        key = self.make_key(digest, analyzer_id)
+        data = json.dumps(result, separators=(',', ':')).encode()
+        path = self._path(key)
+        with self._lock:
+            path.parent.mkdir(exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+            self._total_bytes -= self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            self._total_bytes += len(data)
+            self._evict()
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
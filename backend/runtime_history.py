@@ -0,0 +1,83 @@
+# backend/runtime_history.py
+"""
+Expected analysis seconds per part, used to dispatch the longest parts first.
+
+Worker seconds are remembered per part (by content digest and by file name)
+in a small JSON file. Parts never seen before are estimated from their size
+with a seconds-per-MB rate learned from earlier analyses, so a cold history
+still orders the queue largest-first.
+"""
+import json
+import os
+import threading
+from pathlib import Path
+
+DEFAULT_SECONDS_PER_MB = 1.0
+RATE_DECAY = 0.99  # weight of the earlier totals in the seconds-per-MB rate at each new analysis
+
+
+class RuntimeHistory:
+    def __init__(self, path, max_entries=20000):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.seconds = {}  # "sha256:<digest>" or "name:<file name>" -> last worker seconds
+        self.total_seconds, self.total_mb = 0.0, 0.0  # decayed sums behind the seconds-per-MB rate
+        self._dirty = False
+        self._lock = threading.Lock()
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            self.seconds = data.get("seconds", {})
+            self.total_seconds, self.total_mb = data.get("total_seconds", 0.0), data.get("total_mb", 0.0)
+        except (OSError, ValueError):
+            pass
+
+    @property
+    def seconds_per_mb(self):
+        return self.total_seconds / self.total_mb if self.total_mb else DEFAULT_SECONDS_PER_MB
+
+    @staticmethod
+    def _keys(file_path, digest):
+        keys = [f"sha256:{digest}"] if digest else []
+        return keys + [f"name:{Path(file_path).name.lower()}"]
+
+    def estimate(self, file_path, digest=None, size=None):
+        """Expected worker seconds for a part: its own history, else its size times the learned rate."""
+        with self._lock:
+            for key in self._keys(file_path, digest):
+                if key in self.seconds:
+                    return self.seconds[key]
+            rate = self.seconds_per_mb
+        if size is None:
+            try:
+                size = os.path.getsize(file_path)
+            except OSError:
+                size = 0
+        return size / 1e6 * rate
+
+    def record(self, file_path, digest, seconds, size=None):
+        if size is None:
+            try:
+                size = os.path.getsize(file_path)
+            except OSError:
+                size = 0
+        with self._lock:
+            for key in self._keys(file_path, digest):
+                self.seconds.pop(key, None)  # re-insert, so the oldest entries are dropped first
+                self.seconds[key] = round(seconds, 4)
+            while len(self.seconds) > self.max_entries:
+                del self.seconds[next(iter(self.seconds))]
+            self.total_seconds = self.total_seconds * RATE_DECAY + seconds
+            self.total_mb = self.total_mb * RATE_DECAY + size / 1e6
+            self._dirty = True
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, 'w') as f:
+                json.dump({"total_seconds": self.total_seconds, "total_mb": self.total_mb, "seconds": self.seconds}, f)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
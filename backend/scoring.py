@@ -0,0 +1,192 @@
+# backend/scoring.py
+"""
+Columnar scoring: one table of NumPy columns per job with a row per student.
+
+Volume deviation, accuracy/GD&T grades and the overall score are computed
+for the whole cohort in a few array operations, using the grade scale in
+grading.py that the PDF reports share. The summary is exported from the
+same table as CSV and as JSON for the results view with the standard
+library; pandas is imported only for Parquet or XLSX exports.
+"""
+import csv
+import io
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from grading import accuracy_grades, gdt_grades, overall_scores, overall_labels, volume_deviations
+
+SUMMARY_FORMATS = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+}
+
+
+class ScoreTable:
+    """Equal-length NumPy columns by name, with one row per student file (`index`)."""
+
+    def __init__(self, index):
+        self.index = list(index)
+        self.columns = {}
+        self._rows = {name: row for row, name in enumerate(self.index)}
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    def __setitem__(self, column, values):
+        """Sets a column from a sequence of len(table) values or one value for every row."""
+        if np.ndim(values) == 0:
+            values = np.full(len(self), values)
+        values = np.asarray(values) if len(values) else np.array([], dtype=object)
+        if len(values) != len(self):
+            raise ValueError(f"Column {column} has {len(values)} values for {len(self)} rows")
+        self.columns[column] = values
+
+    def rows(self, names, columns):
+        """{file name: {column: value}} for `names`, with plain Python values."""
+        positions = [self._rows[name] for name in names]
+        values = {column: self.columns[column][positions].tolist() for column in columns}
+        return {name: {column: values[column][i] for column in columns} for i, name in enumerate(names)}
+
+
+def base_changes(alignment):
+    """'changed: Cut1; missing: Fillet2' from a record's base_alignment; '' if the base is intact."""
+    return "; ".join(f"{kind}: {', '.join(alignment[kind])}"
+                     for kind in ("changed", "moved", "missing") if alignment.get(kind))
+
+
+def build_table(state):
+    """
+    Scores every student in a pipeline state ({"master", "students",
+    "plagiarism", "render_errors"}) and returns one ScoreTable indexed by file name.
+    """
+    students, plagiarism = state["students"], state["plagiarism"]
+    names = list(students)
+    records = [students[name] for name in names]
+    infos = [plagiarism.get(name, {}) for name in names]
+    gdt = [record["gdt_comparison"] for record in records]
+    render_errors = state.get("render_errors", {})
+
+    table = ScoreTable(names)
+    stems = [name.rsplit(".", 1)[0] for name in names]
+    split = [stem.split("_", 1) for stem in stems]
+    table["register_number"] = [parts[0] if len(parts) == 2 else "N/A" for parts in split]
+    table["part_name"] = [parts[-1] for parts in split]
+    table["student_volume_mm3"] = np.array([record.get("student_volume_mm3", 0.0) for record in records],
+                                           dtype=float)
+    table["gdt_score"] = np.array([comparison["score"] for comparison in gdt], dtype=float)
+    table["gdt_status"] = [comparison["status"] for comparison in gdt]
+    table["missing_gdt"] = np.array([comparison["missing_count"] for comparison in gdt], dtype=np.int64)
+    table["base_modified"] = np.array([record.get("base_modified", False) for record in records], dtype=bool)
+    table["base_changes"] = [base_changes(record.get("base_alignment", {})) for record in records]
+    table["is_plagiarised"] = np.array([info.get("is_plagiarised", False) for info in infos], dtype=bool)
+    table["max_similarity"] = np.array([info.get("max_similarity", 0.0) for info in infos], dtype=float)
+    table["similar_to"] = ["; ".join(info.get("copied_from", [])) for info in infos]
+    table["past_cohort_matches"] = ["; ".join(f"{m['file']} ({m['semester']})" for m in info.get("past_matches", []))
+                                    for info in infos]
+    table["geometry_matches"] = ["; ".join(m["file"] for m in info.get("geometry_matches", [])) for info in infos]
+    table["analysis_error"] = [record.get("analysis_error", "") or "" for record in records]
+    table["render_error"] = [render_errors.get(name, "") for name in names]
+
+    master_volume = state["master"]["volume_mm3"]
+    table["master_volume_mm3"] = float(master_volume)
+    table["volume_deviation_percent"] = volume_deviations(table["student_volume_mm3"], master_volume)
+    table["accuracy_grade"] = accuracy_grades(table["volume_deviation_percent"])
+    table["gdt_grade"] = gdt_grades(table["gdt_score"])
+    table["overall_score"] = overall_scores(table["volume_deviation_percent"], table["gdt_score"])
+    table["overall_label"] = overall_labels(table["overall_score"])
+    return table
+
+
+def summary_columns(table):
+    """The summary report columns ({header: list of values}), built column by column from the score table."""
+    errors = ["OK" if not analysis_error else f"FAILED: {analysis_error}"
+              for analysis_error in table["analysis_error"].tolist()]
+    errors = [f"{error}; REPORT FAILED: {render_error}" if render_error else error
+              for error, render_error in zip(errors, table["render_error"].tolist())]
+    return {
+        "Register Number": table["register_number"].tolist(),
+        "Part Name": table["part_name"].tolist(),
+        "Volume Deviation (%)": [f"{deviation:.4f}" for deviation in table["volume_deviation_percent"].tolist()],
+        "Accuracy Grade": table["accuracy_grade"].tolist(),
+        "GD&T Score (%)": table["gdt_score"].round(2).tolist(),
+        "GD&T Status": table["gdt_status"].tolist(),
+        "Missing GD&T": table["missing_gdt"].tolist(),
+        "Base Model Changes": table["base_changes"].tolist(),
+        "Overall Score": table["overall_score"].round(1).tolist(),
+        "Overall": table["overall_label"].tolist(),
+        "Plagiarism Flag": ["YES" if flagged else "NO" for flagged in table["is_plagiarised"].tolist()],
+        "Max Similarity (%)": (table["max_similarity"] * 100).round(1).tolist(),
+        "Similar To": table["similar_to"].tolist(),
+        "Past Cohort Matches": table["past_cohort_matches"].tolist(),
+        "Geometric Matches": table["geometry_matches"].tolist(),
+        "Errors": errors
+    }
+
+
+def export_results(table, path):
+    """
+    Writes the summary with each student's file name as compact JSON
+    ({"columns": [...], "data": [[...], ...]}) for the results view.
+    """
+    columns = {"File": table.index, **summary_columns(table)}
+    with open(path, 'w', encoding="utf-8") as f:
+        json.dump({"columns": list(columns), "data": [list(row) for row in zip(*columns.values())]},
+                  f, separators=(",", ":"))
+
+
+def _write_csv(columns, f):
+    writer = csv.writer(f, lineterminator=os.linesep)
+    writer.writerow(columns)
+    writer.writerows(zip(*columns.values()))
+
+
+def _data_frame(columns, fmt, needs):
+    try:
+        import pandas as pd
+    except ImportError as e:
+        raise ValueError(f"{fmt} export needs pandas and {needs}: {e}")
+    return pd.DataFrame(columns)
+
+
+def export_summary(table, destination, fmt="csv"):
+    """
+    Writes the summary of a score table to a path or binary file object.
+    CSV is written with the csv module; Parquet needs pandas and pyarrow and
+    XLSX needs pandas and openpyxl; a missing one raises ValueError.
+    """
+    columns = summary_columns(table)
+    if fmt == "csv":
+        if isinstance(destination, (str, Path)):
+            with open(destination, 'w', newline="", encoding="utf-8") as f:
+                _write_csv(columns, f)
+        else:
+            text = io.StringIO(newline="")
+            _write_csv(columns, text)
+            destination.write(text.getvalue().encode())
+    elif fmt == "parquet":
+        frame = _data_frame(columns, "Parquet", "pyarrow")
+        try:
+            frame.to_parquet(destination, index=False)
+        except ImportError as e:
+            raise ValueError(f"Parquet export needs pyarrow: {e}")
+    elif fmt == "xlsx":
+        frame = _data_frame(columns, "XLSX", "openpyxl")
+        try:
+            frame.to_excel(destination, index=False, sheet_name="Summary")
+        except ImportError as e:
+            raise ValueError(f"XLSX export needs openpyxl: {e}")
+    else:
+        raise ValueError(f"Unknown summary format: {fmt}")
+
+
+def summary_bytes(table, fmt="csv"):
+    buffer = io.BytesIO()
+    export_summary(table, buffer, fmt)
+    return buffer.getvalue()
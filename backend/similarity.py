@@ -0,0 +1,200 @@
+# backend/similarity.py
+import re
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+NUM_PERM = 160
+LSH_BANDS = 32  # 32 bands x 5 rows: pairs above ~0.5 Jaccard become candidates
+MERSENNE_PRIME = (1 << 31) - 1
+EMPTY_SIGNATURE_VALUE = MERSENNE_PRIME
+_BAND_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+_TRAILING_NUMBER = re.compile(r"[\s_\-]*\d+$")
+GEOMETRY_BLOCK = 2048  # descriptor rows per block of the pairwise distance search
+
+
+def _token(text):
+    return zlib.crc32(text.encode("utf-8"))
+
+
+def normalize_feature_name(name):
+    """'Boss-Extrude12' -> 'boss-extrude': SOLIDWORKS auto-numbering carries no signal."""
+    return _TRAILING_NUMBER.sub("", str(name).strip().lower())
+
+
+def shingle_delta(delta, ngram=3):
+    """
+    Turns a feature delta into a set of 32-bit shingles.
+
+    Feature-type 2- and 3-grams capture the order of the new work locally, so
+    one reordered or inserted feature only changes a few shingles. Normalised
+    names and other feature attributes are added as order-free tokens, so a
+    renamed feature only drops its own name token.
+    """
+    types = [str(feature.get("type", "")) for feature in delta]
+    shingles = set()
+    for size in range(min(2, len(types)), ngram + 1):
+        for idx in range(len(types) - size + 1):
+            shingles.add(_token("t:" + "|".join(types[idx:idx + size])))
+
+    for feature in delta:
+        for key, value in feature.items():
+            if key == "name":
+                shingles.add(_token("n:" + normalize_feature_name(value)))
+            elif key != "type":
+                shingles.add(_token(f"a:{key}={value}"))
+    return shingles
+
+
+def jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class MinHasher:
+    """MinHash signatures using universal hashing (a*x + b) mod (2^31 - 1)."""
+
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+    def signature(self, shingles):
+        if not shingles:
+            return np.full(self.num_perm, EMPTY_SIGNATURE_VALUE, dtype=np.uint32)
+        values = np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+        # a < 2^31 and values < 2^32, so the products fit in uint64.
+        hashed = (np.outer(values, self.a) + self.b) % np.uint64(MERSENNE_PRIME)
+        return hashed.min(axis=0).astype(np.uint32)
+
+    def signatures(self, shingle_sets):
+        matrix = np.empty((len(shingle_sets), self.num_perm), dtype=np.uint32)
+        for row, shingles in enumerate(shingle_sets):
+            matrix[row] = self.signature(shingles)
+        return matrix
+
+
+def band_hashes(signatures, bands=LSH_BANDS):
+    """
+    Collapses each band of rows into one 64-bit key.
+    `signatures` is (n, num_perm); the result is (n, bands) int64, which can be
+    stored directly in an integer database column.
+    """
+    signatures = np.atleast_2d(signatures)
+    n, num_perm = signatures.shape
+    rows = num_perm // bands
+    banded = signatures[:, :bands * rows].reshape(n, bands, rows).astype(np.uint64)
+    keys = np.zeros((n, bands), dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for row in range(rows):
+            keys = keys * _BAND_MULTIPLIER + banded[:, :, row] + np.uint64(1)
+        # Salt each band so equal rows in different bands never collide.
+        keys ^= np.arange(bands, dtype=np.uint64) * _BAND_MULTIPLIER
+    return keys.view(np.int64)
+
+
+def candidate_pairs(signatures, bands=LSH_BANDS):
+    """Index pairs (i < j) that share at least one LSH band bucket."""
+    keys = band_hashes(signatures, bands)
+    pairs = set()
+    for band in range(keys.shape[1]):
+        buckets = defaultdict(list)
+        for idx, key in enumerate(keys[:, band].tolist()):
+            buckets[key].append(idx)
+        for members in buckets.values():
+            if len(members) > 1:
+                for i, first in enumerate(members):
+                    for second in members[i + 1:]:
+                        pairs.add((first, second))
+    return pairs
+
+
+def fingerprint(deltas, hasher=None):
+    """Returns (names, shingle sets, MinHash signature matrix) for {name: delta}."""
+    names = list(deltas)
+    shingle_sets = [shingle_delta(deltas[name]) for name in names]
+    signatures = (hasher or MinHasher()).signatures(shingle_sets)
+    return names, shingle_sets, signatures
+
+
+def find_similar(deltas, threshold=0.6, num_perm=NUM_PERM, bands=LSH_BANDS, hasher=None, only=None):
+    """
+    Near-duplicate search over {name: delta}.
+    Candidates come from MinHash/LSH in roughly linear time and are then
+    verified with the exact Jaccard score of their shingle sets.
+    Returns {name: [(other_name, score), ...]} ranked by score, keeping only
+    pairs with score >= threshold. If `only` is given, just the pairs that
+    involve at least one of those names are verified.
+    """
+    names, shingle_sets, signatures = fingerprint(deltas, hasher or MinHasher(num_perm))
+
+    wanted = None if only is None else {idx for idx, name in enumerate(names) if name in only}
+    matches = {name: [] for name in names}
+    for i, j in candidate_pairs(signatures, bands):
+        if wanted is not None and i not in wanted and j not in wanted:
+            continue
+        score = jaccard(shingle_sets[i], shingle_sets[j])
+        if score >= threshold:
+            matches[names[i]].append((names[j], score))
+            matches[names[j]].append((names[i], score))
+    for ranked in matches.values():
+        ranked.sort(key=lambda item: (-item[1], item[0]))
+    return matches
+
+
+def descriptor_matrix(descriptors, size=None):
+    """
+    (names, float64 matrix) of the descriptors in {name: descriptor} with
+    `size` entries (default: the first non-empty one's); others are skipped.
+    """
+    if size is None:
+        size = next((len(descriptor) for descriptor in descriptors.values() if descriptor), 0)
+    names = [name for name, descriptor in descriptors.items() if size and len(descriptor or ()) == size]
+    return names, np.array([descriptors[name] for name in names], dtype=np.float64).reshape(len(names), size)
+
+
+def find_geometric_matches(descriptors, threshold, reference=None, only=None, block=GEOMETRY_BLOCK):
+    """
+    Geometrically near-identical parts: pairs whose descriptors are within
+    Euclidean `threshold`. Distances are computed block by block as
+    |x|^2 + |y|^2 - 2 x.y, so memory stays at block x n and no pair is
+    visited in Python unless it matches. Parts within `threshold` of the
+    `reference` descriptor (the unchanged base part) are left out. With
+    `only`, just pairs involving one of those names are kept.
+    Returns {name: [(other_name, distance), ...]} nearest first.
+    """
+    names, matrix = descriptor_matrix(descriptors, len(reference) if reference else None)
+    if reference and len(names):
+        keep = np.linalg.norm(matrix - np.asarray(reference, dtype=np.float64), axis=1) > threshold
+        names, matrix = [name for name, kept in zip(names, keep.tolist()) if kept], matrix[keep]
+    matches = {name: [] for name in descriptors}
+    if len(names) < 2:
+        return matches
+
+    wanted = None if only is None else np.array([name in only for name in names])
+    norms = np.einsum("ij,ij->i", matrix, matrix)
+    # A little slack for rounding in the expanded form; candidates are rechecked exactly below.
+    limit = threshold * threshold + 1e-9 * (1.0 + float(norms.max()))
+    for start in range(0, len(names), block):
+        stop = min(start + block, len(names))
+        # Only columns after each row, so every pair is scored once.
+        squared = norms[start:stop, None] + norms[None, start:] - 2.0 * (matrix[start:stop] @ matrix[start:].T)
+        rows, cols = np.nonzero(squared <= limit)
+        cols = cols + start
+        upper = cols > rows + start
+        rows, cols = rows[upper] + start, cols[upper]
+        if wanted is not None:
+            involved = wanted[rows] | wanted[cols]
+            rows, cols = rows[involved], cols[involved]
+        # Exact distances for the few candidates; the expanded form loses precision near zero.
+        distances = np.linalg.norm(matrix[rows] - matrix[cols], axis=1)
+        for i, j, distance in zip(rows.tolist(), cols.tolist(), distances.tolist()):
+            if distance <= threshold:
+                matches[names[i]].append((names[j], distance))
+                matches[names[j]].append((names[i], distance))
+    for ranked in matches.values():
+        ranked.sort(key=lambda item: (item[1], item[0]))
+    return matches
@@ -0,0 +1,32 @@
+# backend/submissions.py
+"""
+Student submission file names: `RegNo_PartName.sldprt`. A name that is
+already taken in a job (a late resubmission, or the same name twice in one
+archive) is stored by ingest.extract_parts as `RegNo_PartName (2).sldprt`.
+"""
+import re
+from pathlib import Path
+
+_COPY_SUFFIX = re.compile(r" \(\d+\)$")
+
+
+def register_number(name):
+    """The register number of a `RegNo_PartName.sldprt` file name; None if it has none."""
+    parts = Path(name).stem.split("_", 1)
+    return parts[0] if len(parts) == 2 else None
+
+
+def submission_key(name):
+    """
+    The student and part a file is a submission of: its lower-cased stem
+    without the " (2)" suffix, so every version of it has the same key.
+    """
+    return _COPY_SUFFIX.sub("", Path(name).stem).lower()
+
+
+def same_student(name, other):
+    """Whether two files are submissions of one student (same register number, or the same part without one)."""
+    own = register_number(name)
+    if own is not None:
+        return register_number(other) == own
+    return submission_key(name) == submission_key(other)
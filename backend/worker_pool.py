@@ -0,0 +1,370 @@
+# backend/worker_pool.py
+import heapq
+import itertools
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+
+from metrics import (WORKER_STEP_SECONDS, WORKER_STARTUP_SECONDS, WORKER_QUEUE_SECONDS, WORKER_FAILURES,
+                     FILES_ANALYZED)
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+WORKER_SCRIPT_PATH = PROJECT_ROOT / "worker" / "sw_worker.py"
+WORKER_TIMEOUT = float(os.environ.get("WORKER_TIMEOUT", "600"))  # seconds per part, 0 waits forever
+WORKER_RETRIES = int(os.environ.get("WORKER_RETRIES", "1"))
+WORKER_STARTUP_TIMEOUT = float(os.environ.get("WORKER_STARTUP_TIMEOUT", "120"))
+
+
+class WorkerError(Exception):
+    pass
+
+
+class WorkerTimeout(WorkerError):
+    pass
+
+
+def default_python_executable():
+    venv_python = PROJECT_ROOT / "venv" / "Scripts" / "python.exe"
+    return str(venv_python) if venv_python.exists() else sys.executable
+
+
+class WorkerProcess:
+    """One resident `sw_worker.py --serve` (or `--batch -`) process talking JSON lines over pipes."""
+
+    def __init__(self, python_executable, backend=None, env=None, startup_timeout=WORKER_STARTUP_TIMEOUT,
+                 mode=("--serve",)):
+        command = [str(python_executable), str(WORKER_SCRIPT_PATH), *mode]
+        if backend:
+            command += ["--backend", backend]
+        self.proc = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                     text=True, bufsize=1, env=env)
+        self._ids = itertools.count()
+        self.last_timings = {}  # step -> seconds reported with the last result
+        # Pipes cannot be read with a timeout on Windows, so a thread forwards
+        # the worker's lines and reads wait on the queue instead.
+        self._lines = queue.Queue()
+        threading.Thread(target=self._forward, name="sw-worker-reader", daemon=True).start()
+        try:
+            self.info = self._read(startup_timeout)
+        except WorkerError:
+            self.kill()
+            raise
+        if self.info.get("event") != "ready":
+            self.kill()
+            raise WorkerError(f"Worker failed to start: {self.info}")
+
+    def _forward(self):
+        for line in self.proc.stdout:
+            self._lines.put(line)
+        self._lines.put(None)
+
+    def _read(self, timeout=None):
+        try:
+            line = self._lines.get(timeout=timeout or None)
+        except queue.Empty:
+            raise WorkerTimeout(f"No response from worker within {timeout:g}s")
+        if line is None:
+            try:
+                code = self.proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                code = None
+            raise WorkerError(f"Worker exited unexpectedly (code {code})")
+        try:
+            return json.loads(line)
+        except ValueError:
+            raise WorkerError(f"Unreadable worker response: {line[:200]!r}")
+
+    def alive(self):
+        return self.proc.poll() is None
+
+    def analyze(self, file_path, timeout=None):
+        """Result for one part; raises WorkerTimeout if the worker has not answered within `timeout` seconds."""
+        request_id = next(self._ids)
+        try:
+            self.proc.stdin.write(json.dumps({"id": request_id, "path": str(file_path)}) + "\n")
+            self.proc.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise WorkerError(f"Worker pipe closed: {e}")
+        response = self._read(timeout)
+        if response.get("id") != request_id:
+            raise WorkerError(f"Out-of-order worker response: {response.get('id')} != {request_id}")
+        self.last_timings = response.get("timings", {})
+        return response["result"]
+
+    def close(self):
+        if self.alive():
+            try:
+                self.proc.stdin.write(json.dumps({"command": "shutdown"}) + "\n")
+                self.proc.stdin.close()
+                self.proc.wait(timeout=10)
+            except (OSError, subprocess.TimeoutExpired):
+                self.kill()
+
+    def kill(self):
+        """Stops a hung or broken worker at once."""
+        if self.alive():
+            self.proc.kill()
+        self.proc.wait()
+
+
+class FairQueue:
+    """
+    Work queue shared by many jobs. Each job has its own heap ordered by item
+    key; `get` serves the highest job priority first and, within a priority,
+    the jobs in turn (round-robin), so one large job cannot hold every worker
+    while a small one waits.
+    """
+
+    def __init__(self):
+        self._jobs = {}  # job id -> {"heap", "priority", "turn"}
+        self._turns = itertools.count()
+        self._order = itertools.count()
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def put(self, item, key=(), job_id=None, job_priority=0):
+        with self._cond:
+            state = self._jobs.get(job_id)
+            if state is None:
+                state = self._jobs[job_id] = {"heap": [], "priority": job_priority, "turn": next(self._turns)}
+            state["priority"] = max(state["priority"], job_priority)
+            heapq.heappush(state["heap"], (key, next(self._order), item))
+            self._cond.notify()
+
+    def get(self):
+        """Blocks for the next item; returns None once the queue is closed and drained."""
+        with self._cond:
+            while not self._jobs:
+                if self._closed:
+                    return None
+                self._cond.wait()
+            job_id = min(self._jobs, key=lambda j: (-self._jobs[j]["priority"], self._jobs[j]["turn"]))
+            state = self._jobs[job_id]
+            item = heapq.heappop(state["heap"])[-1]
+            if state["heap"]:
+                state["turn"] = next(self._turns)  # to the back of its priority's line
+            else:
+                del self._jobs[job_id]
+            return item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def reopen(self):
+        with self._cond:
+            self._closed = False
+
+    def depths(self):
+        """Queued items per job id."""
+        with self._cond:
+            return {job_id: len(state["heap"]) for job_id, state in self._jobs.items()}
+
+
+class WorkerPool:
+    """
+    N resident analysis workers fed from one shared queue.
+    Each worker keeps its CAD session open for its whole lifetime, so the
+    interpreter start, COM initialisation and SOLIDWORKS attach are paid once
+    per worker instead of once per file. Workers that die are respawned.
+
+    The pool size is the global limit on concurrent CAD sessions, so set it
+    to the licenses or instances available. Jobs share the workers through a
+    FairQueue: exam-priority jobs first, otherwise one part per job in turn.
+    Within a job, parts are taken by priority, then longest expected time
+    first, so the slowest parts do not start last and stretch the run.
+
+    A part whose worker does not answer within `timeout` seconds, crashes or
+    breaks the protocol has its worker killed and respawned, and is retried
+    up to `retries` times before its Future fails. Each Future carries
+    `attempts` and `timed_out` for the job's straggler report.
+
+    All workers attach to the running SOLIDWORKS instance, so keep size=1
+    unless each worker has its own instance.
+    """
+
+    def __init__(self, size=1, backend=None, python_executable=None, env=None,
+                 timeout=WORKER_TIMEOUT, retries=WORKER_RETRIES):
+        self.size = size
+        self.backend = backend
+        self.python_executable = python_executable or default_python_executable()
+        self.env = env
+        self.timeout = timeout
+        self.retries = retries
+        self.info = {}
+        self._ready = threading.Event()
+        self._jobs = FairQueue()
+        self._busy = 0
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return self
+            self._jobs.reopen()
+            for idx in range(self.size):
+                thread = threading.Thread(target=self._run, name=f"sw-worker-{idx}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        return self
+
+    def _spawn(self):
+        with WORKER_STARTUP_SECONDS.time():
+            worker = WorkerProcess(self.python_executable, self.backend, self.env)
+        self.info = worker.info
+        return worker
+
+    def analyzer_id(self, timeout=60):
+        """`<backend>-<version>` reported by the workers, or None if none came up."""
+        self.start()
+        self._ready.wait(timeout)
+        if not self.info:
+            return None
+        return f"{self.info['backend']}-{self.info['version']}"
+
+    def _run(self):
+        worker = None
+        try:
+            worker = self._spawn()
+        except Exception as e:
+            print(f"WARNING: analysis worker failed to start: {e}")
+        finally:
+            self._ready.set()
+        while True:
+            item = self._jobs.get()
+            if item is None:
+                break
+            file_path, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            with self._lock:
+                self._busy += 1
+            queued = time.perf_counter() - future.submitted
+            WORKER_QUEUE_SECONDS.observe(queued)
+            future.attempts, future.timed_out = 0, False
+            while True:
+                future.attempts += 1
+                try:
+                    if worker is None or not worker.alive():
+                        worker = self._spawn()
+                    result = worker.analyze(file_path, future.timeout)
+                except WorkerError as e:
+                    # Hung, crashed or out of step: this worker cannot be reused.
+                    if worker is not None:
+                        worker.kill()
+                        worker = None
+                    timed_out = isinstance(e, WorkerTimeout)
+                    future.timed_out = future.timed_out or timed_out
+                    retry = future.attempts <= self.retries
+                    WORKER_FAILURES.inc(reason="timeout" if timed_out else "crash",
+                                        action="retry" if retry else "give_up")
+                    print(f"WARNING: {Path(file_path).name}: {e} "
+                          f"(attempt {future.attempts}, {'retrying' if retry else 'giving up'})")
+                    if retry:
+                        continue
+                    future.set_exception(type(e)(f"{e} ({future.attempts} attempts)"))
+                except Exception as e:
+                    if worker is not None and not worker.alive():
+                        worker = None
+                    future.set_exception(e)
+                else:
+                    for step, seconds in worker.last_timings.items():
+                        WORKER_STEP_SECONDS.observe(seconds, step=step)
+                    FILES_ANALYZED.inc(source="worker", status=result.get("status", "Unknown"))
+                    # Read by the pipeline for the per-job timing file.
+                    future.timings = dict(worker.last_timings, queue=queued)
+                    future.set_result(result)
+                break
+            with self._lock:
+                self._busy -= 1
+        if worker is not None:
+            worker.close()
+
+    def submit(self, file_path, expected_seconds=0.0, priority=0, timeout=None, job_id=None, job_priority=0):
+        """
+        Queues a part for the job `job_id`. Within a job, higher `priority`
+        goes first, then larger `expected_seconds`; `job_priority` ranks the
+        job against the others. `timeout` overrides the pool's per-part timeout.
+        """
+        self.start()
+        future = Future()
+        future.submitted = time.perf_counter()
+        future.expected_seconds = expected_seconds
+        future.timeout = self.timeout if timeout is None else timeout
+        self._jobs.put((file_path, future), (-priority, -expected_seconds), job_id, job_priority)
+        return future
+
+    def analyze(self, file_path):
+        return self.submit(file_path).result()
+
+    def stats(self):
+        with self._lock:
+            busy = self._busy
+        return {"workers": self.size, "busy": busy, "queued": self._jobs.depths()}
+
+    def shutdown(self):
+        """Stops the workers once the queued parts are done."""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        self._jobs.close()
+        for thread in threads:
+            thread.join()
+
+
+def iter_batch(paths, backend=None, python_executable=None, env=None, timeout=WORKER_TIMEOUT):
+    """
+    Analyzes many parts in one `sw_worker.py --batch -` session and yields
+    (path, result, timings) as each part finishes, in manifest order. For
+    bulk runs that need no scheduling; a part that hangs longer than
+    `timeout` seconds ends the batch with WorkerTimeout.
+    """
+    paths = list(paths)
+    worker = WorkerProcess(python_executable or default_python_executable(), backend, env,
+                           mode=("--batch", "-"))
+
+    def feed():
+        try:
+            for request_id, path in enumerate(paths):
+                worker.proc.stdin.write(json.dumps({"id": request_id, "path": str(path)}) + "\n")
+            worker.proc.stdin.close()
+        except OSError:
+            pass  # the worker died; the reader reports it
+
+    threading.Thread(target=feed, name="sw-batch-feed", daemon=True).start()
+    try:
+        while True:
+            message = worker._read(timeout)
+            if message.get("event") == "done":
+                break
+            yield paths[message["id"]], message["result"], message.get("timings", {})
+    finally:
+        try:
+            worker.proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            pass
+        worker.kill()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_worker_pool():
+    """
+    Process-wide pool, configured from WORKER_POOL_SIZE (the number of CAD
+    licenses or instances) / SW_WORKER_BACKEND / WORKER_TIMEOUT / WORKER_RETRIES.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = WorkerPool(size=int(os.environ.get("WORKER_POOL_SIZE", "1")),
+                               backend=os.environ.get("SW_WORKER_BACKEND"))
+        return _pool.start()
@@ -0,0 +1,55 @@
+# backend/zipstream.py
+import io
+import zipfile
+from pathlib import Path
+
+COPY_CHUNK_SIZE = 256 * 1024
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, non-seekable buffer that zipfile writes into and we drain."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        chunks, self._chunks = self._chunks, []
+        if chunks:
+            yield b"".join(chunks)
+
+
+def iter_zip(entries, compression=zipfile.ZIP_STORED):
+    """
+    Yields a ZIP archive chunk by chunk for (arcname, source) entries, where
+    source is a path or bytes/str. Entries are pulled lazily, so the archive
+    can be sent while later entries are still being produced. Nothing is
+    written to disk and only one copy chunk is held in memory.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, 'w', compression) as zf:
+        for arcname, source in entries:
+            if isinstance(source, (bytes, str)):
+                zf.writestr(arcname, source)
+            else:
+                info = zipfile.ZipInfo.from_file(source, arcname)
+                info.compress_type = compression
+                with open(Path(source), 'rb') as src, zf.open(info, 'w') as dst:
+                    for chunk in iter(lambda: src.read(COPY_CHUNK_SIZE), b''):
+                        dst.write(chunk)
+                        yield from sink.drain()
+            yield from sink.drain()
+    yield from sink.drain()
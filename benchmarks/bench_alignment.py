@@ -0,0 +1,113 @@
+# benchmarks/bench_alignment.py
+"""
+Strict-prefix versus aligned base-model matching on a synthetic cohort.
+
+Students from benchmarks/synthetic.py get extra edits to their copy of the
+base: a renamed base feature, two swapped neighbours or a deleted one
+(--perturb-rate). Each student's delta is then taken two ways:
+
+  prefix   the old check: unless the tree starts with the exact base,
+           the whole tree is the delta
+  aligned  alignment.BaseAligner, built once from the master
+
+and plagiarism detection runs on both sets of deltas. Prints the time per
+student, the mean delta size of students whose base was touched, and the
+flagged pairs split into known copies and others. The aligned deltas of
+untouched students must equal the prefix ones.
+    python benchmarks/bench_alignment.py --students 2000 --base-features 40
+"""
+import argparse
+import contextlib
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "backend"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import pipeline
+from alignment import BaseAligner
+from synthetic import make_master, make_students
+
+
+def perturb(rng, signature, base_len):
+    """One edit inside the base part of a signature."""
+    signature = [dict(feature) for feature in signature]
+    idx = rng.randrange(1, base_len - 1)
+    edit = rng.choice(["rename", "swap", "delete"])
+    if edit == "rename":
+        signature[idx]["name"] = f"My{signature[idx]['type']}{rng.randint(1, 9)}"
+    elif edit == "swap":
+        signature[idx], signature[idx + 1] = signature[idx + 1], signature[idx]
+    else:
+        del signature[idx]
+    return signature
+
+
+def prefix_delta(base, signature):
+    if signature[:len(base)] == base:
+        return signature[len(base):], False
+    return signature, True
+
+
+def flagged_pairs(deltas):
+    records = {name: {"delta": delta} for name, delta in deltas.items()}
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        plagiarism = pipeline.detect_plagiarism(records)
+    return {tuple(sorted((name, other))) for name, info in plagiarism.items() for other in info["copied_from"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--base-features", type=int, default=40)
+    parser.add_argument("--perturb-rate", type=float, default=0.2)
+    parser.add_argument("--copy-rate", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    master = make_master(rng, base_features=args.base_features)
+    students, copies = make_students(rng, master, args.students, args.copy_rate, failure_rate=0.0)
+    base = master["signature"]
+    touched = set()
+    for name, result in students.items():
+        if rng.random() < args.perturb_rate:
+            result["signature"] = perturb(rng, result["signature"], len(base))
+            touched.add(name)
+
+    start = time.perf_counter()
+    prefix = {name: prefix_delta(base, result["signature"]) for name, result in students.items()}
+    prefix_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    aligner = BaseAligner(base)
+    aligned = {name: aligner.align(result["signature"]) for name, result in students.items()}
+    aligned_seconds = time.perf_counter() - start
+
+    for name in students:
+        if not prefix[name][1]:
+            assert aligned[name]["delta"] == prefix[name][0], f"{name}: aligned delta differs on an intact base"
+    # Students whose own base edit made the old check treat the whole tree as new work.
+    modified = [name for name in students if prefix[name][1]]
+    copy_pairs = {tuple(sorted(pair)) for pair in copies.items()}
+
+    print(f"{args.students} students, {len(base)} base features, {len(touched)} with an edited base, "
+          f"{len(modified)} with a modified base overall, {len(copies)} copies")
+    print(f"{'':<8} {'us/student':>11} {'mean delta':>11} {'copy pairs':>11} {'other pairs':>12}")
+    for label, seconds, deltas in (
+            ("prefix", prefix_seconds, {name: delta for name, (delta, _) in prefix.items()}),
+            ("aligned", aligned_seconds, {name: result["delta"] for name, result in aligned.items()})):
+        pairs = flagged_pairs(deltas)
+        mean_delta = sum(len(deltas[name]) for name in modified) / max(len(modified), 1)
+        print(f"{label:<8} {seconds / args.students * 1e6:>11.1f} {mean_delta:>11.1f} "
+              f"{len(pairs & copy_pairs):>11} {len(pairs - copy_pairs):>12}")
+    changes = {kind: sum(len(result[kind]) for result in aligned.values()) for kind in ("changed", "moved", "missing")}
+    print("aligned base features: " + ", ".join(f"{count} {kind}" for kind, count in changes.items()))
+
+
+if __name__ == "__main__":
+    main()
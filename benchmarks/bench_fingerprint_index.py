@@ -0,0 +1,81 @@
+# benchmarks/bench_fingerprint_index.py
+"""
+Lookup latency of the cross-cohort fingerprint index as it grows.
+
+Past cohorts of synthetic deltas (all for the same assignment, the worst
+case) are added to a fresh SQLite index; at each checkpoint a new cohort is
+looked up, with a share of its parts disguised copies of indexed parts.
+Reports query time per part, recall of the planted copies and index size.
+    python benchmarks/bench_fingerprint_index.py --checkpoints 10000 50000 100000 250000
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_similarity import random_delta, disguise
+from fingerprint_index import FingerprintIndex
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkpoints", type=int, nargs="+", default=[10000, 50000, 100000, 250000])
+    parser.add_argument("--cohort", type=int, default=500, help="parts per indexed job")
+    parser.add_argument("--queries", type=int, default=300, help="parts in the looked-up cohort")
+    parser.add_argument("--copy-rate", type=float, default=0.1)
+    args = parser.parse_args()
+    rng = random.Random(11)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "fingerprints.sqlite3"
+        index = FingerprintIndex(path)
+        indexed, jobs, sample = 0, 0, []
+        print(f"{'indexed':>9} {'build s':>8} {'query s':>8} {'ms/part':>8} {'recall':>7} {'MB':>7}")
+        for checkpoint in sorted(args.checkpoints):
+            start = time.perf_counter()
+            while indexed < checkpoint:
+                size = min(args.cohort, checkpoint - indexed)
+                deltas = {f"{jobs:04d}{idx:04d}_Part": random_delta(rng, rng.randint(15, 30)) for idx in range(size)}
+                index.add_cohort("Bracket", f"{2000 + jobs // 2}-S{jobs % 2 + 1}", f"job{jobs:05d}", deltas)
+                # Reservoir of indexed parts to plant copies from.
+                for name, delta in deltas.items():
+                    if len(sample) < 2000:
+                        sample.append((name, delta))
+                    elif rng.random() < 2000 / (indexed + 1):
+                        sample[rng.randrange(2000)] = (name, delta)
+                    indexed += 1
+                jobs += 1
+            build = time.perf_counter() - start
+
+            queries, planted = {}, {}
+            for idx in range(args.queries):
+                name = f"new{idx:04d}_Part"
+                if rng.random() < args.copy_rate:
+                    source, delta = rng.choice(sample)
+                    queries[name] = disguise(rng, delta)
+                    planted[name] = source
+                else:
+                    queries[name] = random_delta(rng, rng.randint(15, 30))
+
+            start = time.perf_counter()
+            found = index.query(queries, 0.6, assignment="Bracket")
+            elapsed = time.perf_counter() - start
+            hits = sum(1 for name, source in planted.items()
+                       if any(m["file"] == source for m in found.get(name, [])))
+            recall = hits / len(planted) if planted else 1.0
+            size_mb = sum(p.stat().st_size for p in Path(tmp).iterdir()) / 1e6
+            print(f"{indexed:>9} {build:>8.1f} {elapsed:>8.3f} {elapsed / args.queries * 1e3:>8.2f} "
+                  f"{recall:>7.3f} {size_mb:>7.1f}")
+
+        start = time.perf_counter()
+        removed = index.prune(semester="2000-S1")
+        print(f"prune one cohort: {removed} parts in {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
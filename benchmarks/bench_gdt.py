@@ -0,0 +1,87 @@
+# benchmarks/bench_gdt.py
+"""
+GD&T comparison: compare_gdt per student versus the batched bitset engine.
+
+Asserts that the engine's full and compact (expanded) comparisons are
+identical to compare_gdt, the per-student reference implementation in
+tests/gdt_reference.py (tests/test_gdt_engine.py checks the same), for
+every student, including the edge cases (no master GD&T, no student GD&T,
+duplicates, extras only) and that compact comparisons stored by earlier
+versions still expand, then times both (fastest of --repeat runs) for each
+cohort size and master vocabulary size (--annotations).
+    python benchmarks/bench_gdt.py --students 1000 10000 --annotations 8 40
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tests"))
+
+from gdt_engine import GDTEngine
+from gdt_reference import EDGE_CASES, compare_gdt
+from synthetic import make_assignment, make_gdt, TOLERANCES
+
+def check_equivalence(master_gdt, student_gdts):
+    engine = GDTEngine(master_gdt)
+    batch = engine.compare_batch(student_gdts)
+    for row, student_gdt in enumerate(student_gdts):
+        expected = compare_gdt(master_gdt, student_gdt)
+        assert batch.comparison(row) == expected, (row, batch.comparison(row), expected)
+        assert engine.expand(batch.compact(row)) == expected, (row, batch.compact(row), expected)
+        # Compact comparisons in state files written before the slimmer layout
+        older = {key: value for key, value in expected.items()
+                 if key not in ("missing_annotations", "extra_annotations")}
+        older.update(missing_mask=batch.compact(row)["missing_mask"], extra=batch.compact(row)["extra"])
+        assert engine.expand(older) == expected, (row, older, expected)
+        assert batch.missing_annotations(row, 5) == expected["missing_annotations"][:5]
+    assert list(batch.compacts()) == [batch.compact(row) for row in range(len(batch))]
+    return len(student_gdts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--annotations", type=int, nargs="+", default=[8, 40],
+                        help="feature control frames in the master")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case; the fastest is reported")
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    checked = 0
+    for master_gdt in [{}, {"combined_signature": []}, make_gdt(rng, 3), make_gdt(rng, 12)]:
+        students = EDGE_CASES + [make_gdt(rng, rng.randint(0, 12)) for _ in range(200)]
+        students += [{"combined_signature": [entry for entry in master_gdt.get("combined_signature", [])
+                                             if rng.random() > 0.2] + [f"FCF:Flatness|{rng.choice(TOLERANCES)}|"]}
+                     for _ in range(200)]
+        checked += check_equivalence(master_gdt, students)
+    print(f"equivalence: {checked} comparisons identical to compare_gdt")
+
+    print(f"{'students':>9} {'master':>7} {'compare_gdt s':>14} {'batch s':>9} {'compact s':>10} {'speed-up':>9}")
+    for size, annotations in [(size, annotations) for size in args.students for annotations in args.annotations]:
+        master, results, _ = make_assignment(size, seed=size, gdt_count=annotations)
+        master_gdt = master["gdt_data"]
+        student_gdts = [result["gdt_data"] for result in results.values()]
+        check_equivalence(master_gdt, student_gdts[:1000])
+
+        scalar = batched = compact = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for student_gdt in student_gdts:
+                compare_gdt(master_gdt, student_gdt)
+            scalar = min(scalar, time.perf_counter() - start)
+
+            start = time.perf_counter()
+            batch = GDTEngine(master_gdt).compare_batch(student_gdts)
+            batched = min(batched, time.perf_counter() - start)
+            start = time.perf_counter()
+            list(batch.compacts())
+            compact = min(compact, time.perf_counter() - start)
+        print(f"{size:>9} {len(master_gdt['combined_signature']):>7} {scalar:>14.3f} {batched:>9.3f} {compact:>10.3f} {scalar / (batched + compact):>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
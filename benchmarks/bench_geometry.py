@@ -0,0 +1,75 @@
+# benchmarks/bench_geometry.py
+"""
+Geometric twin search: blocked numpy distances versus a Python pair loop.
+
+Synthetic descriptors (benchmarks/synthetic.py) for cohorts of increasing
+size are searched for pairs within GEOMETRY_DISTANCE_THRESHOLD, once with
+similarity.find_geometric_matches and once by comparing every pair in
+Python. Both must report the same pairs; the loop is skipped above
+--loop-limit students, where it would take minutes.
+    python benchmarks/bench_geometry.py --students 1000 5000 10000
+"""
+import argparse
+import math
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "backend"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import pipeline
+import similarity
+from synthetic import make_assignment
+
+
+def pair_loop(descriptors, threshold, reference):
+    """The search done one pair at a time, as a reference for the vectorized one."""
+    names = [name for name, vector in descriptors.items()
+             if vector and math.dist(vector, reference) > threshold]
+    pairs = set()
+    for idx, name in enumerate(names):
+        for other in names[idx + 1:]:
+            if math.dist(descriptors[name], descriptors[other]) <= threshold:
+                pairs.add((name, other))
+    return pairs
+
+
+def pairs_of(matches):
+    return {tuple(sorted((name, other))) for name, ranked in matches.items() for other, _ in ranked}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, nargs="+", default=[1000, 5000, 10000])
+    parser.add_argument("--threshold", type=float, default=pipeline.GEOMETRY_DISTANCE_THRESHOLD)
+    parser.add_argument("--copy-rate", type=float, default=0.1)
+    parser.add_argument("--loop-limit", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"threshold {args.threshold:g}, block {similarity.GEOMETRY_BLOCK} rows")
+    print(f"{'students':>9} {'copies':>7} {'pairs':>7} {'numpy s':>9} {'loop s':>9} {'speed-up':>9}")
+    for count in args.students:
+        master, students, copies = make_assignment(count, copy_rate=args.copy_rate, seed=args.seed)
+        descriptors = {name: result["descriptor"] for name, result in students.items()}
+        reference = master["descriptor"]
+
+        start = time.perf_counter()
+        found = pairs_of(similarity.find_geometric_matches(descriptors, args.threshold, reference))
+        vectorized = time.perf_counter() - start
+
+        looped = None
+        if count <= args.loop_limit:
+            start = time.perf_counter()
+            expected = pair_loop(descriptors, args.threshold, reference)
+            looped = time.perf_counter() - start
+            assert found == expected, f"{count} students: {len(found ^ expected)} pairs differ"
+
+        loop_text = f"{looped:>9.3f} {looped / vectorized:>8.1f}x" if looped is not None else f"{'-':>9} {'-':>9}"
+        print(f"{count:>9} {len(copies):>7} {len(found):>7} {vectorized:>9.3f} {loop_text}")
+
+
+if __name__ == "__main__":
+    main()
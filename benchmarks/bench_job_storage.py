@@ -0,0 +1,134 @@
+# benchmarks/bench_job_storage.py
+"""
+Disk used by finished jobs before and after compaction, and a retention sweep.
+
+Builds job directories the way the pipeline left them before job storage
+management: the uploaded master part and student ZIP, the extracted parts,
+an indented <part>_analysis.json per part (synthetic worker results from
+benchmarks/synthetic.py), a PDF per student and job.json. Sections share a
+master part and every cohort is run twice, as happens when a job is re-run.
+Then:
+
+  compact  job_storage.compact_job on every job: extracted parts dropped,
+           results repacked into one gzip'd log, inputs hard-linked
+  sweep    JobStorage.sweep with a quota of half the compacted size, with
+           some jobs marked running; checks that none of those is removed,
+           that the others go least recently used first and that the rest
+           fits the quota
+    python benchmarks/bench_job_storage.py --cohorts 20 --students 100
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "backend"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import job_storage
+from ingest import extract_parts
+from synthetic import make_assignment, write_assignment
+
+
+def make_job(root, job_id, inputs_dir, students, status, used, rng):
+    job_dir = root / job_id
+    job_dir.mkdir()
+    (job_dir / "master.SLDPRT").write_bytes((inputs_dir / "master.SLDPRT").read_bytes())
+    zip_path = job_dir / "student_submissions.zip"
+    zip_path.write_bytes((inputs_dir / "students.zip").read_bytes())
+    for s_path, _ in extract_parts(zip_path, job_dir / job_storage.STUDENTS_DIR_NAME):
+        with open(job_dir / f"{s_path.stem}_analysis.json", 'w') as f:
+            json.dump(students[s_path.name], f, indent=4)
+        (job_dir / f"{s_path.stem}_report.pdf").write_bytes(rng.randbytes(2048))
+    with open(job_dir / job_storage.JOB_STATE_FILE, 'w') as f:
+        json.dump({"id": job_id, "status": status,
+                   "inputs": {"master_file": "master.SLDPRT", "student_zip": zip_path.name}}, f)
+    os.utime(job_dir, (used, used))
+    return job_dir
+
+
+def stored_bytes(storage):
+    return storage.stats()["bytes"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cohorts", type=int, default=20)
+    parser.add_argument("--students", type=int, default=100)
+    parser.add_argument("--sections-per-master", type=int, default=4)
+    parser.add_argument("--part-kb", type=int, default=256)
+    parser.add_argument("--running", type=int, default=3, help="jobs marked running, which the sweep must keep")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "jobs"
+        root.mkdir()
+        now = time.time()
+        jobs = []
+        for cohort in range(args.cohorts):
+            _, students, _ = make_assignment(args.students, seed=args.seed + cohort)
+            master, _, _ = make_assignment(1, seed=args.seed + cohort // args.sections_per_master)
+            inputs_dir = Path(tmp) / f"inputs_{cohort}"
+            write_assignment(inputs_dir, master, students, part_bytes=args.part_kb * 1024, seed=args.seed + cohort)
+            # Sections of one master share its part bytes.
+            shared_master = Path(tmp) / f"inputs_{cohort - cohort % args.sections_per_master}" / "master.SLDPRT"
+            (inputs_dir / "master.SLDPRT").write_bytes(shared_master.read_bytes())
+            for run in range(2):
+                idx = len(jobs)
+                job_id = f"20250101_{idx:06d}_{rng.getrandbits(32):08x}"
+                jobs.append((job_id, now - (2 * args.cohorts - idx) * 3600))
+                make_job(root, job_id, inputs_dir, students, "done", jobs[-1][1], rng)
+
+        storage = job_storage.JobStorage(root, max_age_days=0)
+        before = stored_bytes(storage)
+        start = time.perf_counter()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            for job_id, used in jobs:
+                job_storage.compact_job(root / job_id)
+                os.utime(root / job_id, (used, used))
+        compact_seconds = time.perf_counter() - start
+        after = stored_bytes(storage)
+
+        running = {job_id for job_id, _ in rng.sample(jobs[:len(jobs) // 2], args.running)}
+        for job_id in running:
+            with open(root / job_id / job_storage.JOB_STATE_FILE, 'r+') as f:
+                state = json.load(f)
+                state["status"] = "running"
+                f.seek(0)
+                f.truncate()
+                json.dump(state, f)
+            os.utime(root / job_id, (dict(jobs)[job_id],) * 2)
+        storage.max_bytes = after // 2
+        start = time.perf_counter()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            removed = [job_id for job_id, _ in storage.sweep()]
+        sweep_seconds = time.perf_counter() - start
+        swept = stored_bytes(storage)
+
+        assert not running & set(removed), "a running job was removed"
+        kept = [job_id for job_id, _ in jobs if job_id not in removed and job_id not in running]
+        assert removed == [job_id for job_id, _ in jobs if job_id in removed], "removal was not oldest first"
+        assert not kept or min(dict(jobs)[job_id] for job_id in kept) >= max(dict(jobs)[job_id] for job_id in removed)
+        assert swept <= storage.max_bytes, "sweep left the jobs over quota"
+        for job_id in kept:
+            assert job_storage.read_analysis(root / job_id), f"{job_id} lost its worker results"
+
+    mb = 1024 * 1024
+    print(f"{len(jobs)} jobs ({args.cohorts} cohorts run twice, {args.students} students, "
+          f"{args.part_kb} KiB parts, {args.sections_per_master} sections per master)")
+    print(f"{'before compaction':<22} {before / mb:>9.1f} MB")
+    print(f"{'after compaction':<22} {after / mb:>9.1f} MB  ({before / after:.1f}x smaller, {compact_seconds:.2f} s)")
+    print(f"{'after quota sweep':<22} {swept / mb:>9.1f} MB  (quota {storage.max_bytes / mb:.1f} MB, "
+          f"{len(removed)} jobs removed oldest first, {len(running)} running jobs kept, {sweep_seconds:.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# benchmarks/bench_lazy_reports.py
+"""
+Time to results with eager and lazy report rendering, without SOLIDWORKS.
+
+A synthetic cohort is scored once; write_reports then runs in both modes
+on a copy of the same job state:
+
+  eager  renders every student's PDF before the summary is written
+  lazy   writes only summary_report.csv and results.json
+
+For lazy mode, also times the first request for one report (rendered by
+ensure_report), a second request for it (served from disk) and a full
+archive download through iter_report_files, and checks that the lazily
+rendered reports are the ones the eager run produced.
+    python benchmarks/bench_lazy_reports.py --students 500
+"""
+import argparse
+import contextlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import Future
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "backend"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import pipeline
+import report_generator
+from jobs import Job
+from synthetic import make_assignment
+
+
+def make_state(job, count, seed):
+    """Job state for a scored synthetic cohort, as run_assessment saves it."""
+    master, students, _ = make_assignment(count, seed=seed)
+    master_record = {"file": "master.SLDPRT", "signature": master["signature"],
+                     "volume_mm3": master["volume_mm3"], "gdt_data": master["gdt_data"]}
+    records = {}
+    for name, result in students.items():
+        future = Future()
+        future.set_result(result)
+        records[name] = pipeline.collect_student(Path(name), future, job, master_record)
+    pipeline.compare_cohort_gdt(master_record, records.values())
+    state = {"master": master_record, "students": records, "plagiarism": {}}
+    state["plagiarism"] = pipeline.detect_plagiarism(records)
+    return state
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        jobs = {}
+        for mode in ("eager", "lazy"):
+            job = Job(Path(tmp) / mode)
+            job.job_dir.mkdir()
+            job.state["inputs"] = {"reports": mode}
+            jobs[mode] = job
+
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            state = make_state(jobs["eager"], args.students, args.seed)
+            pipeline.save_state(jobs["eager"].job_dir, state)
+            shutil.copy(jobs["eager"].job_dir / pipeline.STATE_FILE_NAME, jobs["lazy"].job_dir)
+            report_generator.get_render_pool().submit(int).result()  # pool start-up, paid once per backend
+
+            seconds = {}
+            for mode, job in jobs.items():
+                seconds[mode], _ = timed(lambda: pipeline.write_reports(job, pipeline.load_state(job.job_dir)))
+
+            lazy_dir = jobs["lazy"].job_dir
+            name = next(iter(state["students"]))
+            first, path = timed(lambda: pipeline.ensure_report(lazy_dir, name))
+            second, _ = timed(lambda: pipeline.ensure_report(lazy_dir, name))
+            download, entries = timed(lambda: list(pipeline.iter_report_files(lazy_dir)))
+
+        eager_reports = sorted(p.name for p in jobs["eager"].job_dir.glob("*.pdf"))
+        assert sorted(entry_name for entry_name, _ in entries) == eager_reports, "lazy reports differ from eager"
+        assert jobs["lazy"].state["reports"] == [], "lazy mode rendered reports up front"
+        assert (lazy_dir / pipeline.RESULTS_FILE_NAME).exists()
+        assert (lazy_dir / pipeline.SUMMARY_CSV_NAME).read_bytes() == \
+            (jobs["eager"].job_dir / pipeline.SUMMARY_CSV_NAME).read_bytes()
+
+    print(f"{args.students} students, {len(eager_reports)} reports")
+    print(f"{'time to results, eager':<34} {seconds['eager']:8.3f} s")
+    print(f"{'time to results, lazy':<34} {seconds['lazy']:8.3f} s  "
+          f"({seconds['eager'] / seconds['lazy']:.1f}x faster)")
+    print(f"{'first request for one report':<34} {first * 1000:8.1f} ms ({path.name})")
+    print(f"{'second request (cached on disk)':<34} {second * 1000:8.1f} ms")
+    print(f"{'full archive of remaining reports':<34} {download:8.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+# benchmarks/bench_pipeline.py
+"""
+End-to-end pipeline benchmark on synthetic cohorts, without SOLIDWORKS.
+
+For each cohort size, synthetic worker outputs (benchmarks/synthetic.py)
+are replayed by the stub worker and every stage runs on the real pipeline
+code: ingest (scan + extract), worker (resident pool), scoring
+(collect_student + the columnar score table), compare_gdt (the batched
+GD&T engine over the cohort), plagiarism (detect_plagiarism), rendering
+(render_reports) and packaging (summary CSV + streamed ZIP). Reports
+seconds, items/s and peak Python memory per stage and saves them as JSON.
+
+Peak memory is measured with tracemalloc in a second run of each stage, so
+it does not slow down the timed run (skip it with --no-memory). Render and
+worker processes are not included in the memory numbers.
+    python benchmarks/bench_pipeline.py --sizes 10 100 1000 10000 --output pipeline.json
+    python benchmarks/bench_pipeline.py --sizes 100 --baseline pipeline.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "backend"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+# The largest cohorts are above the default upload limit.
+os.environ.setdefault("INGEST_MAX_PARTS", "100000")
+
+import pipeline
+import report_generator
+import scoring
+from gdt_engine import GDTEngine
+from ingest import scan_archive, extract_parts
+from jobs import Job
+from synthetic import make_assignment, write_assignment
+from worker_pool import WorkerPool
+from zipstream import iter_zip
+
+STAGES = ["ingest", "worker", "scoring", "compare_gdt", "plagiarism", "rendering", "packaging"]
+
+
+def measure(fn, memory):
+    """Returns (seconds, peak MB or None, result of the timed run)."""
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            fn()
+            peak = tracemalloc.get_traced_memory()[1] / 1e6
+        finally:
+            tracemalloc.stop()
+    return seconds, peak, result
+
+
+def run_size(size, args, workdir):
+    master, students, copies = make_assignment(size, args.copy_rate, args.modify_rate, seed=size)
+    master_path, zip_path, fixtures_dir = write_assignment(workdir, master, students)
+    job = Job(workdir / "job")
+    job.job_dir.mkdir()
+    env = dict(os.environ, SW_STUB_FIXTURES=str(fixtures_dir), SW_STUB_LATENCY=str(args.latency))
+    pool = WorkerPool(size=args.workers, backend="stub", python_executable=sys.executable, env=env)
+    pool.analyze(master_path)  # worker start-up is paid once per backend, not per job
+    results = {}
+
+    def ingest():
+        dest_dir = job.job_dir / pipeline.STUDENTS_DIR_NAME
+        shutil.rmtree(dest_dir, ignore_errors=True)
+        return [path for path, _ in extract_parts(zip_path, dest_dir, scan_archive(zip_path))]
+
+    seconds, peak, student_paths = measure(ingest, args.memory)
+    results["ingest"] = (seconds, peak, len(student_paths))
+
+    def analyze():
+        futures = {path: pool.submit(path) for path in student_paths}
+        for future in futures.values():
+            future.result()
+        return futures
+
+    seconds, peak, futures = measure(analyze, args.memory)
+    results["worker"] = (seconds, peak, len(futures))
+
+    master_record = {"file": master_path.name, "signature": master["signature"],
+                     "volume_mm3": master["volume_mm3"], "gdt_data": master["gdt_data"]}
+
+    def score():
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            return {path.name: pipeline.collect_student(path, futures[path], job, master_record)
+                    for path in student_paths}
+
+    seconds, peak, student_data = measure(score, args.memory)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        pipeline.compare_cohort_gdt(master_record, student_data.values())
+    state = {"master": master_record, "students": student_data, "plagiarism": {}}
+    table_seconds, table_peak, _ = measure(lambda: scoring.build_table(state), args.memory)
+    results["scoring"] = (seconds + table_seconds, max(peak, table_peak) if args.memory else None,
+                          len(student_data))
+
+    def gdt():
+        batch = GDTEngine(master["gdt_data"]).compare_batch(result["gdt_data"] for result in students.values())
+        return list(batch.compacts())
+
+    seconds, peak, _ = measure(gdt, args.memory)
+    results["compare_gdt"] = (seconds, peak, len(students))
+
+    seconds, peak, plagiarism = measure(lambda: pipeline.detect_plagiarism(student_data), args.memory)
+    flagged_copies = sum(1 for name in copies if plagiarism[name]["is_plagiarised"])
+    results["plagiarism"] = (seconds, peak, len(student_data))
+
+    state["plagiarism"] = plagiarism
+    table = scoring.build_table(state)
+    scores = table.rows(list(student_data), pipeline.REPORT_SCORE_COLUMNS)
+    tasks = [({"student_file": name, **data, **scores[name]}, plagiarism[name],
+              pipeline.report_path(job.job_dir, name)) for name, data in student_data.items()]
+    report_generator.get_render_pool().submit(int).result()  # pool start-up, paid once per backend
+
+    def render():
+        return [error for _, error in report_generator.render_reports(tasks) if error]
+
+    seconds, peak, render_errors = measure(render, args.memory)
+    results["rendering"] = (seconds, peak, len(tasks))
+
+    def package():
+        csv_path = job.job_dir / pipeline.SUMMARY_CSV_NAME
+        scoring.export_summary(table, csv_path, "csv")
+        entries = [(output_pdf_path.name, output_pdf_path) for _, _, output_pdf_path in tasks]
+        entries.append((csv_path.name, csv_path))
+        return sum(len(chunk) for chunk in iter_zip(entries))
+
+    seconds, peak, archive_bytes = measure(package, args.memory)
+    results["packaging"] = (seconds, peak, len(tasks))
+    pool.shutdown()
+
+    rows = []
+    for stage in STAGES:
+        seconds, peak, items = results[stage]
+        rows.append({"students": size, "stage": stage, "seconds": round(seconds, 4),
+                     "items_per_second": round(items / seconds, 1) if seconds else None,
+                     "peak_mb": round(peak, 2) if peak is not None else None})
+    checks = {"students": size, "copies": len(copies), "copies_flagged": flagged_copies,
+              "render_errors": len(render_errors), "archive_bytes": archive_bytes}
+    return rows, checks
+
+
+def compare(rows, baseline_path):
+    with open(baseline_path, 'r') as f:
+        baseline = {(row["students"], row["stage"]): row for row in json.load(f)["results"]}
+    print(f"\nvs {baseline_path} (items/s ratio, >1 is faster):")
+    for row in rows:
+        old = baseline.get((row["students"], row["stage"]))
+        if old and old["items_per_second"] and row["items_per_second"]:
+            print(f"  {row['students']:>6} {row['stage']:<12} {row['items_per_second'] / old['items_per_second']:6.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated CAD seconds per part")
+    parser.add_argument("--workers", type=int, default=1, help="resident stub workers")
+    parser.add_argument("--copy-rate", type=float, default=0.1)
+    parser.add_argument("--modify-rate", type=float, default=0.05)
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="skip the tracemalloc runs")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="earlier --output file to compare against")
+    args = parser.parse_args()
+
+    all_rows, all_checks = [], []
+    print(f"{'students':>8} {'stage':<12} {'seconds':>9} {'items/s':>10} {'peak MB':>8}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            rows, checks = run_size(size, args, Path(tmp))
+        for row in rows:
+            peak = f"{row['peak_mb']:8.1f}" if row["peak_mb"] is not None else f"{'-':>8}"
+            print(f"{row['students']:>8} {row['stage']:<12} {row['seconds']:>9.3f} "
+                  f"{row['items_per_second'] or 0:>10.1f} {peak}")
+        print(f"{'':>8} {checks['copies_flagged']}/{checks['copies']} planted copies flagged, "
+              f"{checks['render_errors']} render errors")
+        all_rows.extend(rows)
+        all_checks.append(checks)
+
+    report = {
+        "meta": {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                 "platform": platform.platform(), "cpus": os.cpu_count(), "latency": args.latency,
+                 "workers": args.workers, "report_workers": report_generator.REPORT_WORKERS},
+        "results": all_rows,
+        "checks": all_checks
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved {args.output}")
+    if args.baseline:
+        compare(all_rows, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
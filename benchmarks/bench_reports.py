@@ -0,0 +1,68 @@
+# benchmarks/bench_reports.py
+"""
+Reports per second: the serial create_report loop versus render_reports on
+the shared process pool.
+    python benchmarks/bench_reports.py --reports 300
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import report_generator
+
+
+def make_tasks(directory, count, seed=3):
+    rng = random.Random(seed)
+    tasks = []
+    for idx in range(count):
+        missing = [f"FCF:Position|0.{rng.randint(1, 9)}|A|B" for _ in range(rng.randint(0, 6))]
+        analysis_data = {
+            "student_file": f"{idx:05d}_Bracket.SLDPRT",
+            "master_volume_mm3": 12500.0,
+            "student_volume_mm3": 12500.0 * (1 + rng.uniform(-0.08, 0.08)),
+            "volume_deviation_percent": rng.uniform(0, 8),
+            "gdt_comparison": {"score": rng.choice([0, 50, 75, 100]), "total_required": 8,
+                               "total_found": 8 - len(missing), "missing_count": len(missing),
+                               "missing_annotations": missing},
+            "analysis_error": "" if rng.random() > 0.05 else "Volume below 1 mm3 threshold"
+        }
+        plagiarism_info = {"is_plagiarised": rng.random() < 0.1, "copied_from": [],
+                           "matches": [{"file": "00001_Bracket.SLDPRT", "similarity": 0.91}]}
+        tasks.append((analysis_data, plagiarism_info, Path(directory) / f"{idx:05d}_report.pdf"))
+    return tasks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, default=300)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tasks = make_tasks(tmp, args.reports)
+
+        start = time.perf_counter()
+        for analysis_data, plagiarism_info, output_pdf_path in tasks:
+            report_generator.create_report(analysis_data, plagiarism_info, output_pdf_path)
+        serial = time.perf_counter() - start
+
+        start = time.perf_counter()
+        report_generator.get_render_pool().submit(int).result()  # start-up, paid once per backend
+        startup = time.perf_counter() - start
+        start = time.perf_counter()
+        errors = [error for _, error in report_generator.render_reports(tasks) if error]
+        parallel = time.perf_counter() - start
+
+    print(f"cores: {os.cpu_count()}  render workers: {report_generator.REPORT_WORKERS}")
+    print(f"serial:   {args.reports / serial:8.1f} reports/s ({serial:.2f} s)")
+    print(f"pool:     {args.reports / parallel:8.1f} reports/s ({parallel:.2f} s, "
+          f"+{startup:.2f} s one-off start-up, {len(errors)} failures)")
+
+
+if __name__ == "__main__":
+    main()
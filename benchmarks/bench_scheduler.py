@@ -0,0 +1,152 @@
+# benchmarks/bench_scheduler.py
+"""
+Worker scheduling and failure handling with simulated workers, without SOLIDWORKS.
+
+Parts are stub-backend fixtures whose simulated CAD time follows a
+heavy-tailed distribution, with file size roughly proportional to it.
+
+1. Scheduling: the same parts run on a pool of --workers resident workers
+   in submission order (fifo), longest-first by file size (size, a cold
+   runtime history) and longest-first by recorded seconds (history, the
+   same history after the first run). Reports the makespan of each against
+   the lower bound max(total / workers, longest part).
+2. Failures: a hanging part, a part whose worker crashes once and one whose
+   worker always crashes run next to healthy parts with a short timeout.
+   Asserts that the hang is killed and retried, the crash-once part succeeds
+   on its retry, the healthy parts are unaffected and the straggler report
+   lists the culprits.
+    python benchmarks/bench_scheduler.py --parts 40 --workers 4
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+_history_dir = tempfile.TemporaryDirectory()
+os.environ["RUNTIME_HISTORY_PATH"] = str(Path(_history_dir.name) / "runtime_history.json")
+
+import pipeline
+from jobs import Job
+from runtime_history import RuntimeHistory
+from worker_pool import WorkerPool, WorkerError
+
+BYTES_PER_SECOND = 2_000_000  # placeholder part size per simulated CAD second
+
+
+def write_part(directory, name, rng, stub):
+    """A placeholder part sized by its simulated latency and its stub fixture."""
+    path = directory / f"{name}.SLDPRT"
+    size = int(stub.get("latency", 0.01) * BYTES_PER_SECOND * rng.uniform(0.7, 1.3)) + 1024
+    path.write_bytes(rng.randbytes(size))
+    with open(directory / "fixtures" / f"{name}.json", 'w') as f:
+        json.dump({"status": "Success", "signature": [], "volume_mm3": 1000.0,
+                   "gdt_data": {"combined_signature": []}, "error": "", "stub": stub}, f)
+    return path
+
+
+def make_parts(directory, count, scale, rng):
+    paths, latency = [], {}
+    for idx in range(count):
+        seconds = min(rng.lognormvariate(0, 1.0), 12) * scale
+        path = write_part(directory, f"{21000 + idx}_Bracket", rng, {"latency": seconds})
+        paths.append(path)
+        latency[path] = seconds
+    return paths, latency
+
+
+def makespan(pool, paths, history):
+    start = time.perf_counter()
+    futures = []
+    for path in paths:
+        expected = history.estimate(path) if history else 0.0
+        futures.append((path, pool.submit(path, expected)))
+    for path, future in futures:
+        future.result()
+        if history:
+            history.record(path, None, future.timings["analyze"])
+    return time.perf_counter() - start
+
+
+def bench_scheduling(args, directory, env):
+    rng = random.Random(args.seed)
+    paths, latency = make_parts(directory, args.parts, args.scale, rng)
+    # The longest parts arrive last, the worst case for submission order.
+    paths.sort(key=latency.get)
+    history = RuntimeHistory(directory / "history.json")
+    bound = max(sum(latency.values()) / args.workers, max(latency.values()))
+
+    pool = WorkerPool(size=args.workers, backend="stub", python_executable=sys.executable, env=env)
+    pool.analyzer_id()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        runs = [("fifo", makespan(pool, paths, None)),
+                ("size", makespan(pool, paths, history)),
+                ("history", makespan(pool, paths, history))]
+    pool.shutdown()
+
+    print(f"{args.parts} parts, {args.workers} workers, {sum(latency.values()):.2f}s of simulated CAD time")
+    print(f"{'policy':<8} {'makespan s':>11} {'vs bound':>9}")
+    print(f"{'bound':<8} {bound:>11.2f} {1:>8.2f}x")
+    for policy, seconds in runs:
+        print(f"{policy:<8} {seconds:>11.2f} {seconds / bound:>8.2f}x")
+
+
+def check_failures(args, directory, env):
+    rng = random.Random(args.seed)
+    fixtures = directory / "fixtures"
+    stubs = {"hang": {"hang": 60}, "crash_once": {"crash_attempts": 1},
+             "crash_always": {"crash_attempts": 100}}
+    paths = {name: write_part(directory, name, rng, stub) for name, stub in stubs.items()}
+    healthy = [write_part(directory, f"ok_{idx}", rng, {"latency": 0.05}) for idx in range(8)]
+
+    pool = WorkerPool(size=args.workers, backend="stub", python_executable=sys.executable, env=env,
+                      timeout=args.timeout, retries=1)
+    pool.analyzer_id()
+    futures = {path: pool.submit(path) for path in list(paths.values()) + healthy}
+    for future in futures.values():
+        with contextlib.suppress(WorkerError):
+            future.result()
+    pool.shutdown()
+
+    hang, crash_once, crash_always = (futures[paths[name]] for name in stubs)
+    assert hang.timed_out and hang.attempts == 2 and isinstance(hang.exception(), WorkerError), hang.exception()
+    assert crash_once.attempts == 2 and crash_once.result()["status"] == "Success"
+    assert crash_always.attempts == 2 and crash_always.exception() is not None
+    assert (fixtures / "crash_always.attempts").read_text() == "2"
+    assert all(futures[path].result()["status"] == "Success" and futures[path].attempts == 1 for path in healthy)
+
+    job = Job(directory / "job")
+    job.job_dir.mkdir()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        stragglers = pipeline.report_stragglers(job, list(futures), futures)
+    assert {s["file"] for s in stragglers} == {path.name for path in paths.values()}, stragglers
+    assert job.state["stragglers"] == stragglers
+    print(f"failures: hang killed after {args.timeout:g}s and retried, crash-once recovered, "
+          f"crash-always gave up after 2 attempts, {len(healthy)} healthy parts unaffected")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--parts", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--scale", type=float, default=0.05, help="median simulated seconds per part")
+    parser.add_argument("--timeout", type=float, default=1.0, help="per-part timeout for the failure check")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    for check in (bench_scheduling, check_failures):
+        with tempfile.TemporaryDirectory() as tmp:
+            directory = Path(tmp)
+            (directory / "fixtures").mkdir()
+            env = dict(os.environ, SW_STUB_FIXTURES=str(directory / "fixtures"))
+            check(args, directory, env)
+
+
+if __name__ == "__main__":
+    main()
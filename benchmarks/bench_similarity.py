@@ -0,0 +1,71 @@
+# benchmarks/bench_similarity.py
+"""
+Scaling of the MinHash/LSH plagiarism engine on synthetic feature deltas.
+
+Each cohort has clusters of copied deltas (with renamed / reordered /
+inserted features) mixed with independent work. Reports time per
+submission at growing cohort sizes and recall of the planted copy pairs.
+    python benchmarks/bench_similarity.py --sizes 1000 2000 5000 10000
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from similarity import find_similar
+
+FEATURE_TYPES = ["Boss", "Cut", "Fillet", "Chamfer", "Hole", "Shell", "Rib", "Draft",
+                 "Sweep", "Loft", "Mirror", "LPattern", "CirPattern", "RefPlane", "Sketch"]
+
+
+def random_delta(rng, length):
+    return [{"name": f"{kind}{rng.randint(1, 40)}", "type": kind}
+            for kind in (rng.choice(FEATURE_TYPES) for _ in range(length))]
+
+
+def disguise(rng, delta):
+    """A copy with one feature renamed and a neighbouring pair swapped."""
+    copy = [dict(feature) for feature in delta]
+    copy[rng.randrange(len(copy))]["name"] = "Renamed"
+    idx = rng.randrange(len(copy) - 1)
+    copy[idx], copy[idx + 1] = copy[idx + 1], copy[idx]
+    return copy
+
+
+def make_cohort(size, copy_rate=0.1, seed=7):
+    rng = random.Random(seed)
+    deltas, planted = {}, set()
+    while len(deltas) < size:
+        name = f"{len(deltas):06d}_Part"
+        delta = random_delta(rng, rng.randint(15, 30))
+        deltas[name] = delta
+        if rng.random() < copy_rate and len(deltas) < size:
+            copy_name = f"{len(deltas):06d}_Part"
+            deltas[copy_name] = disguise(rng, delta)
+            planted.add((name, copy_name))
+    return deltas, planted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 2000, 5000, 10000])
+    parser.add_argument("--threshold", type=float, default=0.6)
+    args = parser.parse_args()
+
+    print(f"{'students':>9} {'seconds':>9} {'us/student':>11} {'flagged':>8} {'recall':>7}")
+    for size in args.sizes:
+        deltas, planted = make_cohort(size)
+        start = time.perf_counter()
+        matches = find_similar(deltas, args.threshold)
+        elapsed = time.perf_counter() - start
+        found = sum(1 for a, b in planted if any(other == b for other, _ in matches[a]))
+        flagged = sum(1 for ranked in matches.values() if ranked)
+        recall = found / len(planted) if planted else 1.0
+        print(f"{size:>9} {elapsed:>9.2f} {elapsed / size * 1e6:>11.1f} {flagged:>8} {recall:>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
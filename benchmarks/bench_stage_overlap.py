@@ -0,0 +1,105 @@
+# benchmarks/bench_stage_overlap.py
+"""
+Phased versus pipelined runs of the full pipeline, without SOLIDWORKS.
+
+A synthetic cohort (benchmarks/synthetic.py) is run through run_assessment
+with the stub worker twice:
+
+  phased     PROVISIONAL_REPORTS off: every report is rendered after the
+             last part is analyzed and plagiarism is known
+  pipelined  each student is scored and its report rendered on the render
+             pool as soon as its part is analyzed; after the plagiarism pass
+             only the reports of flagged students are rendered again
+
+Prints the job time and the seconds spent after the last worker result
+(the tail the user waits for), and checks that both runs produce the same
+summary and the same set of reports.
+    python benchmarks/bench_stage_overlap.py --students 200 --latency 0.05
+"""
+import argparse
+import contextlib
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "backend"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from synthetic import make_assignment, write_assignment
+
+
+def run_job(pipeline, manager_class, job_class, workdir, name, master_path, zip_path):
+    job_dir = workdir / name
+    job_dir.mkdir()
+    (job_dir / master_path.name).write_bytes(master_path.read_bytes())
+    (job_dir / "students.zip").write_bytes(zip_path.read_bytes())
+    job = job_class(job_dir)
+    job.state["inputs"] = {"master_file": master_path.name, "student_zip": "students.zip",
+                           "use_cache": False, "assignment": name, "reports": "eager"}
+    manager = manager_class(workdir, pipeline.run_assessment)
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        manager.run(job)
+    total = time.perf_counter() - start
+    assert job.status == "done", job.state["error"]
+    stages = job.snapshot()["stages"]
+    tail = stages["package"]["finished"] - stages["students"]["finished"]
+    return job, total, tail
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated CAD seconds per part")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--copy-rate", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        master, students, _ = make_assignment(args.students, copy_rate=args.copy_rate, seed=args.seed)
+        master_path, zip_path, fixtures_dir = write_assignment(workdir / "inputs", master, students)
+        # Worker, cache and index settings are read when the pipeline is imported.
+        os.environ.update({
+            "SW_WORKER_BACKEND": "stub",
+            "SW_STUB_FIXTURES": str(fixtures_dir),
+            "SW_STUB_LATENCY": str(args.latency),
+            "WORKER_POOL_SIZE": str(args.workers),
+            "RESULT_CACHE_DIR": str(workdir / "cache"),
+            "RESULT_CACHE_ENABLED": "0",
+            "FINGERPRINT_INDEX_PATH": str(workdir / "fingerprints.sqlite3"),
+            "RUNTIME_HISTORY_PATH": str(workdir / "runtime_history.json")
+        })
+        import pipeline
+        import report_generator
+        from jobs import Job, JobManager
+
+        # Pay the worker and render pool start-up before timing.
+        pipeline.get_worker_pool().analyze(master_path)
+        report_generator.get_render_pool().submit(int).result()
+
+        runs = {}
+        for name, provisional in (("phased", False), ("pipelined", True)):
+            pipeline.PROVISIONAL_REPORTS = provisional
+            runs[name] = run_job(pipeline, JobManager, Job, workdir, name, master_path, zip_path)
+        pipeline.get_worker_pool().shutdown()
+
+        phased, pipelined = runs["phased"][0], runs["pipelined"][0]
+        assert phased.state["reports"] == pipelined.state["reports"], "report sets differ"
+        assert (phased.job_dir / pipeline.SUMMARY_CSV_NAME).read_bytes() == \
+            (pipelined.job_dir / pipeline.SUMMARY_CSV_NAME).read_bytes(), "summaries differ"
+        rendered = {name: job.snapshot()["stages"]["reports"]["total"] for name, (job, _, _) in runs.items()}
+
+    print(f"{args.students} students, {args.workers} worker(s), {args.latency:g}s simulated CAD time per part, "
+          f"{os.cpu_count()} CPU core(s)")
+    print(f"{'run':<10} {'job s':>8} {'after analysis s':>17} {'rendered at end':>16}")
+    for name, (_, total, tail) in runs.items():
+        print(f"{name:<10} {total:>8.2f} {tail:>17.2f} {rendered[name]:>16}")
+
+
+if __name__ == "__main__":
+    main()
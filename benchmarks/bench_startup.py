@@ -0,0 +1,149 @@
+# benchmarks/bench_startup.py
+"""
+Backend and worker cold start, and what they import.
+
+Each target runs in fresh interpreters (after one untimed run that writes
+the .pyc files), timed from spawn to exit and reported as the median over
+--runs, also net of a bare `python -c pass`:
+
+  backend  import api_server and answer a first request (GET /cache/stats)
+  pipeline import pipeline, as replay.py and the benchmarks do
+  worker   spawn a resident `sw_worker.py --serve` (stub backend) through
+           worker_pool.WorkerProcess until it reports ready, then close it
+
+`python -X importtime` of the backend and the worker lists the modules
+that take longest to import. Exits with status 1 if a module that must be
+loaded only on demand (pandas, fpdf, the COM bindings, ...) is imported at
+startup, or with --baseline if a target got more than --tolerance slower.
+    python benchmarks/bench_startup.py --output startup.json
+    python benchmarks/bench_startup.py --baseline startup.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "backend"))
+
+from worker_pool import WORKER_SCRIPT_PATH
+
+# Imported only on the code paths that need them: Parquet/XLSX exports,
+# report rendering and the SOLIDWORKS backend.
+LAZY_MODULES = ("pandas", "pyarrow", "openpyxl", "fpdf", "fontTools", "PIL", "win32com", "pythoncom")
+TARGETS = {
+    "python": "pass",
+    "backend": "import api_server; assert api_server.app.test_client().get('/cache/stats').status_code == 200",
+    "pipeline": "import pipeline",
+    "worker": ("from worker_pool import WorkerProcess, default_python_executable\n"
+               "WorkerProcess(default_python_executable(), backend='stub').close()")
+}
+IMPORTS = {"backend": "import api_server", "worker": "import sw_worker, stub_backend"}
+
+
+def child_env(tmp):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([str(PROJECT_ROOT / "backend"), str(WORKER_SCRIPT_PATH.parent)])
+    # Keep the backend's stores out of the project while it starts.
+    env.update(FINGERPRINT_INDEX_PATH=str(Path(tmp) / "fingerprints.sqlite3"),
+               RUNTIME_HISTORY_PATH=str(Path(tmp) / "runtime_history.json"),
+               RESULT_CACHE_DIR=str(Path(tmp) / "analysis_cache"),
+               ASSIGNMENT_DIR=str(Path(tmp) / "assignments"))
+    return env
+
+
+def cold_start(code, env, cwd, runs):
+    """Median seconds from spawning `python -c code` to its exit."""
+    subprocess.run([sys.executable, "-c", code], env=env, cwd=cwd, check=True)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], env=env, cwd=cwd, check=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def import_times(code, env, cwd):
+    """[(module, self µs, cumulative µs, depth)] from `python -X importtime -c code`, in import order."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], env=env, cwd=cwd,
+                          capture_output=True, text=True, check=True)
+    modules = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        modules.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return modules
+
+
+def report_imports(target, modules, top):
+    """Prints the slowest direct imports of a target; returns the LAZY_MODULES it loaded."""
+    total = sum(cumulative for _, _, cumulative, depth in modules if depth == 0)
+    print(f"\n{target}: {total / 1000:.0f} ms of imports ({len(modules)} modules); slowest:")
+    # Modules the target imports itself or through its own backend/worker modules.
+    own = {path.stem for path in (PROJECT_ROOT / "backend").glob("*.py")} | {"sw_worker", "stub_backend"}
+    shown = sorted((entry for entry in modules if entry[3] <= 1 or entry[0] in own),
+                   key=lambda entry: entry[2], reverse=True)[:top]
+    for name, self_us, cumulative_us, depth in shown:
+        print(f"  {name:<28} {cumulative_us / 1000:>8.1f} ms  (self {self_us / 1000:.1f}, depth {depth})")
+    loaded = sorted({name.split(".")[0] for name, _, _, _ in modules} & set(LAZY_MODULES))
+    if loaded:
+        print(f"  loaded at startup but should be lazy: {', '.join(loaded)}")
+    return loaded
+
+
+def compare(results, baseline_path, tolerance):
+    """Prints the change per target against an earlier --output; returns the targets that regressed."""
+    with open(baseline_path, 'r') as f:
+        baseline = json.load(f)["cold_start_seconds"]
+    print(f"\nvs {baseline_path} (time ratio, <1 is faster):")
+    regressed = []
+    for target, seconds in results.items():
+        old = baseline.get(target)
+        if not old:
+            continue
+        ratio = seconds / old
+        slower = ratio > 1 + tolerance and target != "python"
+        print(f"  {target:<10} {ratio:>6.2f}x{'  REGRESSION' if slower else ''}")
+        if slower:
+            regressed.append(target)
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=12, help="imports listed per target")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="earlier --output file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slow-down against --baseline")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = child_env(tmp)
+        results = {target: cold_start(code, env, tmp, args.runs) for target, code in TARGETS.items()}
+        print(f"{'target':<10} {'cold start':>11} {'net of python':>14}")
+        for target, seconds in results.items():
+            print(f"{target:<10} {seconds * 1000:>8.0f} ms {(seconds - results['python']) * 1000:>11.0f} ms")
+        loaded = {target: report_imports(target, import_times(code, env, tmp), args.top)
+                  for target, code in IMPORTS.items()}
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"cold_start_seconds": results, "lazy_modules_loaded": loaded,
+                       "python": platform.python_version(), "runs": args.runs}, f, indent=2)
+        print(f"Saved {args.output}")
+    regressed = compare(results, args.baseline, args.tolerance) if args.baseline else []
+    if regressed or any(loaded.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# benchmarks/bench_worker_pool.py
+"""
+Per-file latency: one `sw_worker.py` subprocess per part (the old
+get_analysis_data path) versus the resident WorkerPool and a streamed
+`sw_worker.py --batch` session (iter_batch), whose results must match the
+pool's.
+
+Runs on Linux with the stub backend:
+    python benchmarks/bench_worker_pool.py --files 50 --latency 0.01
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "backend"))
+
+from worker_pool import WorkerPool, WORKER_SCRIPT_PATH, iter_batch
+
+
+def make_parts(directory, count):
+    paths = []
+    for idx in range(count):
+        path = Path(directory) / f"{idx:05d}_Part.SLDPRT"
+        path.write_bytes(os.urandom(256))
+        paths.append(path)
+    return paths
+
+
+def bench_subprocess(paths, backend, env):
+    timings = []
+    for path in paths:
+        output_json = path.with_suffix(".json")
+        start = time.perf_counter()
+        subprocess.run([sys.executable, str(WORKER_SCRIPT_PATH), str(path), str(output_json),
+                        "--backend", backend], check=True, capture_output=True, env=env)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def bench_pool(paths, backend, env, size):
+    pool = WorkerPool(size=size, backend=backend, python_executable=sys.executable, env=env)
+    start = time.perf_counter()
+    pool.analyze(paths[0])  # warm-up: pays the one-off worker startup
+    startup = time.perf_counter() - start
+    timings, results = [], {}
+    for path in paths:
+        start = time.perf_counter()
+        results[path] = pool.analyze(path)
+        timings.append(time.perf_counter() - start)
+    pool.shutdown()
+    return startup, timings, results
+
+
+def bench_batch(paths, backend, env):
+    """Seconds between consecutive streamed results; the first one includes the session start-up."""
+    timings, results = [], {}
+    last = time.perf_counter()
+    for path, result, _ in iter_batch(paths, backend, sys.executable, env):
+        now = time.perf_counter()
+        timings.append(now - last)
+        results[path] = result
+        last = now
+    return timings[0], timings[1:], results
+
+
+def summarize(label, timings):
+    print(f"{label:<12} n={len(timings):<5} mean={statistics.mean(timings) * 1000:8.2f} ms  "
+          f"p50={statistics.median(timings) * 1000:8.2f} ms  "
+          f"max={max(timings) * 1000:8.2f} ms  total={sum(timings):7.2f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated CAD seconds per part")
+    parser.add_argument("--backend", default="stub")
+    parser.add_argument("--pool-size", type=int, default=1)
+    args = parser.parse_args()
+
+    env = dict(os.environ, SW_STUB_LATENCY=str(args.latency))
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = make_parts(tmp, args.files)
+        summarize("subprocess", bench_subprocess(paths, args.backend, env))
+        startup, timings, pool_results = bench_pool(paths, args.backend, env, args.pool_size)
+        print(f"pool startup {startup * 1000:.2f} ms (paid once)")
+        summarize("pool", timings)
+        first, timings, batch_results = bench_batch(paths, args.backend, env)
+        assert batch_results == pool_results, "batch results differ from the pool's"
+        print(f"batch first result {first * 1000:.2f} ms (includes start-up)")
+        summarize("batch", timings)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+# benchmarks/synthetic.py
+"""
+Synthetic worker outputs for pipeline benchmarks.
+
+Generates a master result and N student results shaped like sw_worker output
+(`signature` feature lists, `volume_mm3`, `gdt_data.combined_signature`,
+geometric `descriptor`) with controlled rates of copying, base-model modification and failed
+analyses. `write_assignment` stores them as stub-backend fixtures next to a
+student ZIP of placeholder parts, so the stub worker replays them
+(SW_STUB_FIXTURES / SW_STUB_LATENCY) through the real pipeline.
+    python benchmarks/synthetic.py /tmp/synthetic --students 100 --copy-rate 0.1
+"""
+import argparse
+import json
+import random
+import zipfile
+from pathlib import Path
+
+FEATURE_TYPES = ["ProfileFeature", "Extrusion", "Cut", "Fillet", "Chamfer", "HoleWzd", "LPattern",
+                 "CirPattern", "MirrorPattern", "Shell", "Rib", "Draft", "Sweep", "Loft", "RefPlane"]
+TOLERANCES = ["0.01", "0.02", "0.05", "0.1", "0.2", "0.5"]
+DATUMS = "ABCD"
+PART_NAME = "Bracket"
+
+
+def random_feature(rng, kind=None):
+    kind = kind or rng.choice(FEATURE_TYPES)
+    return {"name": f"{kind}{rng.randint(1, 40)}", "type": kind}
+
+
+def make_gdt(rng, count):
+    datums = [f"Datum:{d}" for d in DATUMS[:rng.randint(2, 4)]]
+    frames = []
+    while len(frames) < count:
+        frame = (f"FCF:{rng.choice(['Position', 'Flatness', 'Perpendicularity', 'Parallelism', 'Profile'])}"
+                 f"|{rng.choice(TOLERANCES)}|{'|'.join(rng.sample(DATUMS[:2], rng.randint(0, 2)))}")
+        if frame not in frames:
+            frames.append(frame)
+    return {
+        "combined_signature": datums + frames,
+        "feature_control_frames": frames,
+        "dimxpert_annotations": [],
+        "datums": datums
+    }
+
+
+def make_master(rng, base_features=12, gdt_count=8):
+    signature = [{"name": "Sketch1", "type": "ProfileFeature"}, {"name": "Boss-Extrude1", "type": "Extrusion"}]
+    signature += [random_feature(rng) for _ in range(base_features - len(signature))]
+    return {
+        "status": "Success",
+        "signature": signature,
+        "volume_mm3": round(rng.uniform(5000, 50000), 3),
+        "gdt_data": make_gdt(rng, gdt_count),
+        "gdt_callouts": [],
+        "error": ""
+    }
+
+
+def disguise(rng, delta):
+    """A copied delta with one feature renamed and a neighbouring pair swapped."""
+    copy = [dict(feature) for feature in delta]
+    copy[rng.randrange(len(copy))]["name"] = f"Renamed{rng.randint(1, 9)}"
+    if len(copy) > 1:
+        idx = rng.randrange(len(copy) - 1)
+        copy[idx], copy[idx + 1] = copy[idx + 1], copy[idx]
+    return copy
+
+
+def make_students(rng, master, count, copy_rate=0.1, modify_rate=0.05, failure_rate=0.02,
+                  delta_range=(5, 25)):
+    """
+    Returns ({file name: worker result}, {copy file name: source file name}).
+    Copies reuse a disguised earlier delta; modified students change a base
+    feature, so their whole signature is compared as the delta.
+    """
+    base = master["signature"]
+    master_gdt = master["gdt_data"]["combined_signature"]
+    students, copies, deltas = {}, {}, []
+    for idx in range(count):
+        name = f"{21000 + idx}_{PART_NAME}.SLDPRT"
+        if deltas and rng.random() < copy_rate:
+            source, source_delta = rng.choice(deltas)
+            delta = disguise(rng, source_delta)
+            copies[name] = source
+        else:
+            delta = [random_feature(rng) for _ in range(rng.randint(*delta_range))]
+        deltas.append((name, delta))
+
+        signature = [dict(feature) for feature in base]
+        if rng.random() < modify_rate:
+            signature[rng.randrange(1, len(signature))] = random_feature(rng)
+        signature += delta
+
+        gdt = [entry for entry in master_gdt if rng.random() > 0.15]
+        if rng.random() < 0.2:
+            gdt.append(f"FCF:Position|{rng.choice(TOLERANCES)}|A|B")
+        frames = [entry for entry in gdt if entry.startswith("FCF:")]
+        result = {
+            "status": "Success",
+            "signature": signature,
+            "volume_mm3": round(master["volume_mm3"] * (1 + rng.gauss(0, 0.03)), 3),
+            "gdt_data": {
+                "combined_signature": sorted(set(gdt)),
+                "feature_control_frames": frames,
+                "dimxpert_annotations": [],
+                "datums": [entry for entry in gdt if entry.startswith("Datum:")]
+            },
+            "gdt_callouts": [],
+            "error": ""
+        }
+        if rng.random() < failure_rate:
+            result.update(status="Failed", volume_mm3=0.0, error="Volume below 1 mm3 threshold")
+        students[name] = result
+    return students, copies
+
+
+def add_descriptors(rng, master, students, copies, spread=0.05):
+    """
+    Gives every part a geometric descriptor (see sw_worker.DESCRIPTOR_FIELDS):
+    students scatter around the master's shape, copies share their source's
+    shape up to rounding noise and failed parts have none.
+    """
+    master["descriptor"] = [rng.uniform(3.0, 5.0), rng.uniform(3.0, 5.0)] + \
+        [rng.uniform(-0.2, 0.2) for _ in range(3)] + [rng.uniform(2.0, 4.0) for _ in range(6)]
+    for name, result in students.items():
+        if name in copies:
+            source = students[copies[name]]["descriptor"] or master["descriptor"]
+            result["descriptor"] = [value + rng.gauss(0, 1e-6) for value in source]
+        else:
+            result["descriptor"] = [value + rng.gauss(0, spread) for value in master["descriptor"]]
+    for result in students.values():
+        if result["status"] != "Success":
+            result["descriptor"] = []
+
+
+def make_assignment(count, copy_rate=0.1, modify_rate=0.05, failure_rate=0.02, seed=1, gdt_count=8):
+    rng = random.Random(seed)
+    master = make_master(rng, gdt_count=gdt_count)
+    students, copies = make_students(rng, master, count, copy_rate, modify_rate, failure_rate)
+    # A separate stream, so feature lists and volumes do not change with it.
+    add_descriptors(random.Random(seed + 1), master, students, copies)
+    return master, students, copies
+
+
+def write_assignment(directory, master, students, part_bytes=4096, seed=1):
+    """
+    Writes `fixtures/<stem>.json` for every part, `master.SLDPRT` and
+    `students.zip` of placeholder parts. Returns (master path, zip path, fixtures dir).
+    """
+    directory = Path(directory)
+    fixtures_dir = directory / "fixtures"
+    fixtures_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+
+    master_path = directory / "master.SLDPRT"
+    master_path.write_bytes(rng.randbytes(part_bytes))
+    with open(fixtures_dir / "master.json", 'w') as f:
+        json.dump(master, f)
+
+    zip_path = directory / "students.zip"
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for name, result in students.items():
+            # Placeholder bytes are unique per part, so no two parts dedupe.
+            zf.writestr(name, name.encode() + rng.randbytes(part_bytes))
+            with open(fixtures_dir / f"{Path(name).stem}.json", 'w') as f:
+                json.dump(result, f)
+    return master_path, zip_path, fixtures_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory")
+    parser.add_argument("--students", type=int, default=100)
+    parser.add_argument("--copy-rate", type=float, default=0.1)
+    parser.add_argument("--modify-rate", type=float, default=0.05)
+    parser.add_argument("--failure-rate", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    master, students, copies = make_assignment(args.students, args.copy_rate, args.modify_rate,
+                                               args.failure_rate, args.seed)
+    master_path, zip_path, fixtures_dir = write_assignment(args.directory, master, students, seed=args.seed)
+    print(f"{len(students)} students ({len(copies)} copies) in {zip_path}")
+    print(f"Run the backend with SW_WORKER_BACKEND=stub SW_STUB_FIXTURES={fixtures_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,187 @@
 # frontend/app.py
-import streamlit as st, requests
-from datetime import datetime
+import streamlit as st, requests, time, os, urllib.parse, hashlib
 
 st.set_page_config(layout="wide")
-BACKEND_URL = "http://127.0.0.1:5000/analyze"
+BACKEND_URL = "http://127.0.0.1:5000"
+# Address of the backend as seen from the user's browser. Downloads go straight
+# there, so the archive streams to the user without passing through Streamlit.
+BACKEND_PUBLIC_URL = os.environ.get("BACKEND_PUBLIC_URL", BACKEND_URL)
+POLL_INTERVAL = 2  # seconds between job status checks
+CHUNK_RETRIES = 5  # attempts per chunk before the upload is paused; pressing the button again resumes it
 
 st.title("🎓 Comprehensive CAD Assessment System")
 st.markdown("---")
 
+def ready_assignments():
+    """{label: assignment id} of the registered assignments whose base part is analyzed."""
+    try:
+        response = requests.get(f"{BACKEND_URL}/assignments", timeout=10)
+    except requests.exceptions.RequestException:
+        return {}
+    if not response.ok:
+        return {}
+    return {f"{entry['name']} ({entry['master_file']})": entry["assignment_id"]
+            for entry in response.json()["assignments"] if entry["status"] == "ready"}
+
 st.header("1. Upload Faculty's Base Model")
-st.info("The standard `.SLDPRT` file with required GD&T annotations.")
-master_file = st.file_uploader("Upload the Faculty Base Part", type=['sldprt'], key="master")
+st.info("The standard `.SLDPRT` file with required GD&T annotations. A base part saved as an assignment "
+        "is analyzed once and reused by every section.")
+NEW_MASTER = "Upload a base part"
+registered = ready_assignments()
+choice = st.selectbox("Assignment", [NEW_MASTER] + list(registered))
+assignment_id = registered.get(choice)
+master_file = None
+if assignment_id is None:
+    master_file = st.file_uploader("Upload the Faculty Base Part", type=['sldprt'], key="master")
+    if master_file and st.button("💾 Save as assignment for other sections"):
+        response = requests.post(f"{BACKEND_URL}/assignments", timeout=300,
+                                 data={"name": st.session_state.get("assignment_name", "")},
+                                 files={"master_file": (master_file.name, master_file.getvalue())})
+        if response.ok:
+            st.success(f"Saved; it appears under Assignment once it is analyzed ({response.json()['status']}).")
+        else:
+            st.error(f"Server error: {response.status_code} - {response.text}")
 
 st.header("2. Upload All Student Submissions")
 st.info("Place all student `.SLDPRT` files (named `RegNo_PartName.sldprt`) into a single `.ZIP` archive.")
 student_zip_file = st.file_uploader("Upload the Student Submissions ZIP file", type=['zip'], key="students")
 
+st.header("3. Assignment Details (optional)")
+st.info("Submissions are also checked against earlier cohorts of the same assignment.")
+assignment = st.text_input("Assignment name", placeholder="Defaults to the base part's file name and contents",
+                           key="assignment_name")
+semester = st.text_input("Semester", placeholder="e.g. 2025-S2 (defaults to the current semester)")
+owner = st.text_input("Faculty name or e-mail", placeholder="Limits how many jobs one person can queue at once")
+exam = st.checkbox("Exam-day job (analyzed ahead of regular jobs)")
+lazy = st.checkbox("Render PDF reports on demand", value=True,
+                   help="Results appear as soon as scoring is done; each PDF is rendered the first time it is opened.")
+
 st.markdown("---")
 
+def describe_progress(job):
+    """Returns (fraction, text) for the current job stage."""
+    stage = job.get("stage")
+    info = job.get("stages", {}).get(stage, {}) if stage else {}
+    done, total = info.get("done", 0), info.get("total")
+    fraction = done / total if total else 0.0
+    text = f"{job['status'].title()}: {stage or 'waiting'}"
+    if job.get("queue_position") is not None:
+        text += f" - {job['queue_position']} job(s) ahead in the queue"
+    if total:
+        text += f" ({done}/{total} files)"
+    if job.get("eta_seconds") is not None:
+        text += f" - about {int(job['eta_seconds'])}s left in this stage"
+    return fraction, text
+
+def start_upload(files, data):
+    """
+    The backend upload session for these files: the one from an earlier
+    attempt if it is still open and for the same files, else a new one.
+    """
+    upload_id = st.session_state.get("upload_id")
+    if upload_id:
+        response = requests.get(f"{BACKEND_URL}/uploads/{upload_id}", timeout=30)
+        if response.ok:
+            upload = response.json()
+            if set(upload["files"]) == set(files) and all(
+                    upload["files"][field]["name"] == f.name and upload["files"][field]["size"] == f.size
+                    for field, f in files.items()):
+                return upload
+            requests.delete(f"{BACKEND_URL}/uploads/{upload_id}", timeout=30)
+    response = requests.post(f"{BACKEND_URL}/uploads", timeout=30, json={
+        "files": {field: {"name": f.name, "size": f.size} for field, f in files.items()}, "form": data})
+    if response.status_code != 201:
+        return response
+    st.session_state["upload_id"] = response.json()["upload_id"]
+    return response.json()
+
+def send_chunks(upload, files, progress_bar):
+    """
+    Sends the chunks the backend is missing, one at a time, each with its
+    SHA-256; a chunk that fails is retried with back-off.
+    """
+    chunk_size = upload["chunk_size"]
+    total = sum(entry["chunks"] for entry in upload["files"].values())
+    done = total - sum(len(entry["missing"]) for entry in upload["files"].values())
+    for field, f in files.items():
+        for index in upload["files"][field]["missing"]:
+            f.seek(index * chunk_size)
+            chunk = f.read(chunk_size)
+            headers = {"X-Chunk-SHA256": hashlib.sha256(chunk).hexdigest(),
+                       "Content-Type": "application/octet-stream"}
+            for attempt in range(CHUNK_RETRIES):
+                try:
+                    response = requests.put(f"{BACKEND_URL}/uploads/{upload['upload_id']}/{field}/{index}",
+                                            data=chunk, headers=headers, timeout=120)
+                    if response.ok:
+                        break
+                except requests.exceptions.RequestException:
+                    if attempt == CHUNK_RETRIES - 1:
+                        raise
+                time.sleep(2 ** attempt)
+            else:
+                response.raise_for_status()
+            done += 1
+            progress_bar.progress(done / total, text=f"Uploading... {done}/{total} chunks")
+
 if st.button("🚀 Begin Full Analysis", type="primary"):
-    if not master_file or not student_zip_file:
+    if not (master_file or assignment_id) or not student_zip_file:
         st.warning("⚠️ Please upload both the base file and the student ZIP file.")
     else:
-        with st.spinner("Analyzing all submissions... This may take several minutes."):
-            files = {'master_file': master_file, 'student_zip': student_zip_file}
-            try:
-                response = requests.post(BACKEND_URL, files=files, timeout=900) # 15 min timeout
-                if response.status_code == 200:
-                    st.success("✅ Analysis Complete!")
-                    st.download_button(
-                        label="📥 Download All Reports (ZIP)",
-                        data=response.content,
-                        file_name=f"CAD_Reports_{datetime.now().strftime('%Y%m%d')}.zip",
-                        mime="application/zip"
-                    )
-                else:
-                    st.error(f"Server error: {response.status_code} - {response.text}")
-            except requests.exceptions.RequestException as e:
-                st.error(f"Connection to backend failed. Is it running? Details: {e}")
+        files = {'student_zip': student_zip_file}
+        if master_file:
+            files['master_file'] = master_file
+        try:
+            data = {'assignment': assignment, 'semester': semester, 'owner': owner,
+                    'priority': 'exam' if exam else 'normal', 'reports': 'lazy' if lazy else 'eager'}
+            if assignment_id:
+                data['assignment_id'] = assignment_id
+            # Files go up in checksummed chunks; after a dropped connection only the missing chunks are sent.
+            upload = start_upload(files, data)
+            if isinstance(upload, dict):
+                send_chunks(upload, files, st.progress(0.0, text="Uploading..."))
+                response = requests.post(f"{BACKEND_URL}/uploads/{upload['upload_id']}/finalize", timeout=300)
+            else:
+                response = upload
+            if response.status_code == 202:
+                st.session_state.pop("upload_id", None)
+                st.session_state["job_id"] = response.json()["job_id"]
+            elif response.status_code == 429:
+                st.warning(f"⏳ {response.json()['error']}")
+            else:
+                st.error(f"Server error: {response.status_code} - {response.text}")
+        except requests.exceptions.RequestException as e:
+            st.error(f"Upload interrupted; press the button again to resume. Details: {e}")
+
+job_id = st.session_state.get("job_id")
+if job_id:
+    st.caption(f"Job `{job_id}`")
+    progress_bar = st.progress(0.0)
+    status_text = st.empty()
+    try:
+        while True:
+            job = requests.get(f"{BACKEND_URL}/jobs/{job_id}", timeout=30).json()
+            fraction, text = describe_progress(job)
+            progress_bar.progress(min(fraction, 1.0))
+            status_text.text(text)
+            if job["status"] not in ("queued", "running"):
+                break
+            time.sleep(POLL_INTERVAL)
+
+        if job["status"] == "done":
+            progress_bar.progress(1.0)
+            st.success("✅ Analysis Complete!")
+            st.link_button("📥 Download All Reports (ZIP)", f"{BACKEND_PUBLIC_URL}/jobs/{job_id}/result")
+            response = requests.get(f"{BACKEND_URL}/jobs/{job_id}/results", timeout=30)
+            if response.ok:
+                results = response.json()
+                rows = [dict(zip(results["columns"], row)) for row in results["data"]]
+                for row in rows:
+                    row["Report"] = (f"{BACKEND_PUBLIC_URL}/jobs/{job_id}/reports/"
+                                     f"{urllib.parse.quote(row['File'])}")
+                st.dataframe(rows, use_container_width=True,
+                             column_config={"Report": st.column_config.LinkColumn("Report", display_text="Open PDF")})
+        else:
+            st.error(f"Analysis failed: {job.get('error', 'Unknown error')}")
+    except requests.exceptions.RequestException as e:
+        st.error(f"Connection to backend failed. Is it running? Details: {e}")
@@ -0,0 +1,73 @@
+# tests/gdt_reference.py
+"""
+The per-student GD&T comparison the batched engine (backend/gdt_engine.py)
+replaced, kept as the reference its results must match exactly, plus the
+edge cases both are checked on. Used by tests/test_gdt_engine.py and
+benchmarks/bench_gdt.py.
+"""
+
+EDGE_CASES = [
+    {},
+    {"combined_signature": []},
+    {"combined_signature": ["FCF:Position|0.1|A|B"]},
+    {"combined_signature": ["FCF:Position|0.1|A|B", "FCF:Position|0.1|A|B", "Datum:A"],
+     "feature_control_frames": ["FCF:Position|0.1|A|B"] * 2, "datums": ["Datum:A"]},
+]
+
+
+def compare_gdt(master_gdt_data, student_gdt_data):
+    """
+    Detailed GD&T comparison returning status and specific differences, one
+    student at a time: the reference the batched engine must reproduce.
+    """
+    master_signature = set(master_gdt_data.get("combined_signature", []))
+    student_signature = set(student_gdt_data.get("combined_signature", []))
+
+    # Calculate differences
+    missing = master_signature - student_signature
+    extra = student_signature - master_signature
+    matching = master_signature & student_signature
+
+    # Determine overall status
+    if not master_signature:
+        if not student_signature:
+            status = "N/A (No GD&T in master)"
+            score = 100
+        else:
+            status = "Extra annotations present"
+            score = 50
+    elif not student_signature:
+        status = "Missing (No GD&T)"
+        score = 0
+    elif missing and extra:
+        status = "Partial match (missing some, has extra)"
+        score = (len(matching) / len(master_signature)) * 100
+    elif missing:
+        status = "Incomplete (missing annotations)"
+        score = (len(matching) / len(master_signature)) * 100
+    elif extra:
+        status = "Complete with extras"
+        score = 100
+    else:
+        status = "Perfect match"
+        score = 100
+
+    return {
+        "status": status,
+        "score": round(score, 2),
+        "total_required": len(master_signature),
+        "total_found": len(student_signature),
+        "matching_count": len(matching),
+        "missing_count": len(missing),
+        "extra_count": len(extra),
+        "missing_annotations": sorted(list(missing)),
+        "extra_annotations": sorted(list(extra)),
+        "details": {
+            "master_fcf": len(master_gdt_data.get("feature_control_frames", [])),
+            "student_fcf": len(student_gdt_data.get("feature_control_frames", [])),
+            "master_dimxpert": len(master_gdt_data.get("dimxpert_annotations", [])),
+            "student_dimxpert": len(student_gdt_data.get("dimxpert_annotations", [])),
+            "master_datums": len(master_gdt_data.get("datums", [])),
+            "student_datums": len(student_gdt_data.get("datums", []))
+        }
+    }
@@ -0,0 +1,85 @@
+# tests/test_gdt_engine.py
+"""
+The batched GD&T engine must give exactly the per-student reference
+compare_gdt result for every student: full comparisons, compact ones once
+expanded (also in the layout stored by earlier versions) and compacts().
+    python -m unittest discover tests
+"""
+import random
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from gdt_engine import GDTEngine
+from gdt_reference import EDGE_CASES, compare_gdt
+
+FEATURES = ["Position", "Flatness", "Perpendicularity", "Parallelism", "Profile", "Concentricity"]
+TOLERANCES = ["0.01", "0.05", "0.1", "0.5"]
+
+
+def make_gdt(rng, count):
+    """gdt_data with `count` feature control frames and a datum or two, as the worker reports it."""
+    frames = [f"FCF:{rng.choice(FEATURES)}|{rng.choice(TOLERANCES)}|{rng.choice(['', 'A', 'A|B'])}"
+              for _ in range(count)]
+    datums = [f"Datum:{name}" for name in "AB"[:rng.randint(0, 2)]]
+    return {"combined_signature": frames + datums, "feature_control_frames": frames,
+            "dimxpert_annotations": [], "datums": datums}
+
+
+def cohort(rng, master_gdt, size=150):
+    """The edge cases, random students, and students who dropped or added to the master's annotations."""
+    signature = master_gdt.get("combined_signature", [])
+    students = EDGE_CASES + [make_gdt(rng, rng.randint(0, 12)) for _ in range(size)]
+    students += [{"combined_signature": [entry for entry in signature if rng.random() > 0.2]}
+                 for _ in range(size)]
+    students += [{"combined_signature": signature + [f"FCF:Flatness|{rng.choice(TOLERANCES)}|"],
+                  "datums": ["Datum:A"]} for _ in range(size)]
+    students.append(dict(master_gdt))
+    return students
+
+
+class GDTEngineTest(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(13)
+        wide = make_gdt(rng, 0)
+        # More than 64 distinct annotations, so missing masks take the multi-word path.
+        wide["combined_signature"] = [f"FCF:Position|0.{idx:03d}|A" for idx in range(70)]
+        self.masters = EDGE_CASES + [make_gdt(rng, 3), make_gdt(rng, 12), wide]
+        self.cohorts = [cohort(rng, master_gdt) for master_gdt in self.masters]
+
+    def test_comparisons_match_reference(self):
+        for master_gdt, students in zip(self.masters, self.cohorts):
+            engine = GDTEngine(master_gdt)
+            batch = engine.compare_batch(students)
+            for row, student_gdt in enumerate(students):
+                expected = compare_gdt(master_gdt, student_gdt)
+                with self.subTest(master=master_gdt.get("combined_signature"), row=row):
+                    self.assertEqual(batch.comparison(row), expected)
+                    self.assertEqual(engine.expand(batch.compact(row)), expected)
+                    self.assertEqual(batch.missing_annotations(row, 5), expected["missing_annotations"][:5])
+
+    def test_compacts_match_compact(self):
+        for master_gdt, students in zip(self.masters, self.cohorts):
+            batch = GDTEngine(master_gdt).compare_batch(students)
+            self.assertEqual(list(batch.compacts()), [batch.compact(row) for row in range(len(batch))])
+
+    def test_expand_earlier_layouts(self):
+        master_gdt, students = self.masters[-2], self.cohorts[-2]
+        engine = GDTEngine(master_gdt)
+        batch = engine.compare_batch(students)
+        for row, student_gdt in enumerate(students):
+            expected = compare_gdt(master_gdt, student_gdt)
+            # Compact comparisons with every count and the full details dict
+            older = {key: value for key, value in expected.items()
+                     if key not in ("missing_annotations", "extra_annotations")}
+            older.update(missing_mask=batch.compact(row)["missing_mask"], extra=batch.compact(row)["extra"])
+            self.assertEqual(engine.expand(older), expected)
+            # Full comparisons from before the engine pass through unchanged
+            self.assertIs(engine.expand(expected), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
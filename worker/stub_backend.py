@@ -0,0 +1,98 @@
+# worker/stub_backend.py
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+from sw_worker import empty_results, timed, geometric_descriptor, ANALYZER_VERSION
+
+
+def box_geometry(a, b, c):
+    """Geometry of an a x b x c mm block with a corner at the origin."""
+    return {
+        "volume_mm3": a * b * c,
+        "surface_area_mm2": 2 * (a * b + b * c + c * a),
+        "center_of_mass_mm": [a / 2, b / 2, c / 2],
+        "radii_of_gyration_mm": sorted((((y * y + z * z) / 12) ** 0.5 for y, z in ((b, c), (a, c), (a, b))),
+                                       reverse=True),
+        "bbox_extents_mm": sorted((a, b, c), reverse=True)
+    }
+
+
+class StubBackend:
+    """
+    CAD-free analysis backend for Linux development and benchmarks.
+
+    Results come from fixture JSON files named `<part stem>.json` inside
+    SW_STUB_FIXTURES. Parts without a fixture get a deterministic result
+    derived from their bytes, including the geometry of a block. SW_STUB_LATENCY
+    (seconds) simulates per-part CAD time.
+
+    A fixture may carry a "stub" object to simulate misbehaving parts:
+    {"latency": seconds for this part, "hang": seconds to block before
+    answering, "crash_attempts": n} where the worker process dies on the
+    first n analyses of the part (counted in `<stem>.attempts` next to the
+    fixture, so the count survives the respawn).
+    """
+    name = "stub"
+    version = ANALYZER_VERSION
+
+    def __init__(self, fixtures_dir=None, latency=None):
+        fixtures_dir = fixtures_dir or os.environ.get("SW_STUB_FIXTURES")
+        self.fixtures_dir = Path(fixtures_dir) if fixtures_dir else None
+        if latency is None:
+            latency = float(os.environ.get("SW_STUB_LATENCY", "0"))
+        self.latency = latency
+        self.last_timings = {}
+
+    def open(self):
+        pass
+
+    def _misbehave(self, fixture, behaviour):
+        crash_attempts = behaviour.get("crash_attempts", 0)
+        if crash_attempts:
+            counter = fixture.with_suffix(".attempts")
+            attempts = int(counter.read_text()) if counter.exists() else 0
+            counter.write_text(str(attempts + 1))
+            if attempts < crash_attempts:
+                os._exit(3)
+        if behaviour.get("hang"):
+            time.sleep(behaviour["hang"])
+
+    def analyze(self, file_path):
+        file_path = Path(file_path)
+        steps = self.last_timings = {}
+        fixture = self.fixtures_dir / f"{file_path.stem}.json" if self.fixtures_dir else None
+        result = None
+        if fixture and fixture.exists():
+            with timed(steps, "load"), open(fixture, 'r') as f:
+                result = json.load(f)
+        behaviour = result.pop("stub", {}) if result else {}
+        latency = behaviour.get("latency", self.latency)
+        if latency:
+            with timed(steps, "simulated"):
+                time.sleep(latency)
+        if behaviour:
+            self._misbehave(fixture, behaviour)
+        if result is not None:
+            return result
+
+        results = empty_results()
+        try:
+            with timed(steps, "load"):
+                digest = hashlib.sha256(file_path.read_bytes()).digest()
+        except OSError as e:
+            results["error"] = str(e)
+            return results
+
+        results["status"] = "Success"
+        results["geometry"] = box_geometry(*(5.0 + b / 10.0 for b in digest[4:7]))
+        results["descriptor"] = geometric_descriptor(results["geometry"])
+        results["volume_mm3"] = results["geometry"]["volume_mm3"]
+        results["signature"] = [{"name": f"Feature{i + 1}", "type": "Boss" if b % 2 else "Cut"}
+                                for i, b in enumerate(digest[:4])]
+        return results
+
+    def close(self):
+        pass
@@ -1,132 +1,408 @@
 # worker/sw_worker.py
-import win32com.client, sys, json
-import pythoncom
+import sys, json
+import math
 import time
 import os
+from contextlib import contextmanager
 
-def analyze_part(file_path):
-    """Analyzes a part - WORKING VERSION WITH CORRECT UNITS"""
-    pythoncom.CoInitialize()
-    results = { 
-        "status": "Failed", 
+# Bump whenever the shape or meaning of analysis results changes.
+ANALYZER_VERSION = "2"
+DEFAULT_BACKEND = os.environ.get("SW_WORKER_BACKEND", "solidworks")
+# Entries of the geometric descriptor. Sizes are logs of lengths in mm, so a
+# difference of 0.01 is about 1%; the centre of mass is divided by the cube
+# root of the volume.
+DESCRIPTOR_FIELDS = ["log_size", "log_area", "com_x", "com_y", "com_z",
+                     "log_gyration_1", "log_gyration_2", "log_gyration_3",
+                     "log_extent_1", "log_extent_2", "log_extent_3"]
+
+
+def empty_results():
+    return {
+        "status": "Failed",
         "signature": [{"name": "Feature1", "type": "Boss"}],
-        "volume_mm3": 0.0, 
+        "volume_mm3": 0.0,
+        "geometry": {},
+        "descriptor": [],
         "gdt_data": {"combined_signature": []},
         "gdt_callouts": [],
-        "error": "" 
+        "error": ""
+    }
+
+
+def combine_mass_properties(bodies):
+    """
+    Whole-part geometry from per-body (GetMassProperties, GetBodyBox) arrays
+    in metres, as returned at unit density: [comX, comY, comZ, volume, area,
+    mass, Ixx, Iyy, Izz, Ixy, Izx, Iyz] with moments about the body's centre
+    of mass, and [xmin, ymin, zmin, xmax, ymax, zmax]. The bodies' inertia
+    tensors are moved to the common centre of mass before the principal
+    moments are taken; those are returned as radii of gyration.
+    """
+    import numpy as np
+    props = np.array([body_props for body_props, _ in bodies], dtype=float)
+    boxes = np.array([box for _, box in bodies], dtype=float)
+    volumes, masses = np.abs(props[:, 3]), np.abs(props[:, 5])
+    weights = masses if masses.sum() > 0 else volumes
+    centre = (props[:, :3] * weights[:, None]).sum(axis=0) / weights.sum()
+
+    tensor = np.zeros((3, 3))
+    for (ixx, iyy, izz, ixy, izx, iyz), offset, mass in zip(props[:, 6:12], props[:, :3] - centre, masses):
+        tensor += np.array([[ixx, -ixy, -izx], [-ixy, iyy, -iyz], [-izx, -iyz, izz]])
+        tensor += mass * (offset @ offset * np.eye(3) - np.outer(offset, offset))
+    moments = np.clip(np.linalg.eigvalsh(tensor), 0.0, None) / max(masses.sum(), 1e-30)
+
+    extents = boxes[:, 3:].max(axis=0) - boxes[:, :3].min(axis=0)
+    return {
+        "volume_mm3": float(volumes.sum() * 1e9),
+        "surface_area_mm2": float(np.abs(props[:, 4]).sum() * 1e6),
+        "center_of_mass_mm": [float(v) for v in centre * 1e3],
+        "radii_of_gyration_mm": sorted((float(v) for v in np.sqrt(moments) * 1e3), reverse=True),
+        "bbox_extents_mm": sorted((float(v) for v in extents * 1e3), reverse=True)
     }
-    swApp = None
-    
+
+
+def geometric_descriptor(geometry):
+    """Fixed-length, scale-free descriptor (DESCRIPTOR_FIELDS) of a geometry dict; [] without a volume."""
+    volume = geometry.get("volume_mm3", 0.0)
+    if volume <= 0:
+        return []
+    size = volume ** (1 / 3)
+    log = lambda value: math.log(max(value, 1e-9))
+    return ([log(size), 0.5 * log(geometry["surface_area_mm2"])]
+            + [value / size for value in geometry["center_of_mass_mm"]]
+            + [log(value) for value in geometry["radii_of_gyration_mm"]]
+            + [log(value) for value in geometry["bbox_extents_mm"]])
+
+
+def wait_until(predicate, timeout=10.0, interval=0.02):
+    """
+    Polls `predicate` until it returns true or `timeout` seconds pass.
+    Returns whether it became true, so callers wait only as long as needed.
+    """
+    deadline = time.perf_counter() + timeout
+    while True:
+        if predicate():
+            return True
+        if time.perf_counter() >= deadline:
+            return False
+        time.sleep(interval)
+
+
+@contextmanager
+def timed(timings, step):
+    """Adds the wall-clock seconds of the block to timings[step]."""
+    start = time.perf_counter()
     try:
-        print(f"\n{'='*70}")
-        print(f"ANALYZING: {file_path}")
-        print(f"{'='*70}")
-        
-        # Connect to SOLIDWORKS
-        swApp = win32com.client.GetActiveObject("SldWorks.Application")
-        print("[1] Connected to SOLIDWORKS")
-        
-        # Close all
-        swApp.CloseAllDocuments(True)
-        time.sleep(0.5)
-        print("[2] Closed all documents")
-        
-        # Open file
-        print(f"[3] Opening file...")
-        swModel = swApp.OpenDoc(str(file_path), 1)
-        
-        if not swModel:
-            raise Exception(f"Failed to open document")
-        
-        print("[4] Document opened")
-        
-        # Ensure it's active
-        swModel = swApp.ActiveDoc
-        print("[5] Got active document")
-        
-        # Rebuild
-        print("[6] Rebuilding...")
-        swModel.ForceRebuild3(True)
-        time.sleep(1.0)
-        print("[7] Rebuild complete")
-        
-        # GET VOLUME VIA BODIES
-        print("[8] Getting volume from bodies...")
-        
-        volume_mm3 = 0.0
-        
-        # Get all solid bodies
-        print("    Getting solid bodies...")
-        body_array = swModel.GetBodies2(0, False)  # Get all solid bodies
-        
-        if body_array and len(body_array) > 0:
-            print(f"    Found {len(body_array)} solid body/bodies")
-            
-            total_volume = 0.0
-            for idx in range(len(body_array)):
-                body = body_array[idx]
-                print(f"    Processing body {idx + 1}...")
-                
-                try:
-                    # Get mass properties for this body
-                    body_props = body.GetMassProperties(0.0)
-                    
-                    if body_props and len(body_props) >= 4:
-                        # CRITICAL FIX: Volume is returned in cubic METERS
-                        # Convert to cubic millimeters: 1 m³ = 1,000,000,000 mm³
-                        body_volume_mm3 = body_props[3] * 1e9
-                        print(f"      Body {idx + 1} volume: {body_volume_mm3:.2f} mm^3")
-                        total_volume += abs(body_volume_mm3)
-                    else:
-                        print(f"      Body {idx + 1}: Could not get properties")
-                        
-                except Exception as e:
-                    print(f"      Body {idx + 1} error: {e}")
-            
-            volume_mm3 = total_volume
-            print(f"\n    >>> TOTAL VOLUME: {volume_mm3:.2f} mm^3 <<<")
-            
-            if volume_mm3 > 1.0:  # Threshold: 1 mm³
-                results["status"] = "Success"
-                print("    >>> SUCCESS! <<<")
-            else:
-                print("    WARNING: Volume below threshold")
-                results["error"] = "Volume below 1 mm3 threshold"
+        yield
+    finally:
+        timings[step] = timings.get(step, 0.0) + time.perf_counter() - start
+
+
+class SolidWorksBackend:
+    """Analysis backend that keeps one SOLIDWORKS COM session open across parts."""
+    name = "solidworks"
+    version = ANALYZER_VERSION
+
+    def __init__(self):
+        self.swApp = None
+        self._com_ready = False
+        self.last_timings = {}  # seconds per step of the last analyze() call
+
+    def open(self):
+        import pythoncom
+        pythoncom.CoInitialize()
+        self._com_ready = True
+
+    def _connect(self):
+        import win32com.client
+        if self.swApp is None:
+            self.swApp = win32com.client.GetActiveObject("SldWorks.Application")
+            print("[1] Connected to SOLIDWORKS")
         else:
-            print("    ERROR: No solid bodies found in part")
-            results["error"] = "No solid bodies found"
-        
-        results["volume_mm3"] = volume_mm3
-        print(f"\n[9] FINAL VOLUME: {volume_mm3:.2f} mm^3\n")
-        
+            print("[1] Reusing SOLIDWORKS session")
+        return self.swApp
+
+    def analyze(self, file_path):
+        """Analyzes a part - WORKING VERSION WITH CORRECT UNITS"""
+        results = empty_results()
+        swApp = None
+        steps = self.last_timings = {}
+
+        try:
+            print(f"\n{'='*70}")
+            print(f"ANALYZING: {file_path}")
+            print(f"{'='*70}")
+
+            # Connect to SOLIDWORKS (once per session)
+            with timed(steps, "connect"):
+                swApp = self._connect()
+
+            # Close anything left open, and wait until SOLIDWORKS has closed it
+            with timed(steps, "close_all"):
+                if swApp.GetDocumentCount() > 0:
+                    swApp.CloseAllDocuments(True)
+                    if not wait_until(lambda: swApp.GetDocumentCount() == 0):
+                        print("    WARNING: documents still open after CloseAllDocuments")
+            print("[2] Closed all documents")
+
+            # Open file
+            print(f"[3] Opening file...")
+            with timed(steps, "open"):
+                swModel = swApp.OpenDoc(str(file_path), 1)
+
+            if not swModel:
+                raise Exception(f"Failed to open document")
+
+            print("[4] Document opened")
+
+            # Ensure it's active
+            swModel = swApp.ActiveDoc
+            print("[5] Got active document")
+
+            # Rebuild
+            print("[6] Rebuilding...")
+            with timed(steps, "rebuild"):
+                swModel.ForceRebuild3(True)
+                # 0 = swModelRebuildStatus_FullyRebuilt
+                if not wait_until(lambda: swModel.Extension.NeedsRebuild2 == 0):
+                    print("    WARNING: model still needs a rebuild")
+            print("[7] Rebuild complete")
+
+            # GET VOLUME VIA BODIES
+            print("[8] Getting volume from bodies...")
+
+            volume_mm3 = 0.0
+
+            # Get all solid bodies
+            print("    Getting solid bodies...")
+            volume_start = time.perf_counter()
+            body_array = swModel.GetBodies2(0, False)  # Get all solid bodies
+
+            if body_array and len(body_array) > 0:
+                print(f"    Found {len(body_array)} solid body/bodies")
+
+                total_volume = 0.0
+                measured = []  # (mass properties, bounding box) of every body, for the descriptor
+                for idx in range(len(body_array)):
+                    body = body_array[idx]
+                    print(f"    Processing body {idx + 1}...")
+
+                    try:
+                        # Get mass properties for this body; unit density makes mass equal volume
+                        body_props = body.GetMassProperties(1.0)
+
+                        if body_props and len(body_props) >= 4:
+                            # CRITICAL FIX: Volume is returned in cubic METERS
+                            # Convert to cubic millimeters: 1 m³ = 1,000,000,000 mm³
+                            body_volume_mm3 = body_props[3] * 1e9
+                            print(f"      Body {idx + 1} volume: {body_volume_mm3:.2f} mm^3")
+                            total_volume += abs(body_volume_mm3)
+                            if len(body_props) >= 12:
+                                measured.append((list(body_props[:12]), list(body.GetBodyBox())))
+                        else:
+                            print(f"      Body {idx + 1}: Could not get properties")
+
+                    except Exception as e:
+                        print(f"      Body {idx + 1} error: {e}")
+
+                volume_mm3 = total_volume
+                print(f"\n    >>> TOTAL VOLUME: {volume_mm3:.2f} mm^3 <<<")
+                if measured:
+                    try:
+                        results["geometry"] = combine_mass_properties(measured)
+                        results["descriptor"] = geometric_descriptor(results["geometry"])
+                    except Exception as e:
+                        print(f"    WARNING: geometric descriptor failed: {e}")
+
+                if volume_mm3 > 1.0:  # Threshold: 1 mm³
+                    results["status"] = "Success"
+                    print("    >>> SUCCESS! <<<")
+                else:
+                    print("    WARNING: Volume below threshold")
+                    results["error"] = "Volume below 1 mm3 threshold"
+            else:
+                print("    ERROR: No solid bodies found in part")
+                results["error"] = "No solid bodies found"
+
+            steps["volume"] = time.perf_counter() - volume_start
+            results["volume_mm3"] = volume_mm3
+            print(f"\n[9] FINAL VOLUME: {volume_mm3:.2f} mm^3\n")
+
+        except Exception as e:
+            results["error"] = str(e)
+            print(f"\n[ERROR] {e}")
+            import traceback
+            traceback.print_exc()
+            # The session may be dead (SOLIDWORKS restarted or crashed);
+            # reconnect on the next part instead of reusing a stale handle.
+            self.swApp = None
+            swApp = None
+
+        finally:
+            if swApp:
+                try:
+                    with timed(steps, "close"):
+                        swApp.CloseAllDocuments(True)
+                    print("[10] Closed documents")
+                except:
+                    pass
+
+        print(f"{'='*70}\n")
+        return results
+
+    def close(self):
+        self.swApp = None
+        if self._com_ready:
+            import pythoncom
+            pythoncom.CoUninitialize()
+            self._com_ready = False
+
+
+def load_backend(name=None):
+    """Returns an analysis backend by name ("solidworks", "stub" or "module:Class")."""
+    name = name or DEFAULT_BACKEND
+    if name == "solidworks":
+        return SolidWorksBackend()
+    if name == "stub":
+        from stub_backend import StubBackend
+        return StubBackend()
+    module_name, _, class_name = name.partition(":")
+    if not class_name:
+        raise ValueError(f"Unknown analysis backend: {name}")
+    import importlib
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+def analyze_part(file_path, backend=None):
+    """One-shot analysis: opens a backend session, analyzes one part, closes it."""
+    backend = backend or load_backend()
+    backend.open()
+    try:
+        return backend.analyze(file_path)
+    finally:
+        backend.close()
+
+
+def analyze_request(backend, path):
+    """Runs one part through a backend; returns (result, {step: seconds} including the "analyze" total)."""
+    start = time.perf_counter()
+    try:
+        result = backend.analyze(path)
     except Exception as e:
-        results["error"] = str(e)
-        print(f"\n[ERROR] {e}")
-        import traceback
-        traceback.print_exc()
-        
+        result = empty_results()
+        result["error"] = str(e)
+    timings = dict(getattr(backend, "last_timings", {}))
+    timings["analyze"] = time.perf_counter() - start
+    return result, {step: round(seconds, 6) for step, seconds in timings.items()}
+
+
+def protocol_writer():
+    """
+    Moves debug prints to stderr and returns a function that writes one
+    compact JSON line to the real stdout per message.
+    """
+    protocol = sys.stdout
+    sys.stdout = sys.stderr  # debug prints must not corrupt the result stream
+
+    def send(message):
+        protocol.write(json.dumps(message, separators=(",", ":")) + "\n")
+        protocol.flush()
+    return send
+
+
+def serve(backend):
+    """
+    Resident worker loop used by backend/worker_pool.py.
+    Reads one JSON request per line from stdin ({"id", "path"}) and writes one
+    JSON response per line ({"id", "result", "timings"}) to stdout, where
+    timings holds the seconds of each backend step plus the "analyze" total.
+    The session stays open between requests.
+    """
+    send = protocol_writer()
+    backend.open()
+    try:
+        send({"event": "ready", "backend": backend.name, "version": backend.version,
+              "pid": os.getpid()})
+        for line in sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+            request = json.loads(line)
+            if request.get("command") == "shutdown":
+                break
+            result, timings = analyze_request(backend, request["path"])
+            send({"id": request.get("id"), "result": result, "timings": timings})
     finally:
-        if swApp:
-            try:
-                swApp.CloseAllDocuments(True)
-                print("[10] Closed documents")
-            except:
-                pass
-        pythoncom.CoUninitialize()
-    
-    print(f"{'='*70}\n")
-    return results
+        backend.close()
+
+
+def read_manifest(lines):
+    """Yields (id, path) from manifest lines: plain paths or {"id", "path"} JSON objects."""
+    for idx, line in enumerate(lines):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("{"):
+            entry = json.loads(line)
+            yield entry.get("id", idx), entry["path"]
+        else:
+            yield idx, line
+
+
+def batch(backend, manifest):
+    """
+    Analyzes every part of a manifest in one session, streaming NDJSON to
+    stdout: a "ready" line, one {"id", "path", "result", "timings"} line as
+    each part finishes, and a final {"event": "done"} line. The manifest is
+    a file, or stdin for "-", so parts can be fed while earlier ones run.
+    """
+    send = protocol_writer()
+    lines = sys.stdin if manifest == "-" else open(manifest, 'r')
+    backend.open()
+    count = failed = 0
+    try:
+        send({"event": "ready", "backend": backend.name, "version": backend.version,
+              "pid": os.getpid()})
+        for request_id, path in read_manifest(lines):
+            result, timings = analyze_request(backend, path)
+            send({"id": request_id, "path": path, "result": result, "timings": timings})
+            count += 1
+            failed += result.get("status") != "Success"
+        send({"event": "done", "count": count, "failed": failed})
+    finally:
+        backend.close()
+        if lines is not sys.stdin:
+            lines.close()
+
 
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: sw_worker.py <input_file> <output_json>")
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    args = sys.argv[1:]
+    backend_name = None
+    if "--backend" in args:
+        idx = args.index("--backend")
+        backend_name = args[idx + 1]
+        del args[idx:idx + 2]
+
+    if args == ["--serve"]:
+        serve(load_backend(backend_name))
+        sys.exit(0)
+
+    if args[:1] == ["--batch"] and len(args) <= 2:
+        batch(load_backend(backend_name), args[1] if len(args) == 2 else "-")
+        sys.exit(0)
+
+    if len(args) != 2:
+        print("Usage: sw_worker.py <input_file> <output_json> [--backend NAME]")
+        print("       sw_worker.py --serve [--backend NAME]")
+        print("       sw_worker.py --batch [MANIFEST | -] [--backend NAME]")
         sys.exit(1)
-    
-    result = analyze_part(sys.argv[1])
-    
-    with open(sys.argv[2], 'w') as f:
+
+    result = analyze_part(args[0], load_backend(backend_name))
+
+    with open(args[1], 'w') as f:
         json.dump(result, f, indent=4)
-    
+
     print(f"\n*** RESULTS SUMMARY ***")
     print(f"Status: {result['status']}")
     print(f"Volume: {result['volume_mm3']:.2f} mm^3")